@@ -1,27 +1,50 @@
 import streamlit as st
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
+import importlib
 import io
-from datetime import datetime
+import json
+import functools
+import sqlite3
+import time
+from response_cache import get_response_cache, make_cache_key
+from llm_client import get_llm_client, uses_gemini
+from render_pipeline import get_render_pipeline
+from pdf_templates import COVER_LETTER_LAYOUT, DEFAULT_RESUME_LAYOUT, LazyStory, get_template, resume_layouts, warm_up
+from metrics import get_metrics
+from prompt_budget import compact_prompt
+from profile_store import ProfileAccessError, get_profile_store, normalize_email
+from letter_sections import SECTIONS, SectionedLetter, generate_sections
+from job_ingest import ingest_job_description, read_job_file
+from artifact_store import get_artifact_store
+from speculation import Speculator, get_speculation_executor, input_key
+from job_queue import CANCELLED, DEAD, DONE, PRIORITY_INTERACTIVE, QUEUED, ensure_workers, get_job_queue
+from documents import available_formats, bundle_zip, cover_letter_document, export_bundle, pdf_flowables, resume_document
+from startup import prewarm
+from pdf_layout import render_fitted_pdf, without_entries
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+metrics = get_metrics()
 
-def generate_cover_letter(user_data, job_description):
-    try :
-        model = genai.GenerativeModel('gemini-2.0-flash')
+MODEL_NAME = 'gemini-2.0-flash'
+
+# Prompts larger than this (estimated tokens) are compacted; 0 disables compaction
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '4000'))
+
+# Most alternative cover letters one request may ask for
+MAX_DRAFTS = 4
+
+# Seconds between status checks while a background generation job runs
+JOB_POLL_INTERVAL = 1.0
 
-        prompt = f"""
+# Speculative generation from step 4 (opt-in) and how long details must stay unchanged before it starts
+SPECULATIVE_GENERATION = os.getenv('SPECULATIVE_GENERATION', '0') == '1'
+SPECULATION_DELAY = float(os.getenv('SPECULATION_DELAY', '2'))
+
+def build_cover_letter_prompt(user_data, job_description):
+    return f"""
         Generate a professional cover letter for the following candidate applying to this job:
         
         Candidate Information:
@@ -56,490 +79,1362 @@ def generate_cover_letter(user_data, job_description):
         Format the response as a proper cover letter with paragraphs and professional formatting.
         """
 
-        # projects is newly added
-        response = model.generate_content(prompt)
-        return response.text
+def prepare_prompt(user_data, job_description):
+    """Build the cover letter prompt within the token budget, returning (prompt, report)"""
+    with metrics.span('job_ingest'):
+        job_description = ingest_job_description(job_description).text
+    return compact_prompt(
+        user_data, job_description, build_cover_letter_prompt, PROMPT_TOKEN_BUDGET,
+        score_entries=match_scores
+    )
+
+def match_scores(user_data, job_description):
+    """Relevance of each profile entry to the job, used to decide what stays in the prompt"""
+    from matching import match_profile  # NumPy is loaded on first use (or by prewarm)
+    with metrics.span('match_profile'):
+        return match_profile(user_data, job_description).scores
+
+def generate_cover_letter_text(user_data, job_description, client=None, bypass_cache=False):
+    """Generate the cover letter text, raising on failure (used outside the Streamlit UI)"""
+    if client is None:
+        client = get_llm_client(MODEL_NAME)
+    with metrics.span('prompt_build'):
+        prompt, _ = prepare_prompt(user_data, job_description)
+
+    # Reuse a previous response for the same prompt unless regeneration is forced
+    cache = get_response_cache()
+    cache_key = make_cache_key(prompt, client.model_name)
+    if not bypass_cache:
+        cached_text = cache.get(cache_key)
+        if cached_text is not None:
+            metrics.inc('cover_letter_cache', result='hit')
+            return cached_text
+    metrics.inc('cover_letter_cache', result='miss')
+
+    with metrics.span('llm_call', model=client.model_name, mode='blocking'):
+        response = client.generate_sync(prompt)
+    record_token_usage(response, client.model_name)
+    cache.set(cache_key, response.text)
+    return response.text
+
+def record_token_usage(response, model_name):
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None or not metrics.enabled:
+        return
+    metrics.inc('llm_tokens', getattr(usage, 'prompt_token_count', 0) or 0, model=model_name, kind='prompt')
+    metrics.inc('llm_tokens', getattr(usage, 'candidates_token_count', 0) or 0, model=model_name, kind='output')
+
+def generate_cover_letter(user_data, job_description, bypass_cache=False):
+    try :
+        return generate_cover_letter_text(user_data, job_description, bypass_cache=bypass_cache)
     
     except Exception as e:
         st.error(f"An error occurred while generating the cover letter: {str(e)}")
         return None
-    
-def create_resume_pdf(user_data):
+
+def generate_cover_letter_drafts_text(user_data, job_description, count, client=None, bypass_cache=False):
+    """Generate count alternative cover letters in as few requests as the backend allows"""
+    if client is None:
+        client = get_llm_client(MODEL_NAME)
+    with metrics.span('prompt_build'):
+        prompt, _ = prepare_prompt(user_data, job_description)
+
+    cache = get_response_cache()
+    cache_key = make_cache_key(prompt, f"{client.model_name}#drafts={count}")
+    if not bypass_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            metrics.inc('cover_letter_cache', result='hit')
+            return json.loads(cached)
+    metrics.inc('cover_letter_cache', result='miss')
+
+    with metrics.span('llm_call', model=client.model_name, mode='drafts'):
+        drafts, responses = client.generate_variants(prompt, count)
+    for response in responses:
+        record_token_usage(response, client.model_name)
+    cache.set(cache_key, json.dumps(drafts))
+    return drafts
+
+def generate_cover_letter_drafts(user_data, job_description, count, bypass_cache=False):
     try:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-        styles = getSampleStyleSheet()
-        story = []
-
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_LEFT
+        return generate_cover_letter_drafts_text(user_data, job_description, count, bypass_cache=bypass_cache)
+    except Exception as e:
+        st.error(f"An error occurred while generating the cover letter: {str(e)}")
+        return None
+
+def generate_sectioned_letter_text(user_data, job_description, previous=None, client=None, bypass_cache=False):
+    """Write the letter section by section, reusing sections whose inputs did not change
+
+    Returns (SectionedLetter, names of the sections that were regenerated).
+    """
+    if client is None:
+        client = get_llm_client(MODEL_NAME)
+    with metrics.span('llm_call', model=client.model_name, mode='sections'):
+        letter, regenerated = generate_sections(
+            user_data, ingest_job_description(job_description).text, client,
+            previous=previous,
+            cache=get_response_cache(),
+            make_key=make_cache_key,
+            budget=PROMPT_TOKEN_BUDGET,
+            score_entries=match_scores,
+            on_response=lambda response: record_token_usage(response, client.model_name),
+            reuse=not bypass_cache,
         )
+    metrics.inc('cover_letter_sections', len(regenerated), result='regenerated')
+    metrics.inc('cover_letter_sections', len(SECTIONS) - len(regenerated), result='reused')
+    return letter, regenerated
 
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20,
-            alignment=TA_LEFT
+def generate_sectioned_letter(user_data, job_description, bypass_cache=False):
+    previous = st.session_state.get('sectioned_letter')
+    try:
+        letter, regenerated = generate_sectioned_letter_text(
+            user_data, job_description,
+            previous=SectionedLetter.from_dict(previous) if previous else None,
+            bypass_cache=bypass_cache
         )
-        
-        normal_style = styles['Normal']
+    except Exception as e:
+        st.error(f"An error occurred while generating the cover letter: {str(e)}")
+        return None
+    st.session_state.sectioned_letter = letter.as_dict()
+    titles = [section.title for section in SECTIONS if section.name in regenerated]
+    if titles:
+        st.caption(f"Rewrote {len(titles)} of {len(SECTIONS)} sections: {', '.join(titles)}.")
+    else:
+        st.caption("No section depends on what changed, so the previous letter was reused.")
+    return letter.text
 
-        #Header
-        story.append(Paragraph(user_data.get('name', ''), title_style))
-        story.append(Paragraph(user_data.get('email', ''), normal_style))
-        story.append(Paragraph(user_data.get('phone', ''), normal_style))
+class CoverLetterStream:
+    """Iterable of cover letter text chunks that records the assembled text and timings"""
 
-        if user_data.get('current_role'):
-            story.append(Paragraph(f"Current Role: {user_data['current_role']}", normal_style))
-        if user_data.get('years_of_experience'):
-            story.append(Paragraph(f"Years of Experience: {user_data['years_of_experience']}", normal_style))
-        story.append(Spacer(1, 20))
+    def __init__(self, user_data, job_description, client=None, bypass_cache=False):
+        self.user_data = user_data
+        self.job_description = job_description
+        self.client = client
+        self.bypass_cache = bypass_cache
+        self.text = ''
+        self.from_cache = False
+        self.time_to_first_token = None
+        self.total_time = None
 
-        # Professional Summary
-        if user_data.get('summary'):
-            story.append(Paragraph('PROFESSIONAL SUMMARY', heading_style))
-            story.append(Paragraph(user_data['summary'], normal_style))
-            story.append(Spacer(1, 12))
+    def __iter__(self):
+        start = time.perf_counter()
+        with metrics.span('prompt_build'):
+            prompt, _ = prepare_prompt(self.user_data, self.job_description)
+        # Streams share the client's concurrency limit, rate limit, timeout and retries
+        client = self.client if self.client is not None else get_llm_client(MODEL_NAME)
 
-        # Education
-        if user_data.get('education'):
-            story.append(Paragraph('EDUCATION', heading_style))
-            for edu in user_data['education']:
-                edu_text = f"{edu.get('degree', '')} - {edu.get('institution', '')}"
-                if edu.get('year'):
-                    edu_text += f" ({edu['year']})"
-                story.append(Paragraph(edu_text, normal_style))
-                story.append(Spacer(1, 6))
+        cache = get_response_cache()
+        cache_key = make_cache_key(prompt, client.model_name)
+        if not self.bypass_cache:
+            cached_text = cache.get(cache_key)
+            if cached_text is not None:
+                self.text = cached_text
+                self.from_cache = True
+                self.time_to_first_token = self.total_time = time.perf_counter() - start
+                metrics.inc('cover_letter_cache', result='hit')
+                yield cached_text
+                return
+        metrics.inc('cover_letter_cache', result='miss')
 
-        # Skills
-        if user_data.get('skills'):
-            story.append(Paragraph('SKILLS', heading_style))
-            skills_text = ', '.join(user_data['skills'])
-            story.append(Paragraph(skills_text, normal_style))
-
-        # Work Experience
-        if user_data.get('experience'):
-            story.append(Paragraph('PROFESSIONAL EXPERIENCE', heading_style))
-            for exp in user_data['experience']:
-                exp_title = f"{exp.get('title', '')} - {exp.get('company', '')}"
-                story.append(Paragraph(exp_title, normal_style))
-                story.append(Paragraph(exp.get('duration', ''), normal_style))
-                story.append(Paragraph(f"• {exp.get('description', '')}", normal_style))
-                story.append(Spacer(1, 12))
-
-        # Projects
-        if user_data.get('projects'):
-            story.append(Paragraph('PROJECTS', heading_style))
-            for proj in user_data['projects']:
-                proj_text = f"{proj.get('title', '')} - {proj.get('duration', '')}"
-                story.append(Paragraph(proj_text, normal_style))
-                if proj.get('tech'):
-                    story.append(Paragraph(f"Tech Stack: {proj['tech']}", normal_style))
-                story.append(Paragraph(f"• {proj.get('description', '')}", normal_style))
-                story.append(Spacer(1, 12))
+        chunks = []
+        last_chunk = None
+        for chunk in client.stream_sync(prompt):
+            last_chunk = chunk
+            try:
+                piece = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. the final safety metadata) carry nothing to render
+                continue
+            if not piece:
+                continue
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - start
+                metrics.observe('llm_time_to_first_token', self.time_to_first_token, model=client.model_name)
+            chunks.append(piece)
+            yield piece
 
-        # Certifications
-        if user_data.get('certifications'):
-            story.append(Paragraph('CERTIFICATIONS', heading_style))
-            for cert in user_data['certifications']:
-                cert_text = f"{cert.get('title', '')}"
-                story.append(Paragraph(cert_text, normal_style))
-                story.append(Spacer(1, 6))
-
-        # Build the PDF
+        self.text = ''.join(chunks)
+        self.total_time = time.perf_counter() - start
+        metrics.observe('llm_call', self.total_time, model=client.model_name, mode='stream')
+        if last_chunk is not None:
+            # Streaming responses report cumulative usage on the final chunk
+            record_token_usage(last_chunk, client.model_name)
+        if self.text:
+            cache.set(cache_key, self.text)
+
+def stream_cover_letter(user_data, job_description, client=None, bypass_cache=False):
+    return CoverLetterStream(user_data, job_description, client=client, bypass_cache=bypass_cache)
+    
+def iter_resume_story(user_data, styles):
+    """Yield the flowables for a resume using a template's styles, one at a time"""
+    return pdf_flowables(resume_document(user_data), styles)
+
+def resume_story(user_data, styles):
+    """Return the list of flowables for a resume using a template's styles"""
+    return list(iter_resume_story(user_data, styles))
+
+def render_resume_pdf(user_data, layout=DEFAULT_RESUME_LAYOUT, fit_pages=None):
+    """Build the resume PDF into a BytesIO, raising on failure"""
+    buffer = io.BytesIO()
+    write_resume_pdf(user_data, buffer, layout=layout, fit_pages=fit_pages)
+    buffer.seek(0)
+    return buffer
+
+def resume_scores(user_data):
+    """Relevance of each profile entry to the job, or None without a job description"""
+    from matching import resume_scores  # NumPy is loaded on first use (or by prewarm)
+    with metrics.span('match_profile'):
+        return resume_scores(user_data)
+
+def write_resume_pdf(user_data, target, layout=DEFAULT_RESUME_LAYOUT, fit_pages=None):
+    """Build the resume PDF straight into a file path or writable file object (e.g. a socket file)
+
+    Flowables are created lazily while the document is laid out, so only a few
+    are alive at a time however many entries the profile has. With fit_pages
+    the resume is fitted to at most that many pages first, and the outcome
+    (Fit.as_dict()) is returned.
+    """
+    if fit_pages:
+        with metrics.span('pdf_fit', document='resume'):
+            data, fit = render_fitted_pdf(resume_document(user_data), layout, fit_pages, resume_scores(user_data))
+        if hasattr(target, 'write'):
+            target.write(data)
+        else:
+            with open(target, 'wb') as f:
+                f.write(data)
+        return fit.as_dict()
+
+    template = get_template(layout)
+    doc = template.new_doc(target)
+    story = LazyStory(iter_resume_story(user_data, template.styles))
+
+    # Build the PDF (story creation is now interleaved with layout, so both are in this span)
+    with metrics.span('pdf_build', document='resume'):
         doc.build(story)
-        buffer.seek(0)
-        return buffer
+
+def create_resume_pdf(user_data, layout=DEFAULT_RESUME_LAYOUT):
+    try:
+        return render_resume_pdf(user_data, layout=layout)
     except Exception as e:
         st.error(f"Error creating resume PDF: {str(e)}")
         return None
 
+def cover_letter_story(cover_letter_text, user_data, styles):
+    """Return the list of flowables for a cover letter using a template's styles"""
+    return list(pdf_flowables(cover_letter_document(cover_letter_text, user_data), styles))
+
+def render_cover_letter_pdf(cover_letter_text, user_data):
+    """Build the cover letter PDF into a BytesIO, raising on failure"""
+    buffer = io.BytesIO()
+    template = get_template(COVER_LETTER_LAYOUT)
+    doc = template.new_doc(buffer)
+
+    with metrics.span('pdf_story', document='cover_letter'):
+        story = cover_letter_story(cover_letter_text, user_data, template.styles)
+
+    with metrics.span('pdf_build', document='cover_letter'):
+        doc.build(story)
+    buffer.seek(0)
+    return buffer
+
 def create_cover_letter_pdf(cover_letter_text, user_data):
     try:
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Custom styles
-        normal_style = styles['Normal']
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20,
-            alignment=TA_LEFT
-        )
-        
-        # Header
-        story.append(Paragraph(user_data.get('name', ''), heading_style))
-        story.append(Paragraph(user_data.get('email', ''), normal_style))
-        story.append(Paragraph(user_data.get('phone', ''), normal_style))
-        story.append(Spacer(1, 20))
-        
-        # Date
-        today = datetime.now().strftime("%B %d, %Y")
-        story.append(Paragraph(today, normal_style))
-        story.append(Spacer(1, 20))
-
-        paragraphs = cover_letter_text.split('\n\n')
-        for paragraph in paragraphs:
-            if paragraph.strip():
-                story.append(Paragraph(paragraph, normal_style))
-                story.append(Spacer(1, 12))
-        
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return render_cover_letter_pdf(cover_letter_text, user_data)
     except Exception as e:
         st.error(f"Error creating cover letter PDF: {str(e)}")
         return None
 
-def main():
-    st.set_page_config(
-        page_title="Resume and Cover Letter Generator", 
-        page_icon="📄", 
-        layout="wide"
+def run_generation_job(payload, job):
+    """Job queue handler: write the cover letter and both PDFs in a worker process
+
+    The PDFs go to the artifact store; the result holds their digests so the
+    session that submitted the job can fetch them by job id.
+    """
+    user_data = payload['user_data']
+    layout = payload.get('layout', DEFAULT_RESUME_LAYOUT)
+    fit_pages = payload.get('fit_pages')
+    cover_letter_text = generate_cover_letter_text(
+        user_data, user_data['job_description'], bypass_cache=payload.get('bypass_cache', False)
     )
-    st.title("Resume and Cover Letter Generator")
-    st.markdown("Generate professional resumes and cover letters using AI.")
-    # st.write("This application uses Google Gemini AI to create tailored resumes and cover letters based on your input.")
+    if not cover_letter_text:
+        raise RuntimeError("The model returned an empty cover letter")
+    job.check_cancelled()
 
-    if not os.getenv('GEMINI_API_KEY'):
-        st.error("Please set the GEMINI_API_KEY environment variable.")
-        st.stop()
+    store = get_artifact_store()
+    resume_pdf = io.BytesIO()
+    fit = write_resume_pdf(user_data, resume_pdf, layout=layout, fit_pages=fit_pages)
+    result = {'cover_letter_text': cover_letter_text, 'layout': layout, 'fit_pages': fit_pages, 'fit': fit}
+    for kind, buffer in (
+        ('resume_pdf', resume_pdf),
+        ('cover_letter_pdf', render_cover_letter_pdf(cover_letter_text, user_data)),
+    ):
+        with buffer.getbuffer() as view:
+            result[kind] = store.put(view)
+    return result
 
-    if 'current_step' not in st.session_state:
-        st.session_state.current_step = 1
-    if 'user_data' not in st.session_state:
-        st.session_state.user_data = {
-            'name': '',
-            'email': '',
-            'phone': '',
-            'current_role': '',
-            'years_of_experience': '',
-            'summary': '',
-            'skills': [],
-            'experience': [],
-            'education': [],
-            'projects': [], #new
-            'certifications': [], #new
-            'job_description': ''
-            
-        }
+def track_step_transition():
+    """Count wizard step changes and time spent on each step"""
+    if not metrics.enabled:
+        return
+    now = time.time()
+    step = st.session_state.current_step
+    previous_step = st.session_state.get('tracked_step')
+    metrics.inc('script_runs', step=step)
+    if previous_step != step:
+        if previous_step is not None:
+            metrics.inc('wizard_step_transitions', from_step=previous_step, to_step=step)
+            metrics.observe('wizard_step_dwell', now - st.session_state.step_entered_at, step=previous_step)
+        st.session_state.tracked_step = step
+        st.session_state.step_entered_at = now
+
+def render_diagnostics():
+    """Sidebar panel with the process-wide spans and counters"""
+    with st.expander("Diagnostics"):
+        snapshot = metrics.snapshot()
+        if snapshot['spans']:
+            st.write("**Timings**")
+            st.dataframe(
+                [
+                    {
+                        'span': span['name'],
+                        'labels': ', '.join(f"{k}={v}" for k, v in span['labels'].items()),
+                        'count': span['count'],
+                        'mean ms': round(span['mean_ms'], 1),
+                        'max ms': round(span['max_ms'], 1),
+                    }
+                    for span in snapshot['spans']
+                ],
+                hide_index=True
+            )
+        if snapshot['counters']:
+            st.write("**Counters**")
+            st.dataframe(
+                [
+                    {
+                        'counter': counter['name'],
+                        'labels': ', '.join(f"{k}={v}" for k, v in counter['labels'].items()),
+                        'value': counter['value'],
+                    }
+                    for counter in snapshot['counters']
+                ],
+                hide_index=True
+            )
+        if not snapshot['spans'] and not snapshot['counters']:
+            st.caption("No metrics recorded yet.")
+        backend = get_llm_client(MODEL_NAME).backend
+        if hasattr(backend, 'stats'):
+            st.write("**LLM routes**")
+            st.dataframe(
+                [{'route': name, **values} for name, values in backend.stats().items()],
+                hide_index=True
+            )
+
+STEP_TITLES = {
+    1: "Step 1: Personal Info",
+    2: "Step 2: Skills & Experience",
+    3: "Step 3: Projects & Certifications",
+    4: "Step 4: Education & Job",
+    5: "Step 5: Generate",
+}
+
+# Widget keys for the scalar user_data fields
+FIELD_KEYS = {
+    'name': 'name',
+    'email': 'email',
+    'phone': 'phone',
+    'current_role': 'current_role',
+    'years_of_experience': 'years_of_experience',
+    'summary': 'summary',
+    'skills': 'skills_input',
+    'job_description': 'job_description',
+}
+
+# Widget key patterns for each field of the list entries, formatted with the entry index
+ENTRY_KEYS = {
+    'experience': {'title': 'title_{}', 'company': 'company_{}', 'duration': 'duration_{}', 'description': 'desc_{}'},
+    'projects': {'title': 'proj_title_{}', 'tech': 'tech_{}', 'duration': 'proj_duration_{}', 'description': 'proj_desc_{}'},
+    'certifications': {'title': 'cert_title_{}'},
+    'education': {'degree': 'degree_{}', 'institution': 'institution_{}', 'year': 'year_{}'},
+}
+
+# The user_data fields edited on each step
+STEP_FIELDS = {
+    1: ['name', 'email', 'phone', 'current_role', 'years_of_experience', 'summary'],
+    2: ['skills', 'experience'],
+    3: ['projects', 'certifications'],
+    4: ['education', 'job_description'],
+}
+
+# Entries with more than this many siblings start collapsed to keep long profiles light
+EXPANDED_ENTRY_LIMIT = 5
+
+@functools.lru_cache(maxsize=None)
+def missing_api_key():
+    return uses_gemini() and not os.getenv('GEMINI_API_KEY')
+
+def go_to_step(step):
+    st.session_state.current_step = step
+
+def save_step(step):
+    """Copy the submitted widget values of one step back into user_data"""
+    user_data = st.session_state.user_data
+    for field in STEP_FIELDS.get(step, []):
+        if field in ENTRY_KEYS:
+            for i, entry in enumerate(user_data[field]):
+                for name, key in ENTRY_KEYS[field].items():
+                    if key.format(i) in st.session_state:
+                        entry[name] = st.session_state[key.format(i)]
+        elif FIELD_KEYS[field] in st.session_state:
+            value = st.session_state[FIELD_KEYS[field]]
+            if field == 'skills':
+                value = [skill.strip() for skill in value.split(',') if skill.strip()]
+            user_data[field] = value
+    st.session_state.profile_version += 1
+
+def clear_entry_widgets(field):
+    """Drop entry widget state so widgets re-bind to the right entries after a removal"""
+    for i in range(len(st.session_state.user_data[field]) + 1):
+        for key in ENTRY_KEYS[field].values():
+            st.session_state.pop(key.format(i), None)
+
+def empty_profile():
+    return {
+        'name': '',
+        'email': '',
+        'phone': '',
+        'current_role': '',
+        'years_of_experience': '',
+        'summary': '',
+        'skills': [],
+        'experience': [],
+        'education': [],
+        'projects': [], #new
+        'certifications': [], #new
+        'job_description': ''
+        
+    }
+
+def profile_keys():
+    """Access keys this session created or was given, by email; only these profiles are read or written"""
+    return st.session_state.setdefault('profile_keys', {})
+
+def save_profile(store, user_data):
+    """Save the profile with this session's key for its email and return the version
+
+    The first save of a new email creates the profile and its access key, which
+    is shown to the user once. An email saved by someone else cannot be written
+    without its key.
+    """
+    email = normalize_email(user_data['email'])
+    keys = profile_keys()
+    version, key = store.save(user_data, keys.get(email))
+    if email not in keys:
+        keys[email] = key
+        st.session_state.store_notice = (
+            f"Your profile is saved. Its access key is `{key}`: you need it with your email "
+            "to load this profile later, so keep it somewhere safe."
+        )
+    return version
 
+def persist_profile():
+    """Save changed fields of the profile to the profile store, if one is configured"""
+    store = get_profile_store()
+    user_data = st.session_state.user_data
+    if store is None or not user_data['email']:
+        return
+    try:
+        st.session_state.saved_version = save_profile(store, user_data)
+    except ProfileAccessError:
+        st.session_state.store_warning = (
+            "A saved profile already exists for this email. Load it with its access key in step 1 "
+            "to keep saving to it."
+        )
+    except (sqlite3.Error, ValueError) as e:
+        st.session_state.store_warning = f"Your profile could not be saved: {str(e)}"
+
+def load_saved_profile():
+    """Button callback: replace the session profile with the saved one for an email and access key"""
+    store = get_profile_store()
+    email = st.session_state.get('load_email', '')
+    key = st.session_state.get('load_key', '')
+    try:
+        saved, version = store.load(email, key)
+    except ProfileAccessError:
+        saved = None
+    if saved is None:
+        # The same answer for an unknown email and a wrong key, so emails cannot be probed
+        st.session_state.form_error = "No saved profile matches this email and access key"
+        return
+    profile_keys()[normalize_email(email)] = key
+    # Forget widget state so every input shows the loaded values
+    for key in FIELD_KEYS.values():
+        st.session_state.pop(key, None)
+    for field in ENTRY_KEYS:
+        clear_entry_widgets(field)
+    user_data = empty_profile()
+    user_data.update(saved)
+    st.session_state.user_data = user_data
+    st.session_state.saved_version = version
+    st.session_state.profile_version += 1
+    st.session_state.store_message = f"Loaded saved profile (version {version})."
+
+def letter_key(user_data):
+    return input_key(user_data, MODEL_NAME)
+
+def resume_key(user_data, layout, fit_pages=None):
+    # The resume does not use the job description
+    if fit_pages:
+        # Which entries a fitted resume leaves out depends on the job
+        return input_key(user_data, layout, fit_pages)
+    return input_key({k: v for k, v in user_data.items() if k != 'job_description'}, layout)
+
+def speculate_documents(immediate=False):
+    """Start the cover letter and default resume for the current details in the background
+
+    Called whenever step 4 is submitted or a job file is loaded. Unless immediate,
+    work starts after SPECULATION_DELAY seconds without further changes.
+    """
+    if not st.session_state.get('speculate', SPECULATIVE_GENERATION) or missing_api_key():
+        return
+    user_data = json.loads(json.dumps(st.session_state.user_data))
+    if not user_data['job_description'].strip():
+        return
+    speculator = st.session_state.setdefault('speculator', Speculator(delay=SPECULATION_DELAY))
+    delay = 0 if immediate else None
+    speculator.schedule(
+        'cover_letter', letter_key(user_data),
+        lambda: get_speculation_executor().submit(
+            generate_cover_letter_text, user_data, user_data['job_description']
+        ),
+        delay=delay
+    )
+    speculator.schedule(
+        'resume', resume_key(user_data, DEFAULT_RESUME_LAYOUT),
+        lambda: get_render_pipeline().render_resume(user_data, DEFAULT_RESUME_LAYOUT),
+        delay=delay
+    )
+
+def submit_step(step, next_step=None, add=None, remove=None):
+    """Form callback: save the step, then add or remove an entry or move to another step"""
+    save_step(step)
+    user_data = st.session_state.user_data
+    if add:
+        user_data[add].append({name: '' for name in ENTRY_KEYS[add]})
+    if remove:
+        field, index = remove
+        user_data[field].pop(index)
+        clear_entry_widgets(field)
+    if step == 4:
+        st.session_state.speculate = st.session_state.get('speculate_input', SPECULATIVE_GENERATION)
+        speculate_documents(immediate=next_step == 5)
+    if next_step is not None:
+        if step == 1 and not (user_data['name'] and user_data['email'] and user_data['phone']):
+            st.session_state.form_error = "Please fill in all required fields (marked with *)"
+        else:
+            persist_profile()
+            go_to_step(next_step)
+
+def derived(name, compute):
+    """Memoize a value computed from user_data until the profile next changes"""
+    memo = st.session_state.setdefault('derived_values', {})
+    version = st.session_state.profile_version
+    cached = memo.get(name)
+    if cached is None or cached[0] != version:
+        cached = memo[name] = (version, compute(st.session_state.user_data))
+    return cached[1]
+
+def show_form_error():
+    error = st.session_state.pop('form_error', None)
+    if error:
+        st.error(error)
+    warning = st.session_state.pop('store_warning', None)
+    if warning:
+        st.warning(warning)
+    notice = st.session_state.pop('store_notice', None)
+    if notice:
+        st.info(notice)
+
+def entry_expanded(entries, i):
+    return len(entries) <= EXPANDED_ENTRY_LIMIT or i == len(entries) - 1
+
+def render_step_jumps(step):
+    """Step buttons at the top of a step's form; jumping submits the form so edits are saved"""
+    for column, (target, title) in zip(st.columns(len(STEP_TITLES)), STEP_TITLES.items()):
+        with column:
+            st.form_submit_button(
+                f"Step {target}", help=title, disabled=target == step, use_container_width=True,
+                on_click=submit_step, args=(step, target)
+            )
+
+def render_sidebar():
+    # Form inputs only reach the app when their form is submitted, so a sidebar jump
+    # would drop unsaved edits: on the form steps the step buttons in the form are used
+    in_form = st.session_state.current_step in STEP_FIELDS
     with st.sidebar:
         st.header("Navigation")
-        if st.button("Step 1: Personal Info", use_container_width=True):
-            st.session_state.current_step = 1
-        if st.button("Step 2: Skills & Experience", use_container_width=True):
-            st.session_state.current_step = 2
-        if st.button("Step 3: Projects & Certifications", use_container_width=True):
-            st.session_state.current_step = 3
-        if st.button("Step 4: Education & Job", use_container_width=True):
-            st.session_state.current_step = 4
-        if st.button("Step 5: Generate", use_container_width=True):
-            st.session_state.current_step = 5
+        for step, title in STEP_TITLES.items():
+            st.button(title, use_container_width=True, on_click=go_to_step, args=(step,), disabled=in_form)
         
         st.markdown("---")
         st.markdown("**Current Step:** " + str(st.session_state.current_step))
+        if in_form:
+            st.caption("Use the step buttons at the top of the form to move between steps; they save your changes.")
+
+        if metrics.enabled:
+            render_diagnostics()
+
+def render_personal_info_step():
+    st.header("Step 1: Personal Information")
 
-    if st.session_state.current_step == 1:
-        st.header("Step 1: Personal Information")
+    if get_profile_store() is not None:
+        with st.expander("Load a saved profile"):
+            st.text_input("Email address used last time", key="load_email")
+            st.text_input("Access key", type="password", key="load_key",
+                          help="Shown when the profile was first saved")
+            st.button("Load Profile", on_click=load_saved_profile)
+        message = st.session_state.pop('store_message', None)
+        if message:
+            st.success(message)
 
+    user_data = st.session_state.user_data
+
+    with st.form("step_1"):
+        render_step_jumps(1)
         col1, col2 = st.columns(2)
         with col1:
-            st.session_state.user_data['name'] = st.text_input(
+            st.text_input(
                 "Full Name *", 
-                value=st.session_state.user_data['name'],
-                placeholder="John Doe"
+                value=user_data['name'],
+                placeholder="John Doe",
+                key="name"
             )
 
-            st.session_state.user_data['email'] = st.text_input(
+            st.text_input(
                 "Email Address *", 
-                value=st.session_state.user_data['email'],
-                placeholder= "johndoe123@gmail.com"
+                value=user_data['email'],
+                placeholder= "johndoe123@gmail.com",
+                key="email"
             )
 
-            st.session_state.user_data['phone'] = st.text_input(
+            st.text_input(
                 "Phone Number *", 
-                value=st.session_state.user_data['phone'],
-                placeholder="+1 (555) 123-4567"
+                value=user_data['phone'],
+                placeholder="+1 (555) 123-4567",
+                key="phone"
             )
 
         with col2:
-            st.session_state.user_data['current_role'] = st.text_input(
+            st.text_input(
                 "Current Role", 
-                value=st.session_state.user_data['current_role'],
-                placeholder="Software Engineer"
+                value=user_data['current_role'],
+                placeholder="Software Engineer",
+                key="current_role"
             )
             
-            st.session_state.user_data['years_of_experience'] = st.text_input(
+            st.text_input(
                 "Years of Experience", 
-                value=st.session_state.user_data['years_of_experience'],
-                placeholder="5"
+                value=user_data['years_of_experience'],
+                placeholder="5",
+                key="years_of_experience"
             )
 
-        st.session_state.user_data['summary'] = st.text_area(
+        st.text_area(
             "Professional Summary",
-            value=st.session_state.user_data['summary'],
+            value=user_data['summary'],
             placeholder="Brief professional summary...",
-            height=100
+            height=100,
+            key="summary"
         )
 
-        if st.button("Next: Skills & Experience", type="primary"):
-            if st.session_state.user_data['name'] and st.session_state.user_data['email'] and st.session_state.user_data['phone']:
-                st.session_state.current_step = 2
-                st.rerun()
-            else:
-                st.error("Please fill in all required fields (marked with *)")
-    
+        st.form_submit_button("Next: Skills & Experience", type="primary", on_click=submit_step, args=(1, 2))
 
-    elif st.session_state.current_step == 2:
-        st.header("Step 2: Skills & Experience")
-        
+    show_form_error()
+
+def render_experience_step():
+    st.header("Step 2: Skills & Experience")
+    user_data = st.session_state.user_data
+
+    with st.form("step_2"):
+        render_step_jumps(2)
         # Skills
-        skills_input = st.text_input(
+        st.text_input(
             "Skills (comma-separated)",
-            value=', '.join(st.session_state.user_data['skills']),
-            placeholder="JavaScript, React, Node.js, Python, SQL"
+            value=', '.join(user_data['skills']),
+            placeholder="JavaScript, React, Node.js, Python, SQL",
+            key="skills_input"
         )
-        st.session_state.user_data['skills'] = [skill.strip() for skill in skills_input.split(',') if skill.strip()]
 
         st.subheader("Work Experience")
         
-        for i, exp in enumerate(st.session_state.user_data['experience']):
-            with st.expander(f"Experience {i+1}", expanded=True):
+        experience = user_data['experience']
+        for i, exp in enumerate(experience):
+            with st.expander(f"Experience {i+1}", expanded=entry_expanded(experience, i)):
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    exp['title'] = st.text_input(f"Job Title {i+1}", value=exp.get('title', ''), key=f"title_{i}")
-                    exp['company'] = st.text_input(f"Company {i+1}", value=exp.get('company', ''), key=f"company_{i}")
+                    st.text_input(f"Job Title {i+1}", value=exp.get('title', ''), key=f"title_{i}")
+                    st.text_input(f"Company {i+1}", value=exp.get('company', ''), key=f"company_{i}")
 
                 with col2:
-                    exp['duration'] = st.text_input(f"Duration {i+1}", value=exp.get('duration', ''), key=f"duration_{i}", placeholder="2020 - Present")
+                    st.text_input(f"Duration {i+1}", value=exp.get('duration', ''), key=f"duration_{i}", placeholder="2020 - Present")
                 
-            exp['description'] = st.text_area(f"Description {i+1}", value=exp.get('description', ''), key=f"desc_{i}", height=80)
+                st.text_area(f"Description {i+1}", value=exp.get('description', ''), key=f"desc_{i}", height=80)
                 
-            if st.button(f"Remove Experience {i+1}", key=f"remove_exp_{i}"):
-                    st.session_state.user_data['experience'].pop(i)
-                    st.rerun()
+                st.form_submit_button(f"Remove Experience {i+1}", on_click=submit_step, kwargs={'step': 2, 'remove': ('experience', i)})
 
-        if st.button("Add Experience"):
-            st.session_state.user_data['experience'].append({
-                'title': '', 'company': '', 'duration': '', 'description': ''
-            })
-            st.rerun()
+        st.form_submit_button("Add Experience", on_click=submit_step, kwargs={'step': 2, 'add': 'experience'})
 
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("Previous: Personal Info"):
-                st.session_state.current_step = 1
-                st.rerun()
+            st.form_submit_button("Previous: Personal Info", on_click=submit_step, args=(2, 1))
         
         with col2:
-            if st.button("Next: Projects and Certifications", type="primary"):
-                st.session_state.current_step = 3
-                st.rerun()
+            st.form_submit_button("Next: Projects and Certifications", type="primary", on_click=submit_step, args=(2, 3))
 
-    elif st.session_state.current_step == 3:
-        st.header("Step 3: Projects & Certifications")
-        
+    show_form_error()
+
+def render_projects_step():
+    st.header("Step 3: Projects & Certifications")
+    user_data = st.session_state.user_data
+
+    with st.form("step_3"):
+        render_step_jumps(3)
         ## Projects 
 
         st.subheader("Projects ")
         
-        for i, exp in enumerate(st.session_state.user_data['projects']):
-            with st.expander(f"Project {i+1}", expanded=True):
+        projects = user_data['projects']
+        for i, exp in enumerate(projects):
+            with st.expander(f"Project {i+1}", expanded=entry_expanded(projects, i)):
                 col1, col2 = st.columns(2)
 
                 with col1:
-                    exp['title'] = st.text_input(f"Project Title {i+1}", value=exp.get('title', ''), key=f"proj_title_{i}")
-                    exp['tech'] = st.text_input(f"Tech Stack {i+1}", value=exp.get('tech', ''), key=f"tech_{i}")
+                    st.text_input(f"Project Title {i+1}", value=exp.get('title', ''), key=f"proj_title_{i}")
+                    st.text_input(f"Tech Stack {i+1}", value=exp.get('tech', ''), key=f"tech_{i}")
 
                 with col2:
-                    exp['duration'] = st.text_input(f"Duration {i+1}", value=exp.get('duration', ''), key=f"proj_duration_{i}", placeholder="2020 - Present")
+                    st.text_input(f"Duration {i+1}", value=exp.get('duration', ''), key=f"proj_duration_{i}", placeholder="2020 - Present")
                 
-            exp['description'] = st.text_area(f"Description {i+1}", value=exp.get('description', ''), key=f"proj_desc_{i}", height=80)
+                st.text_area(f"Description {i+1}", value=exp.get('description', ''), key=f"proj_desc_{i}", height=80)
                 
-            if st.button(f"Remove Project {i+1}", key=f"remove_proj_{i}"):
-                    st.session_state.user_data['projects'].pop(i)
-                    st.rerun()
+                st.form_submit_button(f"Remove Project {i+1}", on_click=submit_step, kwargs={'step': 3, 'remove': ('projects', i)})
 
-        if st.button("Add Project"):
-            st.session_state.user_data['projects'].append({
-                'title': '', 'tech': '', 'duration': '', 'description': ''
-            })
-            st.rerun()
+        st.form_submit_button("Add Project", on_click=submit_step, kwargs={'step': 3, 'add': 'projects'})
 
         # Certifications
         st.subheader("Certifications")
         
-        for i, cert in enumerate(st.session_state.user_data['certifications']):
-            with st.expander(f"Certification {i+1}", expanded=True):
-                cert['title'] = st.text_input(f"Certification Title {i+1}", value=cert.get('title', ''), key=f"cert_title_{i}")
-                # col1, col2 = st.columns(2)
-
-
-                # with col1:
-                #     cert['title'] = st.text_input(f"Certification Title {i+1}", value=cert.get('title', ''), key=f"cert_title_{i}")
-                #     cert['issuer'] = st.text_input(f"Issuer {i+1}", value=cert.get('issuer', ''), key=f"cert_issuer_{i}")
-
-                # with col2:
-                #     cert['year'] = st.text_input(f"Year {i+1}", value=cert.get('year', ''), key=f"cert_year_{i}", placeholder="2020")
+        certifications = user_data['certifications']
+        for i, cert in enumerate(certifications):
+            with st.expander(f"Certification {i+1}", expanded=entry_expanded(certifications, i)):
+                st.text_input(f"Certification Title {i+1}", value=cert.get('title', ''), key=f"cert_title_{i}")
                 
-                if st.button(f"Remove Certification {i+1}", key=f"remove_cert_{i}"):
-                    st.session_state.user_data['certifications'].pop(i)
-                    st.rerun()
-        if st.button("Add Certification"):
-            st.session_state.user_data['certifications'].append({
-                'title': ''
-            })
-            st.rerun()
+                st.form_submit_button(f"Remove Certification {i+1}", on_click=submit_step, kwargs={'step': 3, 'remove': ('certifications', i)})
+
+        st.form_submit_button("Add Certification", on_click=submit_step, kwargs={'step': 3, 'add': 'certifications'})
         
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("Previous: Skills and Experience"):
-                st.session_state.current_step = 2
-                st.rerun()
+            st.form_submit_button("Previous: Skills and Experience", on_click=submit_step, args=(3, 2))
         
         with col2:
-            if st.button("Next: Education & Job", type="primary"):
-                st.session_state.current_step = 4
-                st.rerun()
+            st.form_submit_button("Next: Education & Job", type="primary", on_click=submit_step, args=(3, 4))
 
-    elif st.session_state.current_step == 4:
-        st.header("Step 4: Education & Job Description")
-        
+    show_form_error()
+
+def load_job_file():
+    uploaded = st.session_state.job_file
+    if uploaded is None:
+        return
+    st.session_state.user_data['job_description'] = read_job_file(uploaded.name, uploaded.getvalue())
+    # Let the text area pick up the loaded text instead of its previous widget value
+    st.session_state.pop('job_description', None)
+    st.session_state.profile_version += 1
+    speculate_documents()
+
+def render_education_step():
+    st.header("Step 4: Education & Job Description")
+    user_data = st.session_state.user_data
+
+    with st.expander("Load the job description from a file"):
+        st.file_uploader(
+            "Job posting (HTML or text)",
+            type=['html', 'htm', 'txt', 'md'],
+            key='job_file',
+            on_change=load_job_file
+        )
+
+    with st.form("step_4"):
+        render_step_jumps(4)
         # Education
         st.subheader("Education")
         
-        for i, edu in enumerate(st.session_state.user_data['education']):
-            with st.expander(f"Education {i+1}", expanded=True):
+        education = user_data['education']
+        for i, edu in enumerate(education):
+            with st.expander(f"Education {i+1}", expanded=entry_expanded(education, i)):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    edu['degree'] = st.text_input(f"Degree {i+1}", value=edu.get('degree', ''), key=f"degree_{i}")
-                    edu['institution'] = st.text_input(f"Institution {i+1}", value=edu.get('institution', ''), key=f"institution_{i}")
+                    st.text_input(f"Degree {i+1}", value=edu.get('degree', ''), key=f"degree_{i}")
+                    st.text_input(f"Institution {i+1}", value=edu.get('institution', ''), key=f"institution_{i}")
                 
                 with col2:
-                    edu['year'] = st.text_input(f"Year {i+1}", value=edu.get('year', ''), key=f"year_{i}", placeholder="2020")
+                    st.text_input(f"Year {i+1}", value=edu.get('year', ''), key=f"year_{i}", placeholder="2020")
                 
-                if st.button(f"Remove Education {i+1}", key=f"remove_edu_{i}"):
-                    st.session_state.user_data['education'].pop(i)
-                    st.rerun()
+                st.form_submit_button(f"Remove Education {i+1}", on_click=submit_step, kwargs={'step': 4, 'remove': ('education', i)})
         
-        if st.button("Add Education"):
-            st.session_state.user_data['education'].append({
-                'degree': '', 'institution': '', 'year': ''
-            })
-            st.rerun()
+        st.form_submit_button("Add Education", on_click=submit_step, kwargs={'step': 4, 'add': 'education'})
 
         st.subheader("Job Description")
-        st.session_state.user_data['job_description'] = st.text_area(
+        st.text_area(
             "Paste the job description here",
-            value=st.session_state.user_data['job_description'],
+            value=user_data['job_description'],
             placeholder="Paste the job description for which you want to generate a cover letter...",
-            height=200
+            height=200,
+            key="job_description"
+        )
+
+        st.checkbox(
+            "Start writing as soon as I continue",
+            value=st.session_state.get('speculate', SPECULATIVE_GENERATION),
+            key="speculate_input",
+            help="Begin the cover letter and resume in the background when you leave this step, so they "
+                 "are ready (or nearly) when you press Generate. Uses an AI request even if you change "
+                 "your details before generating."
         )
         
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("Previous: Projects & Certifications"):
-                st.session_state.current_step = 3
-                st.rerun()
+            st.form_submit_button("Previous: Projects & Certifications", on_click=submit_step, args=(4, 3))
         
         with col2:
-            if st.button("Next: Generate Documents", type="primary"):
-                st.session_state.current_step = 5
-                st.rerun()
+            st.form_submit_button("Next: Generate Documents", type="primary", on_click=submit_step, args=(4, 5))
 
-    elif st.session_state.current_step == 5:
-        st.header("Step 5: Generate Documents")
-        
-        # Display summary
-        st.subheader("Summary")
+    show_form_error()
+
+def save_generated_documents(cover_letter_text):
+    """Keep the generated cover letter with the saved profile version it was made from"""
+    store = get_profile_store()
+    user_data = st.session_state.user_data
+    if store is None or not user_data['email']:
+        return
+    try:
+        save_profile(store, user_data)
+        store.save_document(
+            user_data['email'], profile_keys()[normalize_email(user_data['email'])], 'cover_letter',
+            cover_letter_text, {'job_description': user_data['job_description']}
+        )
+    except ProfileAccessError:
+        st.warning("The cover letter was not saved: a saved profile already exists for this email. "
+                   "Load it with its access key in step 1 first.")
+    except (sqlite3.Error, ValueError) as e:
+        st.warning(f"The generated cover letter could not be saved: {str(e)}")
+
+def keep_generated_documents(resume_pdf, cover_letter_pdf, cover_letter_text, user_data, layout, fit_pages=None,
+                             fit=None):
+    """Move rendered PDFs into the artifact store and remember their digests for later reruns"""
+    documents = {
+        'cover_letter_text': cover_letter_text,
+        'profile_version': st.session_state.profile_version,
+        # What the PDFs were made from, for exporting the same documents in other formats
+        'user_data': user_data,
+        'layout': layout,
+        'fit_pages': fit_pages,
+        # How the resume PDF was fitted to fit_pages (Fit.as_dict()), from its real build
+        'fit': fit,
+    }
+    store = get_artifact_store()
+    for kind, buffer in (('resume_pdf', resume_pdf), ('cover_letter_pdf', cover_letter_pdf)):
+        try:
+            with buffer.getbuffer() as view:
+                documents[kind] = store.put(view)
+        except OSError as e:
+            # Keep this session working even if the artifact directory is not writable
+            st.warning(f"The generated PDF could not be stored: {str(e)}")
+            documents[kind] = buffer.getvalue()
+    st.session_state.generated_documents = documents
+
+def prepare_document_bundle():
+    """Render the generated documents in every available format and keep the ZIP for download"""
+    documents = st.session_state.generated_documents
+    try:
+        with metrics.span('export_bundle'):
+            # The PDFs are not rendered again: the bundle gets the ones already made and shown
+            rendered = {
+                ('resume', 'pdf'): artifact_data(documents['resume_pdf']),
+                ('cover_letter', 'pdf'): artifact_data(documents['cover_letter_pdf']),
+            }
+            # A fitted PDF left entries out; the other formats leave out the same ones
+            fit = documents.get('fit')
+            resume = None
+            if fit and fit['dropped']:
+                resume = without_entries(
+                    resume_document(documents['user_data']), [tuple(entry) for entry in fit['dropped']]
+                )
+            files = export_bundle(
+                documents['user_data'], documents['cover_letter_text'], layout=documents['layout'],
+                rendered=rendered, resume=resume
+            )
+        archive = bundle_zip(files)
+    except Exception as e:
+        st.error(f"Error exporting documents: {str(e)}")
+        return
+    try:
+        documents['bundle'] = get_artifact_store().put(archive)
+    except OSError:
+        documents['bundle'] = archive
+
+def artifact_data(ref):
+    return ref if isinstance(ref, bytes) else get_artifact_store().read_bytes(ref)
+
+def render_generated_documents(col1, col2):
+    documents = st.session_state.get('generated_documents')
+    if not documents:
+        return
+    try:
+        resume_data = artifact_data(documents['resume_pdf'])
+        cover_letter_data = artifact_data(documents['cover_letter_pdf'])
+        bundle_data = artifact_data(documents['bundle']) if 'bundle' in documents else None
+    except FileNotFoundError:
+        # Evicted by the retention policy
+        del st.session_state.generated_documents
+        st.info("The previously generated documents have expired. Generate them again to download.")
+        return
+
+    name = st.session_state.user_data['name'].replace(' ', '_')
+    with col1:
+        st.download_button(
+            label="📄 Download Resume (PDF)",
+            data=resume_data,
+            file_name=f"{name}_resume.pdf",
+            mime="application/pdf"
+        )
+
+    with col2:
+        st.download_button(
+            label="📄 Download Cover Letter (PDF)",
+            data=cover_letter_data,
+            file_name=f"{name}_cover_letter.pdf",
+            mime="application/pdf"
+        )
+
+    if documents['profile_version'] != st.session_state.profile_version:
+        st.caption("Your details changed after these documents were generated.")
+    fit = documents.get('fit')
+    if fit:
+        if fit['fits']:
+            st.caption(fit['summary'])
+        else:
+            st.warning(fit['summary'] + " Shorten some entries or allow more pages.")
+    st.text_area("Copy Cover Letter Text", value=documents['cover_letter_text'], height=200, disabled=True)
+
+    if bundle_data is None:
+        st.button(
+            "Export in all formats",
+            on_click=prepare_document_bundle,
+            help=f"Render both documents as {', '.join(name.upper() for name in available_formats())} "
+                 "and download them together as a ZIP file"
+        )
+    else:
+        st.download_button(
+            label="🗂️ Download All Formats (ZIP)",
+            data=bundle_data,
+            file_name=f"{name}_documents.zip",
+            mime="application/zip"
+        )
+
+def finish_documents(render_run, cover_letter_text, show_letter=True):
+    """Render the cover letter PDF, wait for the resume and keep both for download"""
+    if not cover_letter_text:
+        render_run.cancel()
+        st.error("Failed to generate cover letter. Please check your API key and try again.")
+        return
+
+    # Create PDFs
+    with st.spinner("Generating documents..."):
+        render_run.render_cover_letter(cover_letter_text)
+        render_result = render_run.result()
+    resume_pdf = render_result.resume_pdf
+    cover_letter_pdf = render_result.cover_letter_pdf
+    for stage, error in render_result.errors.items():
+        st.error(f"Error creating {stage.replace('_', ' ').replace('pdf', 'PDF')}: {str(error)}")
+    st.caption(" · ".join(
+        f"{stage.replace('_', ' ')}: {seconds:.2f}s" for stage, seconds in render_result.timings.items()
+    ))
+
+    if resume_pdf and cover_letter_pdf:
+        # Display results
+        st.success("Documents generated successfully!")
+        save_generated_documents(cover_letter_text)
+        keep_generated_documents(
+            resume_pdf, cover_letter_pdf, cover_letter_text, render_run.user_data, render_run.layout,
+            render_run.fit_pages, render_result.resume_fit
+        )
+
+        #Display Resume
+        # st.subheader("Generated Resume")
+        # st.text_area("Resume", value=resume_pdf, height=800, disabled=True)
+
+        # Display cover letter
+        if show_letter:
+            st.subheader("Generated Cover Letter")
+            st.text_area("Cover Letter", value=cover_letter_text, height=400, disabled=True)
+    else:
+        st.error("Failed to create PDF documents. Please try again.")
+
+def render_draft_picker():
+    """Let the user compare the generated drafts and create the PDF from the chosen one"""
+    pending = st.session_state.cover_letter_drafts
+    if pending['profile_version'] != st.session_state.profile_version:
+        # Details changed since the drafts were written; the resume being rendered is stale too
+        pending['render_run'].cancel()
+        del st.session_state.cover_letter_drafts
+        return
+
+    drafts = pending['texts']
+    labels = [f"Draft {i + 1} ({len(text.split())} words)" for i, text in enumerate(drafts)]
+
+    st.subheader("Choose a Cover Letter")
+    for label, tab, text in zip(labels, st.tabs(labels), drafts):
+        with tab:
+            st.text_area(label, value=text, height=400, disabled=True, label_visibility="collapsed")
+
+    with st.form("draft_picker"):
+        choice = st.radio("Draft to use", labels, horizontal=True)
+        use_clicked = st.form_submit_button("Create PDFs with this draft", type="primary")
+
+    if use_clicked:
+        del st.session_state.cover_letter_drafts
+        try:
+            finish_documents(pending['render_run'], drafts[labels.index(choice)])
+        except Exception as e:
+            st.error(f"An error occurred while generating documents: {str(e)}")
+
+def submit_generation_job(user_data, layout, bypass_cache, fit_pages=None):
+    """Queue generation for the worker processes and remember the job id in the session"""
+    try:
+        ensure_workers()
+        job_id = get_job_queue().submit(
+            'generate_documents',
+            {'user_data': user_data, 'layout': layout, 'bypass_cache': bypass_cache, 'fit_pages': fit_pages},
+            priority=PRIORITY_INTERACTIVE
+        )
+    except (sqlite3.Error, OSError) as e:
+        st.error(f"Could not queue the generation job: {str(e)}")
+        return
+    st.session_state.generation_job = {
+        'id': job_id,
+        'profile_version': st.session_state.profile_version,
+        'user_data': json.loads(json.dumps(user_data)),
+    }
+
+def cancel_generation_job():
+    get_job_queue().cancel(st.session_state.generation_job['id'])
+
+def render_generation_job():
+    """Show the background job's progress and collect its result; return True while it is unfinished"""
+    pending = st.session_state.generation_job
+    queue = get_job_queue()
+    job = queue.get(pending['id'])
+    if job is None:
+        del st.session_state.generation_job
+        return False
+
+    if job.status == DONE:
+        del st.session_state.generation_job
+        result = job.result
+        st.session_state.generated_documents = {
+            'cover_letter_text': result['cover_letter_text'],
+            'profile_version': pending['profile_version'],
+            'user_data': pending['user_data'],
+            'layout': result['layout'],
+            'fit_pages': result.get('fit_pages'),
+            'fit': result.get('fit'),
+            'resume_pdf': result['resume_pdf'],
+            'cover_letter_pdf': result['cover_letter_pdf'],
+        }
+        st.success("Documents generated successfully!")
+        save_generated_documents(result['cover_letter_text'])
+        return False
+    if job.status == CANCELLED:
+        del st.session_state.generation_job
+        st.info("Generation was cancelled.")
+        return False
+    if job.status == DEAD:
+        del st.session_state.generation_job
+        reason = (job.error or '').strip().splitlines()[:1]
+        st.error(f"Generation failed after {job.attempts} attempts" + (f": {reason[0]}" if reason else "."))
+        return False
+
+    if job.cancel_requested:
+        st.info("Cancelling...")
+        return True
+    if job.status == QUEUED:
+        waiting = f"{queue.position(job.id)} ahead" if not job.attempts else f"retrying after: {job.error.splitlines()[0]}"
+        st.info(f"Generation queued ({waiting}).")
+    else:
+        st.info(f"Generating in the background ({time.time() - job.started_at:.0f}s). "
+                "You can keep using the app and come back to this step.")
+    st.button("Cancel generation", on_click=cancel_generation_job)
+    return True
+
+def take_speculation(slot, key):
+    """Future of work started in step 4 for exactly these inputs, or None (stale work is dropped)"""
+    speculator = st.session_state.get('speculator')
+    if speculator is None:
+        return None
+    future = speculator.take(slot, key)
+    metrics.inc('speculation', slot=slot, result='hit' if future is not None else 'miss')
+    return future
+
+def await_speculative_letter(user_data):
+    """Wait for a cover letter started in step 4; it lands in the response cache the generators read"""
+    future = take_speculation('cover_letter', letter_key(user_data))
+    if future is None:
+        return
+    if not future.done():
+        with st.spinner("Finishing the cover letter started in step 4..."):
+            try:
+                future.result()
+            except Exception:
+                # Generated again below, with the usual error handling
+                pass
+
+def render_match_report(report):
+    with st.expander(f"Job match: {report.overall:.0%}"):
+        st.caption("Similarity of your details to the job description (TF-IDF over words and word pairs)")
         col1, col2 = st.columns(2)
-        
         with col1:
-            st.write("**Personal Info:**")
-            st.write(f"Name: {st.session_state.user_data['name']}")
-            st.write(f"Email: {st.session_state.user_data['email']}")
-            st.write(f"Phone: {st.session_state.user_data['phone']}")
-            st.write(f"Current Role: {st.session_state.user_data['current_role']}")
-            st.write(f"Experience: {st.session_state.user_data['years_of_experience']} years")
-        
+            for section, title in (('experience', 'Most relevant experience'), ('projects', 'Most relevant projects')):
+                top = report.top(section, limit=3)
+                if top:
+                    st.write(f"**{title}:**")
+                    for item in top:
+                        st.write(f"- {item['label'] or '(untitled)'}: {item['score']:.0%}")
         with col2:
-            st.write("**Skills:**")
-            st.write(', '.join(st.session_state.user_data['skills']))
-            st.write(f"**Experience Entries:** {len(st.session_state.user_data['experience'])}")
-            st.write(f"**Education Entries:** {len(st.session_state.user_data['education'])}")
-
-        if st.button("Generate Resume & Cover Letter", type="primary"):
-            with st.spinner("Generating documents..."):
-                try:
-                    # Generate cover letter
+            st.write("**Skills found in the job:** " + (', '.join(report.matched_skills) or 'none'))
+            if report.missing_keywords:
+                st.write("**Job keywords missing from your details:** " + ', '.join(report.missing_keywords))
+
+def render_generate_step():
+    st.header("Step 5: Generate Documents")
+    user_data = st.session_state.user_data
+    
+    # Display summary
+    st.subheader("Summary")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.write("**Personal Info:**")
+        st.write(f"Name: {user_data['name']}")
+        st.write(f"Email: {user_data['email']}")
+        st.write(f"Phone: {user_data['phone']}")
+        st.write(f"Current Role: {user_data['current_role']}")
+        st.write(f"Experience: {user_data['years_of_experience']} years")
+    
+    with col2:
+        st.write("**Skills:**")
+        st.write(derived('skills_text', lambda data: ', '.join(data['skills'])))
+        st.write(f"**Experience Entries:** {len(user_data['experience'])}")
+        st.write(f"**Education Entries:** {len(user_data['education'])}")
+
+    from matching import match_profile
+
+    job = ingest_job_description(user_data['job_description'])
+    st.caption(f"Job posting: {job.summary()}")
+    render_match_report(derived('match_report', lambda data: match_profile(data, job.text)))
+
+    prompt_report = derived('prompt_report', lambda data: prepare_prompt(data, data['job_description'])[1])
+    st.caption(prompt_report.summary())
+    if prompt_report.dropped:
+        with st.expander("Left out of the prompt"):
+            for item in prompt_report.dropped:
+                st.write(f"- {item['section'].title()}: {item['title'] or '(untitled)'}")
+
+    with st.form("generate_options"):
+        force_regenerate = st.checkbox(
+            "Force regeneration",
+            help="Ignore any cached cover letter for these details and call the AI again"
+        )
+
+        layouts = resume_layouts()
+        resume_layout = st.selectbox(
+            "Resume layout",
+            layouts,
+            index=layouts.index(DEFAULT_RESUME_LAYOUT),
+            help="  \n".join(f"**{name}**: {get_template(name).description}" for name in layouts)
+        )
+
+        fit_pages = st.selectbox(
+            "Fit resume to",
+            (None, 1, 2),
+            format_func=lambda pages: "No page limit" if pages is None else f"{pages} page{'s' if pages > 1 else ''}",
+            help="Tighten the spacing, then the type size, and leave out your least relevant entries "
+                 "until the resume fits on this many pages"
+        )
+
+        stream_output = st.checkbox(
+            "Stream cover letter as it is written",
+            value=True,
+            help="Show the cover letter progressively instead of waiting for the full response"
+        )
+
+        draft_count = st.number_input(
+            "Cover letter drafts",
+            min_value=1,
+            max_value=MAX_DRAFTS,
+            value=1,
+            help="Write several alternative cover letters in one request and pick one before the PDF "
+                 "is created. Drafts are not streamed."
+        )
+
+        by_section = st.checkbox(
+            "Write section by section",
+            help="Write the greeting, motivation, experience match and call to action separately. "
+                 "After you edit your details, only the sections that depend on what changed are "
+                 "rewritten. Not streamed, and always a single draft."
+        )
+
+        in_background = st.checkbox(
+            "Run in the background",
+            help="Generate in a worker process. The work carries on if you leave this step or the page "
+                 "reruns, and you can cancel it. Not streamed, and always a single draft."
+        )
+
+        generate_clicked = st.form_submit_button("Generate Resume & Cover Letter", type="primary")
+
+    if generate_clicked and 'generation_job' in st.session_state:
+        # A new request replaces the one still in the queue
+        cancel_generation_job()
+        del st.session_state.generation_job
+
+    if generate_clicked and in_background:
+        st.session_state.pop('cover_letter_drafts', None)
+        submit_generation_job(user_data, resume_layout, force_regenerate, fit_pages)
+    elif generate_clicked:
+        st.session_state.pop('cover_letter_drafts', None)
+        try:
+            # Start rendering the resume while the cover letter is generated, unless step 4 already did
+            render_run = get_render_pipeline().start(
+                user_data, layout=resume_layout, fit_pages=fit_pages,
+                resume_future=take_speculation('resume', resume_key(user_data, resume_layout, fit_pages))
+            )
+            if not (force_regenerate or by_section or draft_count > 1):
+                await_speculative_letter(user_data)
+
+            # Generate cover letter
+            if by_section:
+                with st.spinner("Writing cover letter sections..."):
+                    cover_letter_text = generate_sectioned_letter(
+                        user_data,
+                        user_data['job_description'],
+                        bypass_cache=force_regenerate
+                    )
+                finish_documents(render_run, cover_letter_text)
+            elif draft_count > 1:
+                with st.spinner(f"Writing {draft_count} cover letter drafts..."):
+                    drafts = generate_cover_letter_drafts(
+                        user_data,
+                        user_data['job_description'],
+                        draft_count,
+                        bypass_cache=force_regenerate
+                    )
+                if drafts:
+                    # The resume keeps rendering while the user compares drafts
+                    st.session_state.cover_letter_drafts = {
+                        'texts': drafts,
+                        'render_run': render_run,
+                        'profile_version': st.session_state.profile_version,
+                    }
+                else:
+                    render_run.cancel()
+                    st.error("Failed to generate cover letter. Please check your API key and try again.")
+            elif stream_output:
+                st.subheader("Generated Cover Letter")
+                cover_letter_stream = stream_cover_letter(
+                    user_data,
+                    user_data['job_description'],
+                    bypass_cache=force_regenerate
+                )
+                st.write_stream(cover_letter_stream)
+                if cover_letter_stream.time_to_first_token is not None:
+                    st.caption(
+                        f"First text after {cover_letter_stream.time_to_first_token:.2f}s, "
+                        f"complete after {cover_letter_stream.total_time:.2f}s"
+                        + (" (cached)" if cover_letter_stream.from_cache else "")
+                    )
+                finish_documents(render_run, cover_letter_stream.text, show_letter=False)
+            else:
+                with st.spinner("Generating cover letter..."):
                     cover_letter_text = generate_cover_letter(
-                        st.session_state.user_data, 
-                        st.session_state.user_data['job_description']
+                        user_data, 
+                        user_data['job_description'],
+                        bypass_cache=force_regenerate
                     )
+                finish_documents(render_run, cover_letter_text)
 
-                    if cover_letter_text:
-                        # Create PDFs
-                        resume_pdf = create_resume_pdf(st.session_state.user_data)
-                        cover_letter_pdf = create_cover_letter_pdf(cover_letter_text, st.session_state.user_data)
-                        
-                        if resume_pdf and cover_letter_pdf:
-                            # Display results
-                            st.success("Documents generated successfully!")
-
-                            #Display Resume
-                            # st.subheader("Generated Resume")
-                            # st.text_area("Resume", value=resume_pdf, height=800, disabled=True)
-                            
-                            # Display cover letter
-                            st.subheader("Generated Cover Letter")
-                            st.text_area("Cover Letter", value=cover_letter_text, height=400, disabled=True)
-
-                            with col1:
-                                st.download_button(
-                                    label="📄 Download Resume (PDF)",
-                                    data=resume_pdf.getvalue(),
-                                    file_name=f"{st.session_state.user_data['name'].replace(' ', '_')}_resume.pdf",
-                                    mime="application/pdf"
-                                )
-                            
-                            with col2:
-                                st.download_button(
-                                    label="📄 Download Cover Letter (PDF)",
-                                    data=cover_letter_pdf.getvalue(),
-                                    file_name=f"{st.session_state.user_data['name'].replace(' ', '_')}_cover_letter.pdf",
-                                    mime="application/pdf"
-                                )
-
-                            st.text_area("Copy Cover Letter Text", value=cover_letter_text, height=200, disabled=True)
-                        else:
-                            st.error("Failed to create PDF documents. Please try again.")
-                        
-                    else:
-                        st.error("Failed to generate cover letter. Please check your API key and try again.")
-
-                except Exception as e:
-                    st.error(f"An error occurred while generating documents: {str(e)}")
-
-        if st.button("Previous: Education & Job"):
-            st.session_state.current_step = 4
-            st.rerun()
-        
+        except Exception as e:
+            st.error(f"An error occurred while generating documents: {str(e)}")
 
-        
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Cover letter cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+    if 'cover_letter_drafts' in st.session_state:
+        render_draft_picker()
+
+    job_running = 'generation_job' in st.session_state and render_generation_job()
+
+    # Downloads are served from the artifact store, so they survive reruns without regenerating
+    render_generated_documents(col1, col2)
+
+    st.button("Previous: Education & Job", on_click=go_to_step, args=(4,))
+
+    if job_running:
+        # Poll the queue until the job finishes
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
+
+STEP_RENDERERS = {
+    1: render_personal_info_step,
+    2: render_experience_step,
+    3: render_projects_step,
+    4: render_education_step,
+    5: render_generate_step,
+}
+
+def main():
+    st.set_page_config(
+        page_title="Resume and Cover Letter Generator", 
+        page_icon="📄", 
+        layout="wide"
+    )
+    st.title("Resume and Cover Letter Generator")
+    st.markdown("Generate professional resumes and cover letters using AI.")
+    # st.write("This application uses Google Gemini AI to create tailored resumes and cover letters based on your input.")
+
+    if missing_api_key():
+        st.error("Please set the GEMINI_API_KEY environment variable.")
+        st.stop()
+
+    if 'current_step' not in st.session_state:
+        st.session_state.current_step = 1
+    if 'profile_version' not in st.session_state:
+        st.session_state.profile_version = 0
+    if 'user_data' not in st.session_state:
+        st.session_state.user_data = empty_profile()
+
+    render_sidebar()
+    track_step_transition()
+
+    # Only the current step is rendered; its inputs live in a form so typing does not rerun the app
+    STEP_RENDERERS[st.session_state.current_step]()
+
+    # The page is on screen: load what step 5 needs while the user fills in the form
+    prewarm(
+        ('llm', lambda: get_llm_client(MODEL_NAME)),
+        ('pdf', warm_up),
+        ('matching', lambda: importlib.import_module('matching')),
+    )
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,156 @@
+"""
+Content-addressed store for generated documents
+
+Rendered PDFs are saved under their SHA-256 digest, so identical outputs are
+stored once and a download can be served again after a rerun without
+regenerating anything. Recently used artifacts are kept as a single shared
+bytes object so reruns do not read the document again (iter_chunks() streams
+one without loading it whole). Old and least recently used files are evicted to
+stay within the configured age and size limits.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+CHUNK_SIZE = 64 * 1024
+
+# Temporary files of a put() in progress; ones left by a crashed writer are removed after this
+TMP_GRACE_SECONDS = 3600
+
+
+class ArtifactStore:
+    """Deduplicating file store keyed by content hash"""
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024, max_age=7 * 24 * 3600,
+                 memory_items=32, evict_interval=60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory_items = memory_items
+        self.evict_interval = evict_interval
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Store bytes (or any buffer such as BytesIO.getbuffer()) and return its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            # Duplicate output: refresh its position for LRU eviction instead of writing again
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        self._maybe_evict(keep=digest)
+        return digest
+
+    def iter_chunks(self, digest, chunk_size=CHUNK_SIZE):
+        """Stream the artifact in chunks without loading it whole"""
+        with open(self.path(digest), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read_bytes(self, digest):
+        """Return the artifact as bytes, reusing the same object for recent artifacts"""
+        with self._lock:
+            data = self._memory.get(digest)
+            if data is not None:
+                self._memory.move_to_end(digest)
+                return data
+        with open(self.path(digest), 'rb') as f:
+            data = f.read()
+        os.utime(self.path(digest))
+        with self._lock:
+            self._memory[digest] = data
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        return data
+
+    def _maybe_evict(self, keep=None):
+        now = time.time()
+        if now - self._last_eviction >= self.evict_interval:
+            self._last_eviction = now
+            self.evict(keep=keep)
+
+    def evict(self, keep=None):
+        """Delete expired artifacts, then the least recently used until under max_bytes
+
+        keep names a digest that must survive this pass (the artifact just stored).
+        """
+        now = time.time()
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith('.tmp'):
+                    # Another writer's put() may still be filling it in
+                    if now - stat.st_mtime > TMP_GRACE_SECONDS:
+                        try:
+                            os.remove(path)
+                        except FileNotFoundError:
+                            pass
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        removed = 0
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            expired = self.max_age is not None and now - mtime > self.max_age
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or over_size) or os.path.basename(path) == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            with self._lock:
+                self._memory.pop(os.path.basename(path), None)
+        return removed
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """Return the process-wide store configured by the ARTIFACT_* settings"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            max_age_days = float(os.getenv('ARTIFACT_MAX_AGE_DAYS', '7'))
+            _default_store = ArtifactStore(
+                os.getenv('ARTIFACT_DIR', os.path.join('.data', 'artifacts')),
+                max_bytes=int(float(os.getenv('ARTIFACT_MAX_MB', '512')) * 1024 * 1024),
+                max_age=max_age_days * 24 * 3600 if max_age_days > 0 else None,
+            )
+        return _default_store
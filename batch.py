@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Headless batch generation of resumes and cover letters
+
+Reads candidate profiles (the same schema as st.session_state.user_data) and job
+descriptions from JSONL or CSV files, generates a cover letter for every
+candidate x job pair on a bounded worker pool and writes the PDFs plus a
+manifest to an output directory.
+
+Example:
+    python batch.py --candidates candidates.jsonl --jobs jobs.csv --output out/
+    python batch.py --candidates candidates.jsonl --jobs jobs.jsonl --output out/ --backend stub
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import app
+from llm_client import AsyncLLMClient, ModelBackend, backend_from_env, gemini_model, uses_gemini
+from job_ingest import ingest_job_description
+from matching import ProfileMatcher
+from pdf_templates import DEFAULT_RESUME_LAYOUT, resume_layouts
+
+MANIFEST_FILE = 'manifest.jsonl'
+SUMMARY_FILE = 'summary.json'
+
+# Fields of user_data that hold lists of entries; in CSV files they are JSON-encoded
+LIST_FIELDS = ('experience', 'projects', 'education', 'certifications')
+_UNSAFE_ID = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def safe_id(value):
+    """Turn an arbitrary identifier into something usable as a directory name"""
+    return _UNSAFE_ID.sub('_', str(value)).strip('_') or 'item'
+
+
+def read_records(path):
+    """Read a list of dicts from a .jsonl or .csv file"""
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records
+
+
+def normalize_candidate(record, index):
+    """Fill in the user_data schema from a raw candidate record"""
+    user_data = {
+        'name': '',
+        'email': '',
+        'phone': '',
+        'current_role': '',
+        'years_of_experience': '',
+        'summary': '',
+        'skills': [],
+        'experience': [],
+        'education': [],
+        'projects': [],
+        'certifications': [],
+    }
+    user_data.update({k: v for k, v in record.items() if v is not None})
+
+    # CSV cells arrive as strings
+    if isinstance(user_data['skills'], str):
+        user_data['skills'] = [skill.strip() for skill in user_data['skills'].split(',') if skill.strip()]
+    for field in LIST_FIELDS:
+        if isinstance(user_data[field], str):
+            user_data[field] = json.loads(user_data[field]) if user_data[field].strip() else []
+
+    candidate_id = safe_id(record.get('id') or user_data['email'] or f"candidate_{index + 1}")
+    return candidate_id, user_data
+
+
+def normalize_job(record, index):
+    """Return (job_id, job_description) from a raw job record"""
+    description = record.get('job_description') or record.get('description') or record.get('text') or ''
+    job_id = safe_id(record.get('id') or f"job_{index + 1}")
+    return job_id, description
+
+
+def load_manifest(output_dir):
+    """Return the latest manifest entry per item id"""
+    entries = {}
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry['item_id']] = entry
+    return entries
+
+
+def is_complete(entry, output_dir):
+    """An item is done when it succeeded and its files are still on disk"""
+    if not entry or entry.get('status') != 'ok':
+        return False
+    return all(os.path.exists(os.path.join(output_dir, p)) for p in entry.get('files', {}).values())
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_resume(candidate_id, user_data, output_dir, layout, fit_pages=None):
+    """Render one candidate's resume PDF (shared by all of their jobs)
+
+    Returns the relative path, the seconds taken and, with fit_pages, the fit outcome.
+    """
+    relative_path = os.path.join(candidate_id, 'resume.pdf')
+    path = os.path.join(output_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = time.perf_counter()
+    # Large resumes are written straight to disk instead of through an in-memory buffer
+    with open(path + '.tmp', 'wb') as f:
+        fit = app.write_resume_pdf(user_data, f, layout=layout, fit_pages=fit_pages)
+    os.replace(path + '.tmp', path)
+    return relative_path, time.perf_counter() - start, fit
+
+
+def build_item(candidate_id, job_id, user_data, job_description, output_dir, client):
+    """Generate the cover letter and its PDF for one candidate x job pair"""
+    timings = {}
+    start = time.perf_counter()
+    cover_letter_text = app.generate_cover_letter_text(user_data, job_description, client=client)
+    timings['generate'] = time.perf_counter() - start
+    if not cover_letter_text:
+        raise ValueError("The model returned an empty cover letter")
+
+    start = time.perf_counter()
+    buffer = app.render_cover_letter_pdf(cover_letter_text, user_data)
+    timings['cover_letter_pdf'] = time.perf_counter() - start
+
+    letter_dir = os.path.join(candidate_id, job_id)
+    files = {
+        'cover_letter_pdf': os.path.join(letter_dir, 'cover_letter.pdf'),
+        'cover_letter_txt': os.path.join(letter_dir, 'cover_letter.txt'),
+    }
+    write_file(os.path.join(output_dir, files['cover_letter_pdf']), buffer.getvalue())
+    write_file(os.path.join(output_dir, files['cover_letter_txt']), cover_letter_text.encode('utf-8'))
+    return files, timings
+
+
+def make_client(args):
+    """Create the LLM client for the backend selected on the command line"""
+    if args.backend == 'stub':
+        from fake_llm import FakeModel
+        backend = ModelBackend(FakeModel(latency=args.stub_latency, error_rate=args.stub_error_rate, seed=args.seed))
+    elif args.backend == 'env':
+        if uses_gemini() and not os.getenv('GEMINI_API_KEY'):
+            raise SystemExit("GEMINI_API_KEY is not set but the configured backends include Gemini")
+        backend = backend_from_env(app.MODEL_NAME)
+    elif not os.getenv('GEMINI_API_KEY'):
+        raise SystemExit("GEMINI_API_KEY is not set; use --backend stub for an offline run")
+    else:
+        backend = ModelBackend(gemini_model(app.MODEL_NAME))
+
+    return AsyncLLMClient(
+        backend,
+        max_concurrency=args.workers,
+        rate_limit=args.rate_limit,
+        max_retries=args.max_retries,
+        timeout=args.timeout,
+    )
+
+
+def score_pairs(pairs):
+    """Local match score of every (candidate, job) pair, one matrix product per candidate"""
+    jobs_by_candidate = {}
+    profiles = {}
+    for (candidate_id, user_data), (job_id, job_description) in pairs:
+        profiles[candidate_id] = user_data
+        jobs_by_candidate.setdefault(candidate_id, {})[job_id] = ingest_job_description(job_description).text
+    scores = {}
+    for candidate_id, candidate_jobs in jobs_by_candidate.items():
+        job_ids = list(candidate_jobs)
+        overall = ProfileMatcher(profiles[candidate_id]).score_many([candidate_jobs[j] for j in job_ids])[:, -1]
+        for job_id, score in zip(job_ids, overall):
+            scores[f"{candidate_id}/{job_id}"] = round(float(score), 4)
+    return scores
+
+
+def run_batch(candidates, jobs, output_dir, client, workers=4, resume=True, pairing='cross',
+              layout=DEFAULT_RESUME_LAYOUT, min_match=0.0, fit_pages=None, log=print):
+    """Generate documents for every candidate x job pair and return a summary dict
+
+    Pairs whose local match score is below min_match are skipped without calling the LLM.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    previous = load_manifest(output_dir) if resume else {}
+
+    if pairing == 'zip':
+        pairs = list(zip(candidates, jobs))
+    else:
+        pairs = [(candidate, job) for candidate in candidates for job in jobs]
+
+    match_scores = score_pairs(pairs)
+    pending = []
+    skipped = 0
+    below_match = 0
+    for (candidate_id, user_data), (job_id, job_description) in pairs:
+        item_id = f"{candidate_id}/{job_id}"
+        if match_scores[item_id] < min_match:
+            below_match += 1
+        elif is_complete(previous.get(item_id), output_dir):
+            skipped += 1
+        else:
+            pending.append((item_id, candidate_id, job_id, user_data, job_description))
+
+    succeeded = 0
+    failed = 0
+    start = time.perf_counter()
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path, 'a', encoding='utf-8') as manifest, ThreadPoolExecutor(max_workers=workers) as pool:
+        # Resumes depend only on the candidate, so render each one once
+        resume_futures = {}
+        for _, candidate_id, _, user_data, _ in pending:
+            resume_file = os.path.join(output_dir, candidate_id, 'resume.pdf')
+            if candidate_id not in resume_futures and not (resume and os.path.exists(resume_file)):
+                resume_futures[candidate_id] = pool.submit(
+                    build_resume, candidate_id, user_data, output_dir, layout, fit_pages
+                )
+
+        item_futures = {
+            pool.submit(build_item, candidate_id, job_id, user_data, job_description, output_dir, client):
+                (item_id, candidate_id, job_id)
+            for item_id, candidate_id, job_id, user_data, job_description in pending
+        }
+
+        for future in as_completed(item_futures):
+            item_id, candidate_id, job_id = item_futures[future]
+            entry = {'item_id': item_id, 'candidate_id': candidate_id, 'job_id': job_id,
+                     'match_score': match_scores[item_id], 'finished_at': time.time()}
+            try:
+                files, timings = future.result()
+                resume_future = resume_futures.get(candidate_id)
+                if resume_future is not None:
+                    _, timings['resume_pdf'], fit = resume_future.result()
+                    if fit and not fit['fits']:
+                        entry['resume_warning'] = fit['summary']
+                files['resume_pdf'] = os.path.join(candidate_id, 'resume.pdf')
+                entry.update(status='ok', files=files, timings=timings)
+                succeeded += 1
+            except Exception as e:
+                entry.update(status='error', error=f"{type(e).__name__}: {e}",
+                             traceback=traceback.format_exc(limit=5))
+                failed += 1
+                log(f"❌ {item_id}: {entry['error']}")
+            manifest.write(json.dumps(entry) + '\n')
+            manifest.flush()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'total': len(pairs),
+        'succeeded': succeeded,
+        'failed': failed,
+        'skipped': skipped,
+        'below_match': below_match,
+        'job_tokens_saved': sum(ingest_job_description(text).tokens_saved for _, text in jobs),
+        'elapsed_seconds': round(elapsed, 3),
+        'jobs_per_minute': round(succeeded / elapsed * 60, 2) if elapsed > 0 else 0.0,
+        'workers': workers,
+    }
+    if hasattr(client.backend, 'stats'):
+        summary['backends'] = client.backend.stats()
+    with open(os.path.join(output_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate resumes and cover letters for many candidates and jobs")
+    parser.add_argument('--candidates', required=True, help="JSONL or CSV file of candidate profiles")
+    parser.add_argument('--jobs', required=True, help="JSONL or CSV file of job descriptions")
+    parser.add_argument('--output', required=True, help="Directory for PDFs and the manifest")
+    parser.add_argument('--workers', type=int, default=4, help="Maximum concurrent generations (default 4)")
+    parser.add_argument('--pairing', choices=['cross', 'zip'], default='cross',
+                        help="cross: every candidate x every job; zip: pair line by line")
+    parser.add_argument('--layout', choices=resume_layouts(), default=DEFAULT_RESUME_LAYOUT,
+                        help="Resume PDF layout")
+    parser.add_argument('--fit-pages', type=int, default=None,
+                        help="Fit each resume to at most this many pages (tighter spacing and type, then fewer entries)")
+    parser.add_argument('--min-match', type=float, default=0.0,
+                        help="Skip pairs whose local match score (0-1) is below this")
+    parser.add_argument('--no-resume', action='store_true', help="Regenerate items already in the manifest")
+    parser.add_argument('--backend', choices=['gemini', 'stub', 'env'], default='gemini',
+                        help="LLM backend; 'stub' runs offline with a deterministic fake model, "
+                             "'env' uses LLM_BACKEND or the LLM_ROUTES router")
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="Seconds per stub generation")
+    parser.add_argument('--stub-error-rate', type=float, default=0.0, help="Fraction of stub calls that fail")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the stub backend")
+    parser.add_argument('--rate-limit', type=float, default=None, help="Maximum LLM requests per second")
+    parser.add_argument('--max-retries', type=int, default=3, help="Retries for transient LLM failures")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-request LLM timeout in seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    candidates = [normalize_candidate(r, i) for i, r in enumerate(read_records(args.candidates))]
+    jobs = [normalize_job(r, i) for i, r in enumerate(read_records(args.jobs))]
+    print(f"📦 {len(candidates)} candidates x {len(jobs)} jobs ({args.pairing})")
+
+    summary = run_batch(
+        candidates, jobs, args.output, make_client(args),
+        workers=args.workers, resume=not args.no_resume, pairing=args.pairing,
+        layout=args.layout, min_match=args.min_match, fit_pages=args.fit_pages
+    )
+
+    print(f"✅ {summary['succeeded']} succeeded, ❌ {summary['failed']} failed, ⏭️  {summary['skipped']} skipped")
+    if summary['below_match']:
+        print(f"🔍 {summary['below_match']} pairs skipped below --min-match {args.min_match}")
+    print(f"🧹 Cleaning job descriptions saved ~{summary['job_tokens_saved']} prompt tokens per candidate")
+    print(f"⏱️  {summary['elapsed_seconds']}s, {summary['jobs_per_minute']} jobs/min with {summary['workers']} workers")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the generation pipeline
+
+Run from the project root, e.g. python -m benchmarks.bench_templates
+"""
@@ -0,0 +1,133 @@
+"""
+Background job queue under N concurrent simulated users
+
+Each simulated user is a thread that submits a job, polls its status the way
+step 5 does and submits the next job once the result is in. Jobs run on a
+pool of worker processes. The default job sleeps for --work-ms to isolate
+queue overhead; --job generate runs the real generation handler against the
+fake LLM backend (its latency set with FAKE_LLM_LATENCY).
+
+    python -m benchmarks.bench_job_queue --users 1,8,32 --workers 4
+    python -m benchmarks.bench_job_queue --job generate --users 4,16 --workers 4
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import job_queue
+from benchmarks.bench_pipeline import percentile
+
+SIMULATED_HANDLER = {'simulated': 'benchmarks.bench_job_queue:simulated_job'}
+
+
+def simulated_job(payload, job):
+    time.sleep(payload['work_ms'] / 1000)
+    return {'ok': True}
+
+
+def generation_payload(seed):
+    from benchmarks.synthetic import make_job_description, make_profile
+    user_data = make_profile('typical', seed=seed)
+    user_data['job_description'] = make_job_description(seed)
+    # A fresh letter every time so the response cache does not hide the work
+    return {'user_data': user_data, 'layout': 'classic', 'bypass_cache': True}
+
+
+def simulate_user(queue, kind, payloads, poll_interval, deadline, samples):
+    for payload in payloads:
+        if time.perf_counter() > deadline:
+            return
+        start = time.perf_counter()
+        job_id = queue.submit(kind, payload, priority=job_queue.PRIORITY_INTERACTIVE)
+        while True:
+            time.sleep(poll_interval)
+            job = queue.get(job_id)
+            if job.finished:
+                break
+        samples.append((time.perf_counter() - start, job.started_at - job.created_at, job.status))
+
+
+def run_level(db_path, users, jobs_per_user, kind, make_payload, poll_interval, duration):
+    queue = job_queue.JobQueue(db_path)
+    samples = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(
+            target=simulate_user,
+            args=(queue, kind, [make_payload(user * jobs_per_user + i) for i in range(jobs_per_user)],
+                  poll_interval, deadline, samples)
+        )
+        for user in range(users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(sample[0] for sample in samples)
+    waits = sorted(sample[1] for sample in samples)
+    return {
+        'users': users,
+        'jobs': len(samples),
+        'failed': sum(sample[2] != job_queue.DONE for sample in samples),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'wait_p95_ms': percentile(waits, 95) * 1000,
+        'jobs_per_second': len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the background job queue")
+    parser.add_argument('--users', default='1,8,32', help="Comma-separated concurrent user counts")
+    parser.add_argument('--workers', type=int, default=4, help="Worker processes")
+    parser.add_argument('--jobs-per-user', type=int, default=5)
+    parser.add_argument('--job', choices=('simulated', 'generate'), default='simulated')
+    parser.add_argument('--work-ms', type=float, default=50, help="Duration of a simulated job")
+    parser.add_argument('--poll-ms', type=float, default=50, help="Status polling interval of a user")
+    parser.add_argument('--duration', type=float, default=60, help="Stop submitting after this many seconds")
+    args = parser.parse_args()
+
+    if args.job == 'generate':
+        os.environ.setdefault('LLM_BACKEND', 'fake')
+        os.environ.setdefault('FAKE_LLM_LATENCY', '0.2')
+        kind, make_payload = 'generate_documents', generation_payload
+    else:
+        job_queue.HANDLERS.update(SIMULATED_HANDLER)
+        kind, make_payload = 'simulated', (lambda seed: {'work_ms': args.work_ms})
+
+    directory = tempfile.mkdtemp(prefix='bench-jobs-')
+    os.environ['ARTIFACT_DIR'] = os.path.join(directory, 'artifacts')
+    db_path = os.path.join(directory, 'jobs.sqlite3')
+    job_queue.JobQueue(db_path)
+    pool = job_queue.WorkerPool(db_path, workers=args.workers, poll_interval=0.01, handlers=SIMULATED_HANDLER)
+    try:
+        # Let the spawned workers finish importing before timing
+        warmup = job_queue.JobQueue(db_path)
+        warmup_ids = [warmup.submit(kind, make_payload(-1 - i)) for i in range(args.workers)]
+        while not all(warmup.get(job_id).finished for job_id in warmup_ids):
+            time.sleep(0.05)
+
+        print(f"job={args.job} workers={args.workers} poll={args.poll_ms:.0f}ms"
+              + (f" work={args.work_ms:.0f}ms" if args.job == 'simulated' else ''))
+        print(f"{'users':>6}{'jobs':>6}{'failed':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'wait p95':>10}{'jobs/s':>8}")
+        for users in (int(value) for value in args.users.split(',')):
+            row = run_level(db_path, users, args.jobs_per_user, kind, make_payload,
+                            args.poll_ms / 1000, args.duration)
+            print(f"{row['users']:>6}{row['jobs']:>6}{row['failed']:>7}{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}"
+                  f"{row['p99_ms']:>9.0f}{row['wait_p95_ms']:>10.0f}{row['jobs_per_second']:>8.1f}")
+    finally:
+        pool.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
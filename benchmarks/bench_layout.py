@@ -0,0 +1,125 @@
+"""
+Fitting resumes to N pages: layout passes, time and cache use per document
+
+For synthetic profiles of several lengths and each --pages target, it reports
+the layout passes fit_document() took and its time with a cold and a warm
+measurement cache. For comparison, a naive fit builds the PDF for every
+attempt (each spacing/type step in turn, then one more left-out entry at a
+time). It then checks that the simulated page counts agree with real builds
+at every step of the ladder.
+
+    python -m benchmarks.bench_layout
+    python -m benchmarks.bench_layout --profiles 10 --pages 1 2 --layout compact
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+import pdf_layout
+from benchmarks.synthetic import make_job_description, make_profile
+from documents import pdf_flowables, resume_document
+from matching import match_profile
+from pdf_templates import get_template
+
+# (label, profile size, how many times experience and projects are repeated)
+PROFILES = (('small', 'small', 1), ('typical', 'typical', 1), ('long', 'typical', 3), ('very long', 'typical', 6))
+
+
+def make_document(size, repeat, seed):
+    user_data = make_profile(size, seed=seed)
+    for key in ('experience', 'projects'):
+        user_data[key] = user_data.get(key, []) * repeat
+    scores = match_profile(user_data, make_job_description(seed)).scores
+    return resume_document(user_data), scores
+
+
+def real_pages(document, layout, font_scale, spacing_scale):
+    template = get_template(layout)
+    styles = pdf_layout.scaled_styles(template.styles, font_scale, spacing_scale)
+    doc = template.new_doc(io.BytesIO())
+    doc.build(list(pdf_flowables(document, styles, spacing=spacing_scale)))
+    return doc.page
+
+
+def naive_fit(document, layout, max_pages, scores):
+    """Build the PDF for each attempt until one fits; returns the number of builds"""
+    builds = 0
+    for font_scale, spacing_scale in pdf_layout.LADDER:
+        builds += 1
+        if real_pages(document, layout, font_scale, spacing_scale) <= max_pages:
+            return builds
+    removable = pdf_layout.trim_order(document, scores)
+    font_scale, spacing_scale = pdf_layout.LADDER[-1]
+    for count in range(1, len(removable) + 1):
+        builds += 1
+        trimmed = pdf_layout.without_entries(document, removable[:count])
+        if real_pages(trimmed, layout, font_scale, spacing_scale) <= max_pages:
+            break
+    return builds
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fitting resumes to a page count")
+    parser.add_argument('--profiles', type=int, default=5, help="Profiles of each length")
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--layout', default='classic')
+    parser.add_argument('--skip-naive', action='store_true', help="Skip the build-every-attempt comparison")
+    args = parser.parse_args()
+
+    # Imports, fonts and the template registry
+    real_pages(make_document('small', 1, 0)[0], args.layout, 1.0, 1.0)
+
+    print(f"{args.profiles} profiles per length, layout {args.layout}")
+    print(f"{'profile':<11}{'pages':>6}{'passes':>8}{'cold ms':>9}{'warm ms':>9}{'hit rate':>10}"
+          f"{'builds':>8}{'naive ms':>10}{'  result'}")
+    cache = pdf_layout.get_measure_cache()
+    for label, size, repeat in PROFILES:
+        documents = [make_document(size, repeat, seed) for seed in range(args.profiles)]
+        for max_pages in args.pages:
+            passes, cold, warm, builds, naive = [], [], [], [], []
+            hits = misses = 0
+            outcomes = set()
+            for document, scores in documents:
+                cache.clear()
+                fit, cold_ms = timed(lambda: pdf_layout.fit_document(document, args.layout, max_pages, scores, cache))
+                _, warm_ms = timed(lambda: pdf_layout.fit_document(document, args.layout, max_pages, scores, cache))
+                hits, misses = hits + cache.hits, misses + cache.misses
+                passes.append(fit.passes)
+                cold.append(cold_ms)
+                warm.append(warm_ms)
+                outcomes.add('fits' if fit.fits else 'too long')
+                if not args.skip_naive:
+                    count, naive_ms = timed(lambda: naive_fit(document, args.layout, max_pages, scores))
+                    builds.append(count)
+                    naive.append(naive_ms)
+            builds_column = f"{statistics.mean(builds):.1f}" if builds else '-'
+            naive_column = f"{statistics.median(naive):.1f}" if naive else '-'
+            print(f"{label:<11}{max_pages:>6}{statistics.mean(passes):>8.1f}{statistics.median(cold):>9.1f}"
+                  f"{statistics.median(warm):>9.1f}{hits / max(hits + misses, 1):>10.0%}"
+                  f"{builds_column:>8}{naive_column:>10}  {', '.join(sorted(outcomes))}")
+
+    agree = total = 0
+    frame = pdf_layout.FrameGeometry(get_template(args.layout).page_settings)
+    for _, size, repeat in PROFILES:
+        for seed in range(args.profiles):
+            document, _ = make_document(size, repeat, seed)
+            for font_scale, spacing_scale in pdf_layout.LADDER:
+                styles = pdf_layout.scaled_styles(get_template(args.layout).styles, font_scale, spacing_scale)
+                simulated = pdf_layout.paginate(
+                    pdf_layout.layout_items(document, styles, frame.width, spacing_scale, cache), frame
+                )
+                total += 1
+                agree += simulated == real_pages(document, args.layout, font_scale, spacing_scale)
+    print(f"\nsimulated page count matched the real build in {agree}/{total} layouts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Peak memory of building the resume story as a list versus lazily
+
+    python -m benchmarks.bench_lazy_pdf
+
+Each variant renders the same synthetic profile; the report shows wall time,
+peak traced Python memory and whether the PDF bytes are identical.
+"""
+
+import argparse
+import gc
+import io
+import time
+import tracemalloc
+
+import app
+from benchmarks.synthetic import make_profile
+from pdf_templates import DEFAULT_RESUME_LAYOUT, get_template
+
+
+def build_from_list(user_data, layout):
+    """The previous approach: the whole story is created before doc.build"""
+    buffer = io.BytesIO()
+    template = get_template(layout)
+    template.new_doc(buffer).build(app.resume_story(user_data, template.styles))
+    return buffer.getvalue()
+
+
+def build_lazily(user_data, layout):
+    buffer = io.BytesIO()
+    app.write_resume_pdf(user_data, buffer, layout=layout)
+    return buffer.getvalue()
+
+
+def measure(build, user_data, layout):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = build(user_data, layout)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list and lazy resume story building")
+    parser.add_argument('--layout', default=DEFAULT_RESUME_LAYOUT)
+    parser.add_argument('--sizes', nargs='+', default=['typical', 'huge'])
+    args = parser.parse_args()
+
+    # Build the shared styles outside the measurements
+    get_template(args.layout)
+
+    print(f"{'profile':<9}{'variant':<8}{'ms':>9}{'peak MB':>10}{'pdf KB':>9}  identical")
+    for size in args.sizes:
+        user_data = make_profile(size)
+        eager, eager_secs, eager_peak = measure(build_from_list, user_data, args.layout)
+        lazy, lazy_secs, lazy_peak = measure(build_lazily, user_data, args.layout)
+        for variant, data, secs, peak in (('list', eager, eager_secs, eager_peak),
+                                          ('lazy', lazy, lazy_secs, lazy_peak)):
+            print(f"{size:<9}{variant:<8}{secs * 1000:>9.1f}{peak / 2 ** 20:>10.2f}{len(data) / 1024:>9.1f}"
+                  f"  {'yes' if data == eager else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
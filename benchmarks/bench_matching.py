@@ -0,0 +1,58 @@
+"""
+Scoring one profile against many job descriptions with the matching engine
+
+Compares the vectorized ProfileMatcher with the per-entry keyword relevance
+used by prompt_budget, which scores one job at a time in pure Python.
+
+    python -m benchmarks.bench_matching --jobs 5000
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from benchmarks.synthetic import make_job_description, make_profile
+from matching import ProfileMatcher, profile_items
+from prompt_budget import keywords, relevance
+
+
+def keyword_baseline(user_data, job_descriptions):
+    texts = [text for _, _, _, text in profile_items(user_data)]
+    return [
+        [relevance(text, job_terms) for text in texts]
+        for job_terms in (Counter(keywords(job)) for job in job_descriptions)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local profile/job matching")
+    parser.add_argument('--jobs', type=int, default=5000, help="Number of synthetic job descriptions")
+    parser.add_argument('--baseline-jobs', type=int, default=500,
+                        help="Jobs scored with the keyword baseline (it is much slower)")
+    args = parser.parse_args()
+
+    job_descriptions = [make_job_description(seed) for seed in range(args.jobs)]
+
+    print(f"{'profile':<9}{'entries':>8}{'method':>10}{'jobs':>7}{'setup ms':>10}{'score ms':>10}{'jobs/s':>10}")
+    for size in ('small', 'typical', 'huge'):
+        user_data = make_profile(size)
+
+        start = time.perf_counter()
+        matcher = ProfileMatcher(user_data)
+        setup = time.perf_counter() - start
+        start = time.perf_counter()
+        matcher.score_many(job_descriptions)
+        elapsed = time.perf_counter() - start
+        print(f"{size:<9}{len(matcher.items):>8}{'tfidf':>10}{args.jobs:>7}{setup * 1000:>10.1f}"
+              f"{elapsed * 1000:>10.1f}{args.jobs / elapsed:>10.0f}")
+
+        baseline_jobs = job_descriptions[:args.baseline_jobs]
+        start = time.perf_counter()
+        keyword_baseline(user_data, baseline_jobs)
+        elapsed = time.perf_counter() - start
+        print(f"{size:<9}{len(matcher.items):>8}{'keywords':>10}{len(baseline_jobs):>7}{0:>10.1f}"
+              f"{elapsed * 1000:>10.1f}{len(baseline_jobs) / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
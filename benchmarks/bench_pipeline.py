@@ -0,0 +1,173 @@
+"""
+Benchmark the prompt -> LLM -> PDF pipeline
+
+Each (profile size, stage) pair runs in a fresh process so the reported peak
+RSS belongs to that stage alone. The LLM is the deterministic FakeModel with a
+configurable latency, so results only move when our code does.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes huge --iterations 5 --compare old.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: peak RSS is left out there
+    resource = None
+
+STAGES = ['prompt', 'llm', 'resume_pdf', 'cover_letter_pdf', 'end_to_end']
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'results', 'pipeline.json')
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, or None where the platform does not report it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def format_mb(value):
+    return f"{value:.1f}" if value is not None else '-'
+
+
+def summarize(latencies, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'iterations': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 4),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 4),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 4),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4),
+        'docs_per_second': round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def run_stage(stage, size, iterations, llm_latency, seed):
+    """Run one stage repeatedly in this (child) process and return its summary"""
+    import app
+    from benchmarks.synthetic import make_profile
+    from fake_llm import FakeModel
+    from llm_client import AsyncLLMClient, ModelBackend
+
+    user_data = make_profile(size, seed)
+    job_description = user_data['job_description']
+    client = AsyncLLMClient(ModelBackend(FakeModel(latency=llm_latency, seed=seed)), max_retries=0)
+    letter = FakeModel(seed=seed).generate_content(app.build_cover_letter_prompt(user_data, job_description)).text
+
+    def end_to_end():
+        text = app.generate_cover_letter_text(user_data, job_description, client=client, bypass_cache=True)
+        app.render_resume_pdf(user_data)
+        app.render_cover_letter_pdf(text, user_data)
+
+    operations = {
+        'prompt': lambda: app.build_cover_letter_prompt(user_data, job_description),
+        'llm': lambda: app.generate_cover_letter_text(user_data, job_description, client=client, bypass_cache=True),
+        'resume_pdf': lambda: app.render_resume_pdf(user_data),
+        'cover_letter_pdf': lambda: app.render_cover_letter_pdf(letter, user_data),
+        'end_to_end': end_to_end,
+    }
+    operation = operations[stage]
+
+    # One warm-up call so imports and template building are not measured
+    operation()
+    baseline_rss = peak_rss_mb()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    result = {'profile': size, 'stage': stage}
+    result.update(summarize(latencies, elapsed))
+    peak_rss = peak_rss_mb()
+    result['baseline_rss_mb'] = round(baseline_rss, 1) if baseline_rss is not None else None
+    result['peak_rss_mb'] = round(peak_rss, 1) if peak_rss is not None else None
+    return result
+
+
+def compare(results, previous_path):
+    """Print p50/p95 changes against a previous results file"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {(r['profile'], r['stage']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        old = previous.get((result['profile'], result['stage']))
+        if old is None:
+            continue
+        changes = []
+        for key in ('p50_ms', 'p95_ms', 'peak_rss_mb'):
+            if old.get(key) and result[key] is not None:
+                changes.append(f"{key} {(result[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"  {result['profile']:<8}{result['stage']:<18}" + ', '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt building, generation and PDF rendering")
+    parser.add_argument('--sizes', nargs='+', default=['small', 'typical', 'huge'],
+                        choices=['small', 'typical', 'huge'])
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Fake LLM latency in seconds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument('--compare', help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    print(f"{'profile':<9}{'stage':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'docs/s':>10}{'peak RSS MB':>13}")
+    for size in args.sizes:
+        for stage in args.stages:
+            # A fresh process per stage keeps peak RSS attributable to that stage
+            with context.Pool(1) as pool:
+                result = pool.apply(run_stage, (stage, size, args.iterations, args.llm_latency, args.seed))
+            results.append(result)
+            print(f"{size:<9}{stage:<18}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                  f"{result['p99_ms']:>10.2f}{result['docs_per_second']:>10.2f}{format_mb(result['peak_rss_mb']):>13}")
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'llm_latency': args.llm_latency,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
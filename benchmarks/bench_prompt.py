@@ -0,0 +1,60 @@
+"""
+Prompt size and generation latency with and without token-budgeted compaction
+
+The fake LLM charges latency per prompt token (--ms-per-1k-tokens), so the
+latency column shows what trimming the prompt saves end to end.
+
+    python -m benchmarks.bench_prompt --budget 4000
+"""
+
+import argparse
+import time
+
+import app
+from benchmarks.bench_pipeline import percentile
+from benchmarks.synthetic import make_profile
+from fake_llm import FakeModel
+from prompt_budget import compact_prompt, estimate_tokens
+
+
+def timed(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, percentile(sorted(samples), 50) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and compacted cover letter prompts")
+    parser.add_argument('--budget', type=int, default=app.PROMPT_TOKEN_BUDGET)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.2, help="Fixed fake LLM latency in seconds")
+    parser.add_argument('--ms-per-1k-tokens', type=float, default=50.0, help="Fake LLM latency per 1k prompt tokens")
+    args = parser.parse_args()
+
+    model = FakeModel(latency=args.latency, latency_per_1k_prompt_tokens=args.ms_per_1k_tokens / 1000)
+
+    print(f"{'profile':<9}{'variant':<11}{'chars':>9}{'tokens':>9}{'build ms':>10}{'LLM ms':>9}{'dropped':>9}")
+    for size in ('small', 'typical', 'huge'):
+        user_data = make_profile(size)
+        job_description = user_data['job_description']
+
+        full, full_build_ms = timed(lambda: app.build_cover_letter_prompt(user_data, job_description), args.iterations)
+        (compacted, report), compact_build_ms = timed(
+            lambda: compact_prompt(user_data, job_description, app.build_cover_letter_prompt, args.budget),
+            args.iterations
+        )
+
+        for variant, prompt, build_ms, dropped in (
+            ('full', full, full_build_ms, 0),
+            ('compacted', compacted, compact_build_ms, len(report.dropped)),
+        ):
+            _, llm_ms = timed(lambda: model.generate_content(prompt), args.iterations)
+            print(f"{size:<9}{variant:<11}{len(prompt):>9}{estimate_tokens(prompt):>9}"
+                  f"{build_ms:>10.2f}{llm_ms:>9.1f}{dropped:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+LLM router: tail latency with and without hedging
+
+Two fake backends stand in for a primary model with a slow tail (--tail-rate
+of its calls take --tail-latency longer) and a slightly slower but steady
+backup. The same requests run against the primary alone and through the
+router with hedging off, with a fixed hedge deadline and with the adaptive
+one (the primary's recent p95). It reports latency percentiles, the extra
+calls hedging cost and the per-backend stats the router keeps.
+
+    python -m benchmarks.bench_router
+    python -m benchmarks.bench_router --requests 500 --tail-rate 0.02 --hedge-after 0.3
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_pipeline import percentile
+from llm_client import AsyncLLMClient, ModelBackend
+from llm_router import router_from_config
+
+
+def routes_config(args, hedge_after):
+    return {
+        'slo': args.slo,
+        'hedge_after': hedge_after,
+        'routes': [
+            {'name': 'primary', 'backend': 'fake', 'model': 'primary', 'latency': args.latency, 'jitter': args.latency / 5,
+             'tail_rate': args.tail_rate, 'tail_latency': args.tail_latency, 'seed': 1},
+            {'name': 'backup', 'backend': 'fake', 'model': 'backup', 'latency': args.backup_latency,
+             'jitter': args.backup_latency / 5, 'seed': 2},
+        ],
+    }
+
+
+def run(backend, requests, concurrency):
+    client = AsyncLLMClient(backend, max_concurrency=concurrency, max_retries=0)
+
+    def one(index):
+        start = time.perf_counter()
+        client.generate_sync(f"request {index}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = sorted(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'requests_per_second': requests / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM routing and hedging")
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.1, help="Primary latency in seconds")
+    parser.add_argument('--tail-rate', type=float, default=0.05, help="Fraction of slow primary calls")
+    parser.add_argument('--tail-latency', type=float, default=1.5, help="Extra seconds of a slow call")
+    parser.add_argument('--backup-latency', type=float, default=0.15, help="Backup latency in seconds")
+    parser.add_argument('--hedge-after', type=float, default=0.25, help="Fixed hedge deadline in seconds")
+    parser.add_argument('--slo', type=float, default=2.0, help="Latency SLO in seconds")
+    args = parser.parse_args()
+
+    from fake_llm import FakeModel
+    primary_only = ModelBackend(FakeModel(
+        model_name='primary', latency=args.latency, jitter=args.latency / 5,
+        tail_rate=args.tail_rate, tail_latency=args.tail_latency, seed=1
+    ))
+    print(f"{args.requests} requests, concurrency {args.concurrency}, primary {args.latency * 1000:.0f}ms "
+          f"with {args.tail_rate:.0%} +{args.tail_latency * 1000:.0f}ms, backup {args.backup_latency * 1000:.0f}ms")
+    print(f"{'setup':<24}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}{'req/s':>8}{'hedged':>8}")
+
+    rows = [('primary only', primary_only)]
+    for label, hedge_after in (('router, no hedging', 0),
+                               (f"router, hedge {args.hedge_after * 1000:.0f}ms", args.hedge_after),
+                               ('router, hedge at p95', None)):
+        rows.append((label, router_from_config(routes_config(args, hedge_after))))
+
+    for label, backend in rows:
+        result = run(backend, args.requests, args.concurrency)
+        stats = backend.stats() if hasattr(backend, 'stats') else {}
+        hedged = f"{sum(route['hedges'] for route in stats.values()) / args.requests:.1%}" if stats else '-'
+        print(f"{label:<24}{result['p50_ms']:>8.0f}{result['p95_ms']:>8.0f}{result['p99_ms']:>8.0f}"
+              f"{result['max_ms']:>8.0f}{result['requests_per_second']:>8.1f}{hedged:>8}")
+        for name, route in stats.items():
+            print(f"    {name:<10} requests={route['requests']} errors={route['errors']} "
+                  f"p50={route['p50_ms'] or '-'}ms p95={route['p95_ms'] or '-'}ms hedges={route['hedges']} "
+                  f"wins={route['hedge_wins']} cancelled={route['cancelled']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Cold start: import time of app.py, the first script run and what is deferred
+
+Every sample runs in a fresh interpreter, as a new server process would:
+
+- import: `import streamlit` (already loaded in a running server) and then
+  `import app`, which must not load the modules in --deferred
+- first run: one AppTest run of step 1, the work before a new session's first
+  paint, followed by the background prewarm of what step 5 needs
+
+--profile N prints the N slowest imports under app from `python -X importtime`.
+The run exits with status 1 when a median is above its threshold or a
+deferred module is imported with app, so it can gate changes in CI.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --profile 25
+    python -m benchmarks.bench_startup --max-import-ms 250 --max-first-run-ms 1500 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFERRED = ('google.generativeai', 'reportlab', 'numpy')
+
+
+def measure_import():
+    deferred = [name for name in os.getenv('BENCH_STARTUP_DEFERRED', ','.join(DEFERRED)).split(',') if name]
+    start = time.perf_counter()
+    import streamlit  # noqa: F401
+    middle = time.perf_counter()
+    import app  # noqa: F401
+    end = time.perf_counter()
+    return {
+        'streamlit_ms': (middle - start) * 1000,
+        'import_ms': (end - middle) * 1000,
+        'deferred_loaded': [name for name in deferred if name in sys.modules],
+    }
+
+
+def measure_first_run():
+    from streamlit.testing.v1 import AppTest
+    import startup
+
+    at = AppTest.from_file('app.py', default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    if at.exception:
+        raise SystemExit(f"app.py raised: {at.exception[0].value}")
+
+    # Prewarm runs on a background thread once the page is rendered
+    deadline = time.perf_counter() + 30
+    while len(startup.results) < 3 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    return {
+        'first_run_ms': first_run * 1000,
+        'prewarm_ms': {
+            name: value * 1000 if isinstance(value, float) else repr(value)
+            for name, value in startup.results.items()
+        },
+    }
+
+
+CHILDREN = {'import': measure_import, 'first-run': measure_first_run}
+
+
+def child_environment(directory):
+    env = dict(os.environ)
+    env.update({
+        'LLM_BACKEND': 'fake',
+        'PROFILE_DB': os.path.join(directory, 'profiles.sqlite3'),
+        'ARTIFACT_DIR': os.path.join(directory, 'artifacts'),
+        'JOB_QUEUE_DB': os.path.join(directory, 'jobs.sqlite3'),
+        'JOB_WORKERS': '0',
+        'METRICS_ENABLED': '0',
+    })
+    return env
+
+
+def run_child(kind, env):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--child', kind],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def import_profile(env, top):
+    """The slowest imports beneath `import app` as (self_us, cumulative_us, name) rows"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import streamlit; import app'],
+        env=env, capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if name.strip() == 'streamlit' and not name.startswith('  '):
+            rows = []  # everything before this belongs to the streamlit import
+            continue
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+
+def summarize(samples, key):
+    values = sorted(sample[key] for sample in samples)
+    return {'median': statistics.median(values), 'min': values[0], 'max': values[-1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold start")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument('--profile', type=int, default=15, metavar='N',
+                        help="Show the N slowest imports under app (0 to skip)")
+    parser.add_argument('--max-import-ms', type=float, default=300,
+                        help="Fail when the median `import app` takes longer")
+    parser.add_argument('--max-first-run-ms', type=float, default=2000,
+                        help="Fail when the median first script run takes longer")
+    parser.add_argument('--deferred', default=','.join(DEFERRED),
+                        help="Comma-separated modules `import app` must not load")
+    parser.add_argument('--output', help="Write the results as JSON")
+    parser.add_argument('--child', choices=sorted(CHILDREN), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(CHILDREN[args.child]()))
+        return
+
+    with tempfile.TemporaryDirectory(prefix='bench-startup-') as directory:
+        env = child_environment(directory)
+        env['BENCH_STARTUP_DEFERRED'] = args.deferred
+        imports = [run_child('import', env) for _ in range(args.runs)]
+        first_runs = [run_child('first-run', env) for _ in range(args.runs)]
+        profile = import_profile(env, args.profile) if args.profile else []
+
+    results = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'streamlit_ms': summarize(imports, 'streamlit_ms'),
+        'import_ms': summarize(imports, 'import_ms'),
+        'first_run_ms': summarize(first_runs, 'first_run_ms'),
+        'prewarm_ms': first_runs[-1]['prewarm_ms'],
+        'deferred_loaded': sorted({name for sample in imports for name in sample['deferred_loaded']}),
+    }
+
+    print(f"{'measurement':<22}{'median ms':>11}{'min ms':>9}{'max ms':>9}{'limit ms':>10}")
+    for label, key, limit in (('import streamlit', 'streamlit_ms', None),
+                              ('import app', 'import_ms', args.max_import_ms),
+                              ('first script run', 'first_run_ms', args.max_first_run_ms)):
+        row = results[key]
+        print(f"{label:<22}{row['median']:>11.0f}{row['min']:>9.0f}{row['max']:>9.0f}"
+              f"{limit if limit is not None else '-':>10}")
+    print("prewarm (background): " + ', '.join(
+        f"{name} {value:.0f}ms" if isinstance(value, float) else f"{name} failed: {value}"
+        for name, value in results['prewarm_ms'].items()
+    ))
+
+    if profile:
+        print("\nslowest imports under app (python -X importtime):")
+        print(f"{'self ms':>9}{'cumul ms':>10}  module")
+        for self_us, cumulative_us, name in profile:
+            print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f} {name}")
+
+    failures = []
+    if results['import_ms']['median'] > args.max_import_ms:
+        failures.append(f"import app took {results['import_ms']['median']:.0f}ms (limit {args.max_import_ms:.0f}ms)")
+    if results['first_run_ms']['median'] > args.max_first_run_ms:
+        failures.append(f"first script run took {results['first_run_ms']['median']:.0f}ms "
+                        f"(limit {args.max_first_run_ms:.0f}ms)")
+    if results['deferred_loaded']:
+        failures.append(f"import app loaded deferred modules: {', '.join(results['deferred_loaded'])}")
+    results['failures'] = failures
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if failures:
+        print('\nREGRESSION: ' + '; '.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
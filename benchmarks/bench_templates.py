@@ -0,0 +1,86 @@
+"""
+Per-document cost of stylesheet setup: shared templates vs building styles per render
+
+    python -m benchmarks.bench_templates --documents 500
+"""
+
+import argparse
+import io
+import time
+
+from reportlab.lib.enums import TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from pdf_templates import get_template
+
+SMALL_PROFILE = {
+    'name': 'Jane Doe',
+    'email': 'jane@example.com',
+    'phone': '+1 555 0100',
+    'current_role': 'Software Engineer',
+    'skills': ['Python', 'SQL'],
+    'experience': [{'title': 'Engineer', 'company': 'Acme', 'duration': '2020 - Present', 'description': 'Built APIs.'}],
+}
+
+
+def legacy_setup(buffer):
+    """What create_resume_pdf did before templates were shared"""
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30, alignment=TA_LEFT)
+    heading_style = ParagraphStyle('CustomHeading', parent=styles['Heading2'], fontSize=14, spaceAfter=12,
+                                   spaceBefore=20, alignment=TA_LEFT)
+    return doc, title_style, heading_style, styles['Normal']
+
+
+def shared_setup(buffer):
+    template = get_template('classic')
+    styles = template.styles
+    return template.new_doc(buffer), styles['title'], styles['heading'], styles['normal']
+
+
+def render_small(setup):
+    buffer = io.BytesIO()
+    doc, title_style, heading_style, normal_style = setup(buffer)
+    story = [
+        Paragraph(SMALL_PROFILE['name'], title_style),
+        Paragraph(SMALL_PROFILE['email'], normal_style),
+        Paragraph('SKILLS', heading_style),
+        Paragraph(', '.join(SMALL_PROFILE['skills']), normal_style),
+    ]
+    doc.build(story)
+
+
+def time_per_call(func, documents):
+    start = time.perf_counter()
+    for _ in range(documents):
+        func()
+    return (time.perf_counter() - start) / documents * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--documents', type=int, default=300)
+    args = parser.parse_args()
+
+    # Warm up imports, fonts and the template registry
+    render_small(legacy_setup)
+    render_small(shared_setup)
+
+    results = {
+        'setup only': (time_per_call(lambda: legacy_setup(io.BytesIO()), args.documents),
+                       time_per_call(lambda: shared_setup(io.BytesIO()), args.documents)),
+        'small document': (time_per_call(lambda: render_small(legacy_setup), args.documents),
+                           time_per_call(lambda: render_small(shared_setup), args.documents)),
+    }
+
+    print(f"{'':<16}{'per-render (ms)':>16}{'shared (ms)':>14}{'saved':>9}")
+    for name, (legacy_ms, shared_ms) in results.items():
+        saved = (legacy_ms - shared_ms) / legacy_ms * 100 if legacy_ms else 0.0
+        print(f"{name:<16}{legacy_ms:>16.3f}{shared_ms:>14.3f}{saved:>8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
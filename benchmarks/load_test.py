@@ -0,0 +1,316 @@
+"""
+Load test: many concurrent wizard sessions in one Streamlit process
+
+Each simulated user drives app.py through Streamlit's AppTest the way a person
+does: fills in steps 1-4 (one script run per click, with think time between
+clicks) and generates the documents in step 5. All sessions share this one
+process, like sessions of one `streamlit run app.py` server, so its script
+reruns, PDF rendering and LLM client limits are what saturate.
+
+The model is the fake backend (FAKE_LLM_LATENCY / --llm-latency, --llm-jitter,
+--error-rate); every session uses its own job description, so the response
+cache does not hide LLM calls. For each concurrency level it reports
+completed and failed sessions, sessions per second, latency percentiles of
+ordinary step clicks and of the generate click, CPU use (in cores) and RSS.
+The levels together are the saturation curve; the knee is where throughput
+stops growing while latency keeps rising.
+
+    python -m benchmarks.load_test --users 1,2,4,8,16 --duration 30
+    python -m benchmarks.load_test --users 8 --llm-latency 2 --error-rate 0.05 --output load.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: RSS is left out there
+    resource = None
+
+from benchmarks.bench_pipeline import percentile
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+GENERATE_LABEL = "Generate Resume & Cover Letter"
+
+
+def configure_environment(args, directory):
+    """Point the app at the fake model and throwaway stores before it is imported"""
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['FAKE_LLM_LATENCY'] = str(args.llm_latency)
+    os.environ['FAKE_LLM_JITTER'] = str(args.llm_jitter)
+    os.environ['FAKE_LLM_ERROR_RATE'] = str(args.error_rate)
+    os.environ['PROFILE_DB'] = os.path.join(directory, 'profiles.sqlite3')
+    os.environ['ARTIFACT_DIR'] = os.path.join(directory, 'artifacts')
+    os.environ['JOB_QUEUE_DB'] = os.path.join(directory, 'jobs.sqlite3')
+    os.environ.setdefault('METRICS_ENABLED', '0')
+
+
+def share_server_state():
+    """Make concurrent AppTest sessions share what one Streamlit server shares
+
+    AppTest installs a mock Runtime before every script run and removes it
+    afterwards; with concurrent sessions one session's teardown would pull it
+    from under another's run, so a single runtime is kept instead. Each run
+    also compiles app.py into a fresh script cache, where a server compiles it
+    once for all sessions (and concurrent compiles can fail on Python 3.11).
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    shared = MagicMock(spec=Runtime)
+    shared.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: shared)
+    Runtime.exists = classmethod(lambda cls: True)
+
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def rss_mb():
+    """Current resident set size (peak where only that is reported), or None if unknown"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+class Session:
+    """One simulated user walking through the wizard"""
+
+    def __init__(self, session_id, think_time, timeout, profile_size):
+        from benchmarks.synthetic import make_job_description, make_profile
+        self.session_id = session_id
+        self.think_time = think_time
+        self.timeout = timeout
+        self.profile = make_profile(profile_size, seed=session_id)
+        # A unique posting per session, so every generate calls the model
+        self.job_description = f"Posting {session_id}\n\n" + make_job_description(session_id)
+        self.step_latencies = []
+        self.generate_latency = None
+        self._random = random.Random(session_id)
+
+    def _click(self, at, label, generate=False):
+        time.sleep(self._random.uniform(0.5, 1.5) * self.think_time)
+        button = next(b for b in at.button if b.label == label)
+        start = time.perf_counter()
+        button.click().run(timeout=self.timeout)
+        elapsed = time.perf_counter() - start
+        if generate:
+            self.generate_latency = elapsed
+        else:
+            self.step_latencies.append(elapsed)
+        if at.exception:
+            raise RuntimeError(f"Script error after {label!r}: {at.exception[0].value}")
+
+    def run(self):
+        from streamlit.testing.v1 import AppTest
+        profile = self.profile
+        start = time.perf_counter()
+        at = AppTest.from_file(APP_PATH, default_timeout=self.timeout).run()
+        self.step_latencies.append(time.perf_counter() - start)
+
+        at.text_input(key='name').input(profile['name'])
+        at.text_input(key='email').input(f"load{self.session_id}@example.com")
+        at.text_input(key='phone').input(profile['phone'])
+        at.text_input(key='current_role').input(profile['current_role'])
+        self._click(at, "Next: Skills & Experience")
+
+        at.text_input(key='skills_input').input(', '.join(profile['skills']))
+        self._click(at, "Add Experience")
+        experience = profile['experience'][0]
+        at.text_input(key='title_0').input(experience['title'])
+        at.text_input(key='company_0').input(experience['company'])
+        at.text_area(key='desc_0').input(experience['description'])
+        self._click(at, "Next: Projects and Certifications")
+        self._click(at, "Next: Education & Job")
+
+        at.text_area(key='job_description').input(self.job_description)
+        self._click(at, "Next: Generate Documents")
+        self._click(at, GENERATE_LABEL, generate=True)
+
+        errors = [element.value for element in at.error]
+        if errors or not at.session_state['generated_documents']:
+            raise RuntimeError(errors[0] if errors else "No documents were generated")
+
+
+def run_level(users, args):
+    """Run users concurrent sessions back to back for args.duration seconds"""
+    lock = threading.Lock()
+    results = {'completed': 0, 'failed': 0, 'errors': {}, 'steps': [], 'generate': [], 'sessions': []}
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + args.duration
+    peak_rss = [rss_mb()]
+
+    def user_loop(user):
+        while time.perf_counter() < deadline:
+            with lock:
+                session_id = users * 100000 + next(counter)
+            session = Session(session_id, args.think_time, args.timeout, args.profile)
+            start = time.perf_counter()
+            try:
+                session.run()
+                ok, error = True, None
+            except Exception as e:
+                ok, error = False, str(e).splitlines()[0][:80] if str(e) else type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                results['steps'].extend(session.step_latencies)
+                if ok:
+                    results['completed'] += 1
+                    results['sessions'].append(elapsed)
+                    results['generate'].append(session.generate_latency)
+                else:
+                    results['failed'] += 1
+                    results['errors'][error] = results['errors'].get(error, 0) + 1
+
+    def sample_memory(stop):
+        while peak_rss[0] is not None and not stop.wait(0.25):
+            peak_rss[0] = max(peak_rss[0], rss_mb())
+
+    stop = threading.Event()
+    sampler = threading.Thread(target=sample_memory, args=(stop,), daemon=True)
+    sampler.start()
+    cpu_start = cpu_seconds()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user_loop, args=(user,), daemon=True) for user in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu = cpu_seconds() - cpu_start
+    stop.set()
+
+    steps = sorted(results['steps'])
+    generate = sorted(results['generate'])
+    sessions = sorted(results['sessions'])
+    total = results['completed'] + results['failed']
+    return {
+        'users': users,
+        'completed': results['completed'],
+        'failed': results['failed'],
+        'error_rate': round(results['failed'] / total, 4) if total else 0.0,
+        'errors': results['errors'],
+        'sessions_per_second': round(results['completed'] / elapsed, 3),
+        'session_p50_s': round(percentile(sessions, 50), 3),
+        'step_p50_ms': round(percentile(steps, 50) * 1000, 1),
+        'step_p95_ms': round(percentile(steps, 95) * 1000, 1),
+        'step_p99_ms': round(percentile(steps, 99) * 1000, 1),
+        'generate_p50_ms': round(percentile(generate, 50) * 1000, 1),
+        'generate_p95_ms': round(percentile(generate, 95) * 1000, 1),
+        'generate_p99_ms': round(percentile(generate, 99) * 1000, 1),
+        'cpu_cores': round(cpu / elapsed, 2),
+        'peak_rss_mb': round(peak_rss[0], 1) if peak_rss[0] is not None else None,
+        'elapsed_s': round(elapsed, 1),
+    }
+
+
+def find_knee(rows, min_gain=0.1):
+    """Highest level whose throughput still grew by at least min_gain over the previous one"""
+    knee = rows[0]['users'] if rows else None
+    for previous, row in zip(rows, rows[1:]):
+        if previous['sessions_per_second'] and (
+            row['sessions_per_second'] / previous['sessions_per_second'] - 1 >= min_gain
+        ):
+            knee = row['users']
+        else:
+            break
+    return knee
+
+
+def print_curve(rows):
+    """Throughput and generate p95 per level as a text chart"""
+    best = max((row['sessions_per_second'] for row in rows), default=0) or 1
+    print("\nSaturation curve (sessions/s, generate p95):")
+    for row in rows:
+        bar = '#' * max(1, round(row['sessions_per_second'] / best * 40))
+        print(f"{row['users']:>5} users |{bar:<40}| {row['sessions_per_second']:.2f}/s  "
+              f"{row['generate_p95_ms'] / 1000:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test app.py with concurrent simulated sessions")
+    parser.add_argument('--users', default='1,2,4,8,16', help="Comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to keep starting sessions per level")
+    parser.add_argument('--think-time', type=float, default=0.5, help="Mean seconds between clicks")
+    parser.add_argument('--llm-latency', type=float, default=1.0, help="Fake model latency in seconds")
+    parser.add_argument('--llm-jitter', type=float, default=0.2, help="Fake model latency jitter in seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of fake model calls that fail")
+    parser.add_argument('--profile', default='typical', choices=('small', 'typical', 'huge'),
+                        help="Synthetic profile size that drives the PDFs and prompt")
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds before a script run counts as failed")
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='load-test-')
+    configure_environment(args, directory)
+    share_server_state()
+
+    rows = []
+    print(f"llm={args.llm_latency}s±{args.llm_jitter}s errors={args.error_rate:.0%} think={args.think_time}s "
+          f"profile={args.profile} duration={args.duration}s per level")
+    print(f"{'users':>5}{'done':>6}{'fail':>6}{'sess/s':>8}{'step p50':>10}{'step p95':>10}{'gen p50':>9}"
+          f"{'gen p95':>9}{'gen p99':>9}{'cpu':>6}{'RSS MB':>8}")
+    for users in (int(value) for value in args.users.split(',')):
+        row = run_level(users, args)
+        rows.append(row)
+        rss = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] is not None else '-'
+        print(f"{row['users']:>5}{row['completed']:>6}{row['failed']:>6}{row['sessions_per_second']:>8.2f}"
+              f"{row['step_p50_ms']:>10.0f}{row['step_p95_ms']:>10.0f}{row['generate_p50_ms']:>9.0f}"
+              f"{row['generate_p95_ms']:>9.0f}{row['generate_p99_ms']:>9.0f}{row['cpu_cores']:>6.2f}"
+              f"{rss:>8}")
+        for error, count in row['errors'].items():
+            print(f"      {count} x {error}")
+
+    print_curve(rows)
+    knee = find_knee(rows)
+    if knee is not None and len(rows) > 1 and knee == rows[-1]['users']:
+        print(f"\nThroughput was still growing at {knee} users; add higher levels to find the knee.")
+    elif knee is not None:
+        print(f"\nThroughput stops growing by 10% or more after {knee} concurrent users.")
+
+    if args.output:
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'args': vars(args),
+            },
+            'knee_users': knee,
+            'results': rows,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Deterministic synthetic profiles and job descriptions for benchmarks
+
+Profiles follow the st.session_state.user_data schema. The same size and seed
+always produce the same data, so benchmark runs are comparable.
+"""
+
+import random
+
+SKILLS = [
+    'Python', 'JavaScript', 'TypeScript', 'React', 'Node.js', 'SQL', 'PostgreSQL', 'Docker',
+    'Kubernetes', 'AWS', 'GCP', 'Terraform', 'Go', 'Rust', 'Java', 'Kotlin', 'Spark', 'Airflow',
+    'Pandas', 'NumPy', 'Machine Learning', 'CI/CD', 'GraphQL', 'REST APIs', 'Redis', 'Kafka',
+]
+TITLES = ['Software Engineer', 'Senior Software Engineer', 'Data Engineer', 'Backend Developer',
+          'Frontend Developer', 'Platform Engineer', 'Machine Learning Engineer', 'Tech Lead']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises']
+VERBS = ['Built', 'Designed', 'Led', 'Migrated', 'Optimized', 'Automated', 'Scaled', 'Maintained']
+OBJECTS = ['a payments API', 'the data pipeline', 'an internal dashboard', 'the search service',
+           'a recommendation engine', 'the CI system', 'a mobile backend', 'the billing platform']
+OUTCOMES = ['reducing latency by 40%', 'serving 2M daily users', 'cutting costs by 30%',
+            'improving reliability to 99.95%', 'halving deployment time', 'supporting 12 teams']
+
+# Entry counts per profile size
+PROFILE_SIZES = {
+    'small': {'skills': 5, 'experience': 1, 'projects': 1, 'education': 1, 'certifications': 0, 'sentences': 1},
+    'typical': {'skills': 12, 'experience': 4, 'projects': 3, 'education': 2, 'certifications': 2, 'sentences': 3},
+    'huge': {'skills': 26, 'experience': 300, 'projects': 200, 'education': 10, 'certifications': 50, 'sentences': 5},
+}
+
+
+def _sentence(rng):
+    return f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(SKILLS)}, {rng.choice(OUTCOMES)}."
+
+
+def _description(rng, sentences):
+    return ' '.join(_sentence(rng) for _ in range(sentences))
+
+
+def make_profile(size='typical', seed=0):
+    """Return a user_data dict of the given size ('small', 'typical' or 'huge')"""
+    counts = PROFILE_SIZES[size]
+    rng = random.Random(f"{size}-{seed}")
+    return {
+        'name': 'Alex Example',
+        'email': f'alex.{size}.{seed}@example.com',
+        'phone': '+1 (555) 010-0000',
+        'current_role': rng.choice(TITLES),
+        'years_of_experience': str(rng.randint(1, 25)),
+        'summary': _description(rng, counts['sentences']),
+        'skills': rng.sample(SKILLS, counts['skills']),
+        'experience': [
+            {
+                'title': rng.choice(TITLES),
+                'company': rng.choice(COMPANIES),
+                'duration': f"{2000 + i % 24} - {2001 + i % 24}",
+                'description': _description(rng, counts['sentences']),
+            }
+            for i in range(counts['experience'])
+        ],
+        'projects': [
+            {
+                'title': f"Project {i + 1}",
+                'tech': ', '.join(rng.sample(SKILLS, 3)),
+                'duration': f"{2010 + i % 14}",
+                'description': _description(rng, counts['sentences']),
+            }
+            for i in range(counts['projects'])
+        ],
+        'education': [
+            {'degree': 'BSc Computer Science', 'institution': f"University {i + 1}", 'year': str(2000 + i)}
+            for i in range(counts['education'])
+        ],
+        'certifications': [{'title': f"Certification {i + 1}"} for i in range(counts['certifications'])],
+        'job_description': make_job_description(seed),
+    }
+
+
+def make_job_description(seed=0, paragraphs=4):
+    """Return a job posting with responsibilities, requirements and boilerplate"""
+    rng = random.Random(f"job-{seed}")
+    title = rng.choice(TITLES)
+    company = rng.choice(COMPANIES)
+    required = rng.sample(SKILLS, 6)
+    lines = [
+        f"{title} at {company}",
+        '',
+        f"{company} is hiring a {title} to join our growing engineering team.",
+        '',
+        'Responsibilities:',
+    ]
+    lines += [f"- {_sentence(rng)}" for _ in range(paragraphs)]
+    lines += ['', 'Requirements:']
+    lines += [f"- {rng.randint(2, 8)}+ years of experience with {skill}" for skill in required]
+    lines += [
+        '',
+        f"{company} is an equal opportunity employer. All qualified applicants will receive consideration "
+        "for employment without regard to race, color, religion, sex, sexual orientation, gender identity, "
+        "national origin, disability or veteran status.",
+    ]
+    return '\n'.join(lines)
@@ -0,0 +1,377 @@
+"""
+Format-neutral document model and renderers for PDF, HTML, Markdown, text and DOCX
+
+resume_document() and cover_letter_document() turn user_data (and the
+generated letter) into a Document: an ordered list of blocks such as title,
+heading, text, bullet and space. Every output format is rendered from that
+model, so the content is assembled once however many formats are exported.
+export_bundle() renders all requested formats for both documents in parallel.
+
+DOCX output needs the optional python-docx package; without it the format is
+left out of available_formats().
+"""
+
+import html
+import importlib.util
+import io
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pdf_templates import COVER_LETTER_LAYOUT, DEFAULT_RESUME_LAYOUT, LazyStory, get_template
+
+RESUME = 'resume'
+COVER_LETTER = 'cover_letter'
+
+
+class Block:
+    """One piece of a document: kind is title, heading, text, bullet or space
+
+    entry is (section, index) for blocks that belong to one profile entry and
+    (section, None) for a section heading, so an entry can be left out whole.
+    """
+
+    __slots__ = ('kind', 'text', 'size', 'entry')
+
+    def __init__(self, kind, text='', size=0, entry=None):
+        self.kind = kind
+        self.text = text
+        self.size = size
+        self.entry = entry
+
+    def __getstate__(self):
+        return (self.kind, self.text, self.size, self.entry)
+
+    def __setstate__(self, state):
+        self.kind, self.text, self.size, self.entry = state
+
+
+class Document:
+    """A resume or cover letter as an ordered list of blocks"""
+
+    def __init__(self, kind, blocks, title=''):
+        self.kind = kind
+        self.blocks = blocks
+        self.title = title
+
+
+def resume_document(user_data):
+    """Build the resume model from user_data"""
+    blocks = []
+    add = blocks.append
+
+    # Header
+    add(Block('title', user_data.get('name', '')))
+    add(Block('text', user_data.get('email', '')))
+    add(Block('text', user_data.get('phone', '')))
+    if user_data.get('current_role'):
+        add(Block('text', f"Current Role: {user_data['current_role']}"))
+    if user_data.get('years_of_experience'):
+        add(Block('text', f"Years of Experience: {user_data['years_of_experience']}"))
+    add(Block('space', size=20))
+
+    # Professional Summary
+    if user_data.get('summary'):
+        add(Block('heading', 'PROFESSIONAL SUMMARY'))
+        add(Block('text', user_data['summary']))
+        add(Block('space', size=12))
+
+    # Education
+    if user_data.get('education'):
+        add(Block('heading', 'EDUCATION', entry=('education', None)))
+        for index, edu in enumerate(user_data['education']):
+            entry = ('education', index)
+            edu_text = f"{edu.get('degree', '')} - {edu.get('institution', '')}"
+            if edu.get('year'):
+                edu_text += f" ({edu['year']})"
+            add(Block('text', edu_text, entry=entry))
+            add(Block('space', size=6, entry=entry))
+
+    # Skills
+    if user_data.get('skills'):
+        add(Block('heading', 'SKILLS'))
+        add(Block('text', ', '.join(user_data['skills'])))
+
+    # Work Experience
+    if user_data.get('experience'):
+        add(Block('heading', 'PROFESSIONAL EXPERIENCE', entry=('experience', None)))
+        for index, exp in enumerate(user_data['experience']):
+            entry = ('experience', index)
+            add(Block('text', f"{exp.get('title', '')} - {exp.get('company', '')}", entry=entry))
+            add(Block('text', exp.get('duration', ''), entry=entry))
+            add(Block('bullet', exp.get('description', ''), entry=entry))
+            add(Block('space', size=12, entry=entry))
+
+    # Projects
+    if user_data.get('projects'):
+        add(Block('heading', 'PROJECTS', entry=('projects', None)))
+        for index, proj in enumerate(user_data['projects']):
+            entry = ('projects', index)
+            add(Block('text', f"{proj.get('title', '')} - {proj.get('duration', '')}", entry=entry))
+            if proj.get('tech'):
+                add(Block('text', f"Tech Stack: {proj['tech']}", entry=entry))
+            add(Block('bullet', proj.get('description', ''), entry=entry))
+            add(Block('space', size=12, entry=entry))
+
+    # Certifications
+    if user_data.get('certifications'):
+        add(Block('heading', 'CERTIFICATIONS', entry=('certifications', None)))
+        for index, cert in enumerate(user_data['certifications']):
+            entry = ('certifications', index)
+            add(Block('text', f"{cert.get('title', '')}", entry=entry))
+            add(Block('space', size=6, entry=entry))
+
+    return Document(RESUME, blocks, title=f"{user_data.get('name', '')} - Resume")
+
+
+def cover_letter_document(cover_letter_text, user_data, date=None):
+    """Build the cover letter model from the generated text"""
+    blocks = [
+        # Header
+        Block('heading', user_data.get('name', '')),
+        Block('text', user_data.get('email', '')),
+        Block('text', user_data.get('phone', '')),
+        Block('space', size=20),
+        # Date
+        Block('text', (date or datetime.now()).strftime("%B %d, %Y")),
+        Block('space', size=20),
+    ]
+    for paragraph in cover_letter_text.split('\n\n'):
+        if paragraph.strip():
+            blocks.append(Block('text', paragraph))
+            blocks.append(Block('space', size=12))
+    return Document(COVER_LETTER, blocks, title=f"{user_data.get('name', '')} - Cover Letter")
+
+
+# Renderers: each takes a Document (and the PDF layout) and returns bytes
+
+def pdf_flowables(document, styles, spacing=1.0):
+    """Yield ReportLab flowables for a document using a template's styles
+
+    spacing scales the blank space between blocks (see pdf_layout).
+    """
+    from reportlab.platypus import Paragraph, Spacer
+    style_for = {'title': styles['title'], 'heading': styles['heading'], 'text': styles['normal']}
+    for block in document.blocks:
+        if block.kind == 'space':
+            yield Spacer(1, block.size * spacing)
+        elif block.kind == 'bullet':
+            yield Paragraph(f"• {block.text}", styles['normal'])
+        else:
+            yield Paragraph(block.text, style_for[block.kind])
+
+
+def write_pdf(document, target, layout=None):
+    """Build a document's PDF into a file path or writable file object"""
+    if layout is None:
+        layout = COVER_LETTER_LAYOUT if document.kind == COVER_LETTER else DEFAULT_RESUME_LAYOUT
+    template = get_template(layout)
+    template.new_doc(target).build(LazyStory(pdf_flowables(document, template.styles)))
+
+
+def render_pdf(document, layout=None):
+    buffer = io.BytesIO()
+    write_pdf(document, buffer, layout)
+    return buffer.getvalue()
+
+
+def _grouped(blocks):
+    """Yield (kind, [blocks]) with consecutive bullets grouped into one list"""
+    group = []
+    for block in blocks:
+        if block.kind == 'bullet':
+            group.append(block)
+            continue
+        if group:
+            yield 'bullets', group
+            group = []
+        yield block.kind, [block]
+    if group:
+        yield 'bullets', group
+
+
+def render_html(document, layout=None):
+    parts = [
+        '<!DOCTYPE html>',
+        '<html lang="en"><head><meta charset="utf-8">',
+        f'<title>{html.escape(document.title)}</title>',
+        '<style>body{font-family:Helvetica,Arial,sans-serif;max-width:46em;margin:2em auto;line-height:1.4;'
+        'color:#222}h1{font-size:1.6em;margin-bottom:.3em}h2{font-size:1.1em;margin:1.4em 0 .4em;'
+        'color:#2c3e50}p{margin:.2em 0}</style>',
+        '</head><body>',
+    ]
+    for kind, blocks in _grouped(document.blocks):
+        if kind == 'bullets':
+            items = ''.join(f'<li>{html.escape(block.text)}</li>' for block in blocks)
+            parts.append(f'<ul>{items}</ul>')
+        elif kind == 'title':
+            parts.append(f'<h1>{html.escape(blocks[0].text)}</h1>')
+        elif kind == 'heading':
+            parts.append(f'<h2>{html.escape(blocks[0].text)}</h2>')
+        elif kind == 'text':
+            text = html.escape(blocks[0].text).replace('\n', '<br>')
+            parts.append(f'<p>{text}</p>')
+        elif kind == 'space':
+            parts.append(f'<div style="height:{blocks[0].size}px"></div>')
+    parts.append('</body></html>')
+    return '\n'.join(parts).encode('utf-8')
+
+
+_MARKDOWN_INLINE = re.compile(r'([\\`*_\[\]<>])')
+_MARKDOWN_LINE_START = re.compile(r'^(\s*)([#+>-]|\d+\.)', re.MULTILINE)
+
+
+def _md(text):
+    """Escape text so it renders literally in Markdown"""
+    return _MARKDOWN_LINE_START.sub(r'\1\\\2', _MARKDOWN_INLINE.sub(r'\\\1', text))
+
+
+def render_markdown(document, layout=None):
+    lines = []
+
+    def blank():
+        if lines and lines[-1] != '':
+            lines.append('')
+
+    for kind, blocks in _grouped(document.blocks):
+        if kind == 'bullets':
+            blank()
+            lines.extend(f"- {_md(block.text)}" for block in blocks)
+            blank()
+        elif kind in ('title', 'heading'):
+            blank()
+            lines += [f"{'#' if kind == 'title' else '##'} {_md(blocks[0].text)}", '']
+        elif kind == 'text':
+            # A trailing backslash keeps consecutive lines (e.g. the header) apart
+            if lines and lines[-1] != '' and not lines[-1].startswith('#'):
+                lines[-1] += '\\'
+            lines.append(_md(blocks[0].text).replace('\n', '\\\n'))
+        elif kind == 'space':
+            blank()
+    return ('\n'.join(lines).strip() + '\n').encode('utf-8')
+
+
+def render_text(document, layout=None):
+    """Plain text for ATS portals: no markup, blank lines between sections"""
+    lines = []
+    for block in document.blocks:
+        if block.kind == 'space':
+            if lines and lines[-1] != '':
+                lines.append('')
+        elif block.kind == 'heading':
+            if lines and lines[-1] != '':
+                lines.append('')
+            lines.append(block.text)
+        elif block.kind == 'bullet':
+            lines.append(f"- {block.text}")
+        else:
+            lines.append(block.text)
+    return ('\n'.join(lines).strip() + '\n').encode('utf-8')
+
+
+def render_docx(document, layout=None):
+    import docx  # optional dependency (python-docx)
+
+    word = docx.Document()
+    word.core_properties.title = document.title
+    for block in document.blocks:
+        if block.kind == 'title':
+            word.add_heading(block.text, level=0)
+        elif block.kind == 'heading':
+            word.add_heading(block.text, level=1)
+        elif block.kind == 'bullet':
+            word.add_paragraph(block.text, style='List Bullet')
+        elif block.kind == 'text':
+            word.add_paragraph(block.text)
+    buffer = io.BytesIO()
+    word.save(buffer)
+    return buffer.getvalue()
+
+
+class Format:
+    def __init__(self, name, render, extension, mime, requires=None):
+        self.name = name
+        self.render = render
+        self.extension = extension
+        self.mime = mime
+        self.requires = requires
+
+
+FORMATS = {}
+
+
+def register_format(name, render, extension, mime, requires=None):
+    """Add an output format; requires names an optional module the renderer imports"""
+    FORMATS[name] = Format(name, render, extension, mime, requires)
+
+
+register_format('pdf', render_pdf, 'pdf', 'application/pdf')
+register_format('docx', render_docx, 'docx',
+                'application/vnd.openxmlformats-officedocument.wordprocessingml.document', requires='docx')
+register_format('html', render_html, 'html', 'text/html')
+register_format('md', render_markdown, 'md', 'text/markdown')
+register_format('txt', render_text, 'txt', 'text/plain')
+
+
+def available_formats():
+    """Formats whose optional dependencies are installed"""
+    return [
+        name for name, fmt in FORMATS.items()
+        if fmt.requires is None or importlib.util.find_spec(fmt.requires) is not None
+    ]
+
+
+def render(document, format_name, layout=None):
+    return FORMATS[format_name].render(document, layout)
+
+
+def export_bundle(user_data, cover_letter_text, formats=None, layout=DEFAULT_RESUME_LAYOUT, executor=None,
+                  rendered=None, resume=None):
+    """Render both documents in every format in parallel; return {file name: bytes}
+
+    The document models are built once and shared by all renderers. Pass an
+    executor (e.g. a process pool) to control where rendering runs. Outputs in
+    rendered ({(document kind, format name): bytes}, e.g. a page-fitted resume
+    PDF) are used as they are instead of being rendered again. resume replaces
+    the resume model built from user_data, e.g. with the page-fitted one
+    (Fit.document), so every format has the same content as that PDF.
+    """
+    rendered = rendered or {}
+    formats = formats or available_formats()
+    documents = [(RESUME, resume or resume_document(user_data), layout)]
+    if cover_letter_text:
+        documents.append((COVER_LETTER, cover_letter_document(cover_letter_text, user_data), None))
+
+    stem = (user_data.get('name') or 'document').replace(' ', '_')
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=min(8, len(documents) * len(formats)))
+    try:
+        futures = {
+            f"{stem}_{kind}.{FORMATS[name].extension}": (
+                rendered[kind, name] if (kind, name) in rendered
+                else executor.submit(render, document, name, doc_layout)
+            )
+            for kind, document, doc_layout in documents
+            for name in formats
+        }
+        return {
+            file_name: output if isinstance(output, bytes) else output.result()
+            for file_name, output in futures.items()
+        }
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+def bundle_zip(files):
+    """Pack {file name: bytes} into a ZIP archive"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for file_name, data in sorted(files.items()):
+            # Fixed timestamps keep the archive identical for identical documents
+            info = zipfile.ZipInfo(file_name, date_time=(2000, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data)
+    return buffer.getvalue()
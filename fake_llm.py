@@ -0,0 +1,111 @@
+"""
+Deterministic stand-in for the Gemini model, for batch runs, benchmarks and tests
+
+FakeModel mirrors the parts of genai.GenerativeModel the app uses:
+generate_content(prompt) returns an object with .text and .usage_metadata, and
+generate_content(prompt, stream=True) returns an iterable of such chunks, and
+generation_config={'candidate_count': n} returns n different letters in
+.candidates, like the Gemini API. tail_rate of the calls take tail_latency
+seconds longer, for the long latency tail hedging is meant to cut.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+_PARAGRAPHS = [
+    "I am writing to express my interest in this position. My background aligns closely "
+    "with the requirements described, and I am excited about the opportunity to contribute.",
+    "In my recent roles I have delivered projects end to end, collaborating with product and "
+    "engineering teams to ship reliable, well-tested software on schedule.",
+    "I have applied the skills listed in the job description in production settings and I "
+    "enjoy learning new tools as the needs of the team evolve.",
+    "Thank you for considering my application. I would welcome the chance to discuss how I "
+    "can help your team, and I look forward to hearing from you about an interview.",
+]
+
+
+class FakeLLMError(Exception):
+    """Raised by FakeModel to simulate a transient backend failure"""
+
+    # Retried like a 503 from a real backend (see llm_client.is_transient)
+    code = 503
+
+
+class FakeModel:
+    """Offline model with configurable latency and error rate"""
+
+    def __init__(self, model_name='fake-model', latency=0.0, jitter=0.0, error_rate=0.0,
+                 first_token_latency=None, latency_per_1k_prompt_tokens=0.0, tail_rate=0.0, tail_latency=0.0,
+                 seed=0):
+        self.model_name = model_name
+        self.latency = latency
+        self.latency_per_1k_prompt_tokens = latency_per_1k_prompt_tokens
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.first_token_latency = latency / 4 if first_token_latency is None else first_token_latency
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self, prompt):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+            if self.tail_rate and self._random.random() < self.tail_rate:
+                delay += self.tail_latency
+        # Real models take longer to read longer prompts
+        delay += len(prompt) / 4 / 1000 * self.latency_per_1k_prompt_tokens
+        return delay, failed
+
+    def _letter(self, prompt, candidate=0):
+        # Pick paragraphs from the prompt hash so the same prompt always yields the same letter
+        seed = prompt if not candidate else f"{prompt}\x00{candidate}"
+        digest = hashlib.sha256(seed.encode('utf-8')).digest()
+        order = sorted(range(len(_PARAGRAPHS) - 1), key=lambda i: digest[i])
+        body = [_PARAGRAPHS[i] for i in order] + [_PARAGRAPHS[-1]]
+        return "Dear Hiring Manager,\n\n" + '\n\n'.join(body) + "\n\nSincerely,\nThe Candidate"
+
+    def _response(self, prompt, text, candidates=None):
+        prompt_tokens = max(1, len(prompt) // 4)
+        output_tokens = sum(max(1, len(t) // 4) for t in candidates or [text])
+        return SimpleNamespace(
+            text=text,
+            candidates=[
+                SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=t)]))
+                for t in candidates or [text]
+            ],
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        delay, failed = self._draw(prompt)
+        if stream:
+            return self._stream(prompt, delay, failed)
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError("Simulated backend failure")
+        count = (generation_config or {}).get('candidate_count', 1)
+        letters = [self._letter(prompt, candidate) for candidate in range(count)]
+        return self._response(prompt, letters[0], letters)
+
+    def _stream(self, prompt, delay, failed):
+        time.sleep(min(delay, self.first_token_latency))
+        if failed:
+            raise FakeLLMError("Simulated backend failure")
+        text = self._letter(prompt)
+        pieces = text.split('\n\n')
+        remaining = max(0.0, delay - self.first_token_latency)
+        for index, piece in enumerate(pieces):
+            if index:
+                time.sleep(remaining / (len(pieces) - 1))
+            yield self._response(prompt, piece + ('\n\n' if index < len(pieces) - 1 else ''))
@@ -0,0 +1,289 @@
+"""
+Job description ingestion: clean, deduplicate and extract structured fields
+
+Pasted postings carry navigation text, repeated equal-opportunity statements,
+application instructions and whitespace noise that cost prompt tokens without
+helping the letter. ingest_job_description() converts HTML to text, normalizes
+whitespace and bullets, drops duplicate and boilerplate paragraphs and pulls
+out the title, company, seniority, years of experience and skills. Results are
+cached by content hash, so a posting shared by many candidates (for example in
+batch runs) is processed once.
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+from html.parser import HTMLParser
+
+from prompt_budget import estimate_tokens
+from response_cache import MemoryCache
+
+# Paragraphs matching any of these are application/legal boilerplate
+BOILERPLATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'equal (employment )?opportunity',
+    r'\beeo\b',
+    r'without regard to (race|age|sex|gender)',
+    r'reasonable accommodation',
+    # Legal notices only, as whole lines: "Must pass a background check and hold a clearance" is a requirement
+    r'^\W*(all |any )?(offers?( of employment)?|employment|hiring)\b[^.]*\b(contingent|conditional|subject to)\b'
+    r'[^.]*\bbackground (check|screening)s?\b[^.]*\.?\W*$',
+    r'e-?verify',
+    r'^\W*((read|view|see|review) )?(our |the )?(applicant |candidate )?privacy (notice|policy)( here)?\W*$',
+    r'^\W*by (applying|submitting|clicking)\b[^.]*\bprivacy (notice|policy)\b[^.]*\.?\W*$',
+    r'(we|this site) uses? cookies',
+    # Bare call-to-action lines only: "Apply statistical methods to..." is a requirement
+    r'^\W*(apply|apply now|save job|share this job|report this job|easy apply)\W*$',
+    r'^(show more|show less|see more|read more)$',
+    r'recruit(ers|ment agencies)? (should|must) not',
+    r'unsolicited (resumes|applications)',
+)]
+
+SENIORITY_LEVELS = (
+    ('intern', r'\b(intern|internship)\b'),
+    ('junior', r'\b(junior|jr\.?|entry[- ]level|graduate)\b'),
+    ('principal', r'\b(principal|distinguished)\b'),
+    ('staff', r'\bstaff\b'),
+    ('lead', r'\b(lead|tech lead|team lead)\b'),
+    ('senior', r'\b(senior|sr\.?)\b'),
+    ('manager', r'\b(manager|head of|director)\b'),
+    ('mid', r'\b(mid[- ]level|intermediate)\b'),
+)
+
+# Skills recognized in postings; matched case-insensitively on word boundaries
+SKILL_VOCABULARY = (
+    'Python', 'Java', 'JavaScript', 'TypeScript', 'Go', 'Golang', 'Rust', 'C++', 'C#', 'Ruby', 'PHP',
+    'Kotlin', 'Swift', 'Scala', 'SQL', 'NoSQL', 'PostgreSQL', 'MySQL', 'MongoDB', 'Redis',
+    'Elasticsearch', 'Kafka', 'RabbitMQ', 'Spark', 'Hadoop', 'Airflow', 'dbt', 'Snowflake', 'BigQuery',
+    'React', 'Angular', 'Vue', 'Next.js', 'Node.js', 'Django', 'Flask', 'FastAPI', 'Spring', 'Rails',
+    '.NET', 'GraphQL', 'REST', 'REST APIs', 'gRPC', 'Docker', 'Kubernetes', 'Terraform', 'Ansible',
+    'AWS', 'GCP', 'Azure', 'Linux', 'Git', 'CI/CD', 'Jenkins', 'GitHub Actions', 'Microservices',
+    'Machine Learning', 'Deep Learning', 'NLP', 'Computer Vision', 'TensorFlow', 'PyTorch',
+    'scikit-learn', 'Pandas', 'NumPy', 'Tableau', 'Power BI', 'Excel', 'Figma', 'Agile', 'Scrum',
+    'HTML', 'CSS', 'Sass', 'Tailwind', 'iOS', 'Android', 'Selenium', 'Cypress', 'Jest',
+)
+
+_SKILL_PATTERNS = [
+    (skill, re.compile(r'(?<![\w+#.])' + re.escape(skill) + r'(?![\w+#])', re.IGNORECASE if len(skill) > 2 else 0))
+    for skill in SKILL_VOCABULARY
+]
+_YEARS = re.compile(r'(\d{1,2})\s*\+?\s*(?:-\s*\d{1,2}\s*)?(?:years|yrs)', re.IGNORECASE)
+_BULLET = re.compile(r'^\s*(?:[•·▪◦●○■□➢►\-–—*]|\d{1,2}[.)])\s+')
+_TITLE_AT_COMPANY = re.compile(r'^(?P<title>[^\n]{3,80}?)\s+(?:at|@|-|–|—|\|)\s+(?P<company>[^\n]{2,60})$')
+_COMPANY_SENTENCE = re.compile(
+    r'(?:^|\n)(?:about\s+)?(?P<company>[A-Z][\w&.\'-]*(?:\s+[A-Z][\w&.\'-]*){0,3})\s+'
+    r'(?:is (?:hiring|looking|seeking)|are (?:hiring|looking))'
+)
+_LABELED = re.compile(r'^(?P<label>job title|title|position|role|company|employer)\s*:\s*(?P<value>.+)$', re.IGNORECASE)
+
+_BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr', 'section', 'article',
+               'header', 'footer', 'table'}
+_SKIPPED_TAGS = {'script', 'style', 'noscript', 'nav', 'svg', 'head', 'form', 'button'}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self._skipping += 1
+        elif tag == 'li':
+            self.parts.append('\n- ')
+        elif tag in _BLOCK_TAGS:
+            self.parts.append('\n\n' if tag != 'br' else '\n')
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in _BLOCK_TAGS and tag != 'li':
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """Visible text of an HTML page, keeping paragraph and list structure"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return ''.join(parser.parts)
+
+
+def looks_like_html(text):
+    return bool(re.search(r'<(html|body|div|p|li|ul|br|h[1-6])\b[^>]*>', text[:5000], re.IGNORECASE))
+
+
+def normalize_text(text):
+    """Unicode, whitespace and bullet normalization, one blank line between paragraphs"""
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'[\u200b-\u200d\ufeff]', '', text).replace('\r\n', '\n').replace('\r', '\n')
+    lines = []
+    for line in text.split('\n'):
+        line = re.sub(r'[ \t\f\v]+', ' ', line).strip()
+        line = _BULLET.sub('- ', line)
+        lines.append(line)
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def _paragraph_key(paragraph):
+    return re.sub(r'\W+', ' ', paragraph.lower()).strip()
+
+
+def is_boilerplate(paragraph):
+    return any(pattern.search(paragraph) for pattern in BOILERPLATE_PATTERNS)
+
+
+def clean_paragraphs(text):
+    """Drop boilerplate and repeated paragraphs/lines; return (kept paragraphs, removed count)"""
+    kept = []
+    seen = set()
+    removed = 0
+    for paragraph in text.split('\n\n'):
+        lines = []
+        for line in paragraph.split('\n'):
+            key = _paragraph_key(line)
+            # Repeated lines (copied sections, duplicated bullets) are kept once
+            if not key or (key in seen and ' ' in key) or is_boilerplate(line):
+                removed += bool(key)
+                continue
+            seen.add(key)
+            lines.append(line)
+        if lines:
+            kept.append('\n'.join(lines))
+    return kept, removed
+
+
+def extract_skills(text):
+    found = []
+    for skill, pattern in _SKILL_PATTERNS:
+        if pattern.search(text) and skill.lower() not in {s.lower() for s in found}:
+            found.append(skill)
+    # Prefer the longer name when one skill contains another (REST vs REST APIs)
+    return [s for s in found if not any(s != other and s.lower() in other.lower().split() for other in found)]
+
+
+def extract_seniority(title, text):
+    for source in (title or '', text):
+        for level, pattern in SENIORITY_LEVELS:
+            if re.search(pattern, source, re.IGNORECASE):
+                return level
+    return None
+
+
+def extract_title_and_company(paragraphs):
+    title = company = None
+    for line in '\n'.join(paragraphs[:6]).split('\n')[:15]:
+        labeled = _LABELED.match(line)
+        if labeled:
+            if labeled.group('label').lower() in ('company', 'employer'):
+                company = company or labeled.group('value').strip()
+            else:
+                title = title or labeled.group('value').strip()
+    if paragraphs:
+        first_line = paragraphs[0].split('\n')[0].lstrip('- ').strip()
+        at_company = _TITLE_AT_COMPANY.match(first_line)
+        if at_company:
+            title = title or at_company.group('title').strip()
+            company = company or at_company.group('company').strip()
+        elif len(first_line) <= 80 and not first_line.endswith('.'):
+            title = title or first_line
+    if company is None:
+        sentence = _COMPANY_SENTENCE.search('\n'.join(paragraphs[:4]))
+        if sentence:
+            company = sentence.group('company')
+    return title, company
+
+
+class IngestedJob:
+    """A cleaned job description and what was extracted from it"""
+
+    def __init__(self, text, original_chars, original_tokens, title=None, company=None, seniority=None,
+                 years_required=None, skills=(), removed=0, content_hash=''):
+        self.text = text
+        self.title = title
+        self.company = company
+        self.seniority = seniority
+        self.years_required = years_required
+        self.skills = list(skills)
+        self.removed = removed
+        self.content_hash = content_hash
+        self.original_chars = original_chars
+        self.original_tokens = original_tokens
+
+    @property
+    def chars_saved(self):
+        return self.original_chars - len(self.text)
+
+    @property
+    def tokens_saved(self):
+        return self.original_tokens - estimate_tokens(self.text)
+
+    def summary(self):
+        details = [part for part in (
+            self.title and (f"{self.title} at {self.company}" if self.company else self.title),
+            self.seniority and self.seniority.title(),
+            self.years_required and f"{self.years_required}+ years",
+        ) if part]
+        saved = f"cleaning removed {self.chars_saved} characters (~{self.tokens_saved} tokens)"
+        return ' · '.join(details + [saved])
+
+    def as_dict(self):
+        return {
+            'title': self.title,
+            'company': self.company,
+            'seniority': self.seniority,
+            'years_required': self.years_required,
+            'skills': self.skills,
+            'removed': self.removed,
+            'chars_saved': self.chars_saved,
+            'tokens_saved': self.tokens_saved,
+            'content_hash': self.content_hash,
+        }
+
+
+def _ingest(raw, content_hash):
+    text = html_to_text(raw) if looks_like_html(raw) else raw
+    paragraphs, removed = clean_paragraphs(normalize_text(text))
+    cleaned = '\n\n'.join(paragraphs)
+    title, company = extract_title_and_company(paragraphs)
+    years = [int(match) for match in _YEARS.findall(cleaned)]
+    return IngestedJob(
+        cleaned,
+        original_chars=len(raw),
+        original_tokens=estimate_tokens(raw),
+        title=title,
+        company=company,
+        seniority=extract_seniority(title, cleaned),
+        years_required=max(years) if years else None,
+        skills=extract_skills(cleaned),
+        removed=removed,
+        content_hash=content_hash,
+    )
+
+
+_cache = MemoryCache(max_entries=int(os.getenv('JOB_INGEST_CACHE_SIZE', '512')))
+
+
+def ingest_job_description(raw):
+    """Return the IngestedJob for a pasted or loaded posting, cached by content hash"""
+    raw = raw or ''
+    key = hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    job = _cache.get(key)
+    if job is None:
+        job = _ingest(raw, key)
+        _cache.set(key, job)
+    return job
+
+
+def read_job_file(name, data):
+    """Decode an uploaded or local .html/.htm/.txt/.md file to posting text"""
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', errors='replace')
+    if name.lower().endswith(('.html', '.htm')) or looks_like_html(data):
+        data = html_to_text(data)
+    return normalize_text(data)
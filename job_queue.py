@@ -0,0 +1,469 @@
+"""
+SQLite-backed job queue with worker processes for background generation
+
+Step 5 can submit generation as a job instead of running it inside the
+Streamlit script run, so a rerun, a page change or a slow model call no longer
+throws the work away or ties up the session. Jobs live in a SQLite table (WAL
+mode, claims in IMMEDIATE transactions), so the app, any number of worker
+processes and separate worker hosts sharing the file all see the same queue.
+
+- Higher priority jobs are claimed first, oldest first within a priority.
+- A claimed job holds a lease, which its worker renews while the handler
+  runs; jobs whose worker died are claimed again once the lease runs out.
+  Outcomes are only recorded by the worker holding the lease, so a worker
+  that lost it cannot overwrite or requeue the job.
+- Failed jobs are retried with exponential backoff up to max_attempts, then
+  moved to the dead-letter state with their last error for inspection and
+  manual retry.
+- Queued jobs are cancelled immediately; running jobs are asked to stop and
+  handlers check job.check_cancelled() between expensive steps.
+
+Handlers are referenced as 'module:function' strings so spawned workers can
+import them. Run standalone workers with:
+
+    python job_queue.py --workers 4
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+DEAD = 'dead'
+
+FINISHED_STATES = (DONE, CANCELLED, DEAD)
+
+# Interactive requests from the UI go ahead of bulk work
+PRIORITY_INTERACTIVE = 10
+PRIORITY_BATCH = 0
+
+# Job kind -> 'module:function'; the function is called as handler(payload, job)
+HANDLERS = {
+    'generate_documents': 'app:run_generation_job',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, available_at, created_at);
+"""
+
+_COLUMNS = ('id', 'kind', 'payload', 'priority', 'status', 'attempts', 'max_attempts', 'result', 'error',
+            'worker', 'cancel_requested', 'created_at', 'available_at', 'started_at', 'finished_at')
+
+
+class JobCancelled(Exception):
+    """Raised by Job.check_cancelled() when the job was cancelled while running"""
+
+
+class Job:
+    """A row of the jobs table; payload and result are decoded from JSON"""
+
+    def __init__(self, queue, row):
+        self._queue = queue
+        for name, value in zip(_COLUMNS, row):
+            setattr(self, name, value)
+        self.payload = json.loads(self.payload)
+        self.result = json.loads(self.result) if self.result is not None else None
+        self.cancel_requested = bool(self.cancel_requested)
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def queued_seconds(self):
+        return (self.started_at or time.time()) - self.created_at
+
+    def check_cancelled(self):
+        """Stop a running handler if the job was cancelled or its lease lost; otherwise renew the lease"""
+        if self._queue.cancel_requested(self.id) or not self._queue.renew(self.id, self.worker):
+            raise JobCancelled(self.id)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+
+class JobQueue:
+    """Priority job queue on a local SQLite file, shared by the app and its workers"""
+
+    def __init__(self, path, lease_seconds=300, retry_delay=2.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections are not shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql, params=()):
+        return self._connect().execute(sql, params).rowcount
+
+    def submit(self, kind, payload, priority=0, max_attempts=3, delay=0):
+        """Queue a job and return its id"""
+        if kind not in HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind!r}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._write(
+            "INSERT INTO jobs (id, kind, payload, priority, status, max_attempts, created_at, available_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), priority, QUEUED, max_attempts, now, now + delay)
+        )
+        return job_id
+
+    def claim(self, worker, kinds=None):
+        """Take the most urgent runnable job for a worker, or return None
+
+        Running jobs whose lease expired (their worker died) are runnable again.
+        """
+        query = (
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE "
+            "((status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?))"
+        )
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+        query += " ORDER BY priority DESC, available_at, created_at LIMIT 1"
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(query, [QUEUED, now, RUNNING, now, *(kinds or ())]).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                job = Job(self, row)
+                if job.status == RUNNING and (job.cancel_requested or job.attempts >= job.max_attempts):
+                    # Its worker died after the job was cancelled or on the last attempt: settle it and look again
+                    if job.cancel_requested:
+                        conn.execute(
+                            "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                            (CANCELLED, now, job.id)
+                        )
+                    else:
+                        self._bury(conn, job.id, "Worker stopped before finishing the job", now)
+                    conn.execute("COMMIT")
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, started_at = ?, "
+                    "lease_until = ? WHERE id = ?",
+                    (RUNNING, worker, now, now + self.lease_seconds, job.id)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            job.status, job.attempts, job.worker, job.started_at = RUNNING, job.attempts + 1, worker, now
+            return job
+
+    def renew(self, job_id, worker):
+        """Extend the lease of a job worker is running; False if the worker no longer holds it"""
+        return bool(self._write(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+            (time.time() + self.lease_seconds, job_id, worker, RUNNING)
+        ))
+
+    def _bury(self, conn, job_id, error, now):
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+            (DEAD, error, now, job_id)
+        )
+
+    def complete(self, job_id, worker, result):
+        """Record the result if worker still holds the job; return whether it did"""
+        return bool(self._write(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_until = NULL "
+            "WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, json.dumps(result), time.time(), job_id, worker, RUNNING)
+        ))
+
+    def fail(self, job_id, worker, error):
+        """Record a failed attempt; retry later or dead-letter the job
+
+        Return the new status, or None when worker no longer holds the job.
+        """
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts, max_attempts, cancel_requested FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+                (job_id, worker, RUNNING)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            attempts, max_attempts, cancel_requested = row
+            if cancel_requested:
+                status = CANCELLED
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+                    (CANCELLED, error, now, job_id)
+                )
+            elif attempts >= max_attempts:
+                status = DEAD
+                self._bury(conn, job_id, error, now)
+            else:
+                status = QUEUED
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_until = NULL WHERE id = ?",
+                    (QUEUED, error, now + self.retry_delay * 2 ** (attempts - 1), job_id)
+                )
+            conn.execute("COMMIT")
+            return status
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def cancel(self, job_id):
+        """Cancel a queued job now or ask a running one to stop; return False if already finished"""
+        now = time.time()
+        if self._write(
+            "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, now, job_id, QUEUED)
+        ):
+            return True
+        return bool(self._write(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING)
+        ))
+
+    def cancel_requested(self, job_id):
+        row = self._connect().execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def mark_cancelled(self, job_id, worker):
+        return bool(self._write(
+            "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, worker, RUNNING)
+        ))
+
+    def get(self, job_id):
+        """Return the Job for an id, or None"""
+        row = self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return Job(self, row) if row else None
+
+    def position(self, job_id):
+        """Number of runnable jobs that will be claimed before a queued job"""
+        job = self.get(job_id)
+        if job is None or job.status != QUEUED:
+            return 0
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND "
+            "(available_at < ? OR (available_at = ? AND created_at < ?))))",
+            (QUEUED, job.priority, job.priority, job.available_at, job.available_at, job.created_at)
+        ).fetchone()[0]
+
+    def dead_letters(self, limit=50):
+        return [Job(self, row) for row in self._connect().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = ? ORDER BY finished_at DESC LIMIT ?",
+            (DEAD, limit)
+        )]
+
+    def retry(self, job_id):
+        """Put a dead-lettered job back in the queue with a fresh set of attempts"""
+        return bool(self._write(
+            "UPDATE jobs SET status = ?, attempts = 0, error = NULL, available_at = ?, finished_at = NULL "
+            "WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), job_id, DEAD)
+        ))
+
+    def stats(self):
+        counts = dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, CANCELLED, DEAD)}
+
+    def purge(self, older_than=7 * 24 * 3600):
+        """Delete finished jobs older than older_than seconds (dead letters are kept)"""
+        return self._write(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (DONE, CANCELLED, time.time() - older_than)
+        )
+
+
+def load_handler(kind):
+    module_name, _, function = HANDLERS[kind].partition(':')
+    return getattr(importlib.import_module(module_name), function)
+
+
+def _keep_lease(queue, job, stop):
+    # Renew well before the lease runs out; stop once another worker has taken the job
+    while not stop.wait(queue.lease_seconds / 3):
+        if not queue.renew(job.id, job.worker):
+            return
+
+
+def run_job(queue, job):
+    """Run one claimed job and record its outcome
+
+    Returns the recorded status, or None when the job's lease was lost and
+    another worker owns its outcome.
+    """
+    stop = threading.Event()
+    threading.Thread(target=_keep_lease, args=(queue, job, stop), name='job-lease', daemon=True).start()
+    try:
+        result = load_handler(job.kind)(job.payload, job)
+    except JobCancelled:
+        return CANCELLED if queue.mark_cancelled(job.id, job.worker) else None
+    except Exception as e:
+        return queue.fail(job.id, job.worker, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}")
+    finally:
+        stop.set()
+    if queue.cancel_requested(job.id):
+        return CANCELLED if queue.mark_cancelled(job.id, job.worker) else None
+    return DONE if queue.complete(job.id, job.worker, result) else None
+
+
+def run_worker(path, stop=None, poll_interval=0.2, kinds=None, max_jobs=None, handlers=None):
+    """Claim and run jobs until stop is set (or max_jobs have run)"""
+    if handlers:
+        HANDLERS.update(handlers)
+    queue = JobQueue(path)
+    worker = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    handled = 0
+    while not (stop is not None and stop.is_set()) and (max_jobs is None or handled < max_jobs):
+        job = queue.claim(worker, kinds)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(queue, job)
+        handled += 1
+    return handled
+
+
+def _worker_main(path, stop, poll_interval, handlers):
+    # Ctrl-C goes to the parent, which stops workers through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(path, stop=stop, poll_interval=poll_interval, handlers=handlers)
+
+
+class WorkerPool:
+    """A set of worker processes serving one queue file"""
+
+    def __init__(self, path, workers=2, poll_interval=0.2, handlers=None):
+        # spawn avoids forking a multi-threaded Streamlit server
+        context = multiprocessing.get_context('spawn')
+        self._stop = context.Event()
+        self.processes = [
+            context.Process(
+                target=_worker_main, args=(path, self._stop, poll_interval, handlers),
+                name=f"job-worker-{i}", daemon=True
+            )
+            for i in range(workers)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def alive(self):
+        return sum(process.is_alive() for process in self.processes)
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+
+_default_queue = None
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide queue at JOB_QUEUE_DB"""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(os.getenv('JOB_QUEUE_DB', os.path.join('.data', 'jobs.sqlite3')))
+        return _default_queue
+
+
+def ensure_workers():
+    """Start JOB_WORKERS worker processes for this server once; return how many are running
+
+    JOB_WORKERS=0 starts none, for deployments that run `python job_queue.py` separately.
+    """
+    global _default_pool
+    queue = get_job_queue()
+    with _default_lock:
+        if _default_pool is None:
+            workers = int(os.getenv('JOB_WORKERS', '2'))
+            if workers <= 0:
+                return 0
+            _default_pool = WorkerPool(queue.path, workers=workers)
+        return _default_pool.alive()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background generation workers")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('JOB_WORKERS', '2')),
+                        help="Number of worker processes")
+    parser.add_argument('--db', default=os.getenv('JOB_QUEUE_DB', os.path.join('.data', 'jobs.sqlite3')),
+                        help="Queue database file")
+    parser.add_argument('--dead-letters', action='store_true', help="List dead-lettered jobs and exit")
+    parser.add_argument('--retry', metavar='JOB_ID', action='append', default=[],
+                        help="Requeue a dead-lettered job and exit (repeatable)")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+    if args.dead_letters or args.retry:
+        for job_id in args.retry:
+            print(f"{job_id}: {'requeued' if queue.retry(job_id) else 'not a dead letter'}")
+        if args.dead_letters:
+            for job in queue.dead_letters():
+                last_line = (job.error or '').strip().splitlines()[:1]
+                print(f"{job.id}  {job.kind}  attempts={job.attempts}  {last_line[0] if last_line else ''}")
+        return
+
+    pool = WorkerPool(args.db, workers=args.workers)
+    print(f"{pool.alive()} workers serving {args.db} (Ctrl-C to stop)")
+    try:
+        while pool.alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Section-by-section cover letter generation
+
+The letter is written as four independent sections (greeting, motivation,
+experience match and call to action). Each section lists the user_data fields
+and the part of the job description it depends on, and its prompt contains
+only those inputs. A fingerprint of the inputs is stored with every section,
+so after an edit only sections whose inputs changed are sent to the model
+again, and changed sections are generated concurrently.
+"""
+
+import hashlib
+import json
+import re
+
+from prompt_budget import compact_prompt
+
+# Parts of the job description a section can depend on
+JOB_OPENING = 'opening'   # first paragraph: usually company, title and pitch
+JOB_BODY = 'body'         # the remaining paragraphs: responsibilities and requirements
+
+
+class Section:
+    """One part of the letter and the inputs it is written from"""
+
+    def __init__(self, name, title, fields, job_part, instructions):
+        self.name = name
+        self.title = title
+        self.fields = fields
+        self.job_part = job_part
+        self.instructions = instructions
+
+
+SECTIONS = (
+    Section(
+        'greeting', 'Greeting', ('name',), JOB_OPENING,
+        "Write only the salutation line of the letter (for example \"Dear Hiring Manager,\"), "
+        "addressing the company or team named in the job description if there is one."
+    ),
+    Section(
+        'motivation', 'Motivation', ('name', 'current_role', 'years_of_experience', 'summary'), JOB_OPENING,
+        "Write only the opening paragraph: why the candidate is interested in this specific role "
+        "and company, and a one-sentence introduction of who they are. 60-100 words."
+    ),
+    Section(
+        'experience_match', 'Experience match',
+        ('skills', 'experience', 'projects', 'education', 'certifications'), JOB_BODY,
+        "Write only the middle of the letter: one or two paragraphs that match the candidate's most "
+        "relevant experience, skills and projects to the job requirements, with concrete examples. "
+        "150-250 words. Do not greet the reader or sign off."
+    ),
+    Section(
+        'call_to_action', 'Call to action', ('name', 'email', 'phone'), JOB_OPENING,
+        "Write only the closing paragraph: enthusiasm for the role, a request for an interview and "
+        "contact details, followed by a professional sign-off with the candidate's name. 40-80 words."
+    ),
+)
+
+SECTION_NAMES = tuple(section.name for section in SECTIONS)
+
+
+def split_job_description(job_description):
+    """Split the job description into its opening paragraph and the rest"""
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', job_description or '') if p.strip()]
+    if not paragraphs:
+        return {JOB_OPENING: '', JOB_BODY: ''}
+    return {
+        JOB_OPENING: paragraphs[0],
+        JOB_BODY: '\n\n'.join(paragraphs[1:]) or paragraphs[0],
+    }
+
+
+def section_inputs(section, user_data, job_parts):
+    """The subset of user_data and the job description text a section is written from"""
+    data = {field: user_data.get(field) for field in section.fields}
+    return data, job_parts[section.job_part]
+
+
+def fingerprint(section, data, job_text):
+    payload = json.dumps([section.name, section.instructions, data, job_text], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _lines(entries, render):
+    return '\n'.join(f"- {render(entry)}" for entry in entries) if entries else 'Not specified'
+
+
+def build_section_prompt(section, data, job_text):
+    """Prompt containing only the inputs the section depends on"""
+    details = []
+    for field in section.fields:
+        value = data.get(field)
+        if field == 'skills':
+            details.append(f"Key Skills: {', '.join(value) if value else 'Not specified'}")
+        elif field == 'experience':
+            details.append("Work Experience:\n" + _lines(
+                value, lambda e: f"{e['title']} at {e['company']} ({e['duration']}): {e['description']}"
+            ))
+        elif field == 'projects':
+            details.append("Projects:\n" + _lines(
+                value, lambda p: f"{p['title']} ({p['duration']}): {p['description']}"
+            ))
+        elif field == 'education':
+            details.append("Education:\n" + _lines(value, lambda e: f"{e['degree']} from {e['institution']}"))
+        elif field == 'certifications':
+            details.append("Certifications:\n" + _lines(value, lambda c: c['title']))
+        else:
+            details.append(f"{field.replace('_', ' ').title()}: {value or 'Not specified'}")
+
+    return (
+        "You are writing one section of a professional cover letter for the candidate below.\n\n"
+        "Candidate Information:\n" + '\n'.join(details) + "\n\n"
+        "Job Description (relevant part):\n" + (job_text or 'Not specified') + "\n\n"
+        + section.instructions + " Use a professional tone. Return only the text of this section."
+    )
+
+
+class SectionedLetter:
+    """A cover letter stored as sections, each with the fingerprint of its inputs"""
+
+    def __init__(self, sections=None):
+        # name -> {'text': ..., 'fingerprint': ...}
+        self.sections = dict(sections or {})
+
+    @property
+    def text(self):
+        return '\n\n'.join(
+            self.sections[name]['text'].strip() for name in SECTION_NAMES if name in self.sections
+        )
+
+    def as_dict(self):
+        return {'sections': self.sections}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('sections'))
+
+
+def plan_sections(user_data, job_description, previous=None, budget=0, score_entries=None):
+    """Return [(section, prompt, fingerprint, reusable)] for every section
+
+    A section is reusable when the previous letter has it with the same fingerprint.
+    """
+    job_parts = split_job_description(job_description)
+    plan = []
+    for section in SECTIONS:
+        data, job_text = section_inputs(section, user_data, job_parts)
+        digest = fingerprint(section, data, job_text)
+        reusable = previous is not None and previous.sections.get(section.name, {}).get('fingerprint') == digest
+        prompt = None
+        if not reusable:
+            # Large profiles are trimmed with the same budget as the whole-letter prompt
+            build = lambda d, j, section=section: build_section_prompt(section, d, j)
+            prompt, _ = compact_prompt(user_data, job_text, build, budget, score_entries=score_entries)
+        plan.append((section, prompt, digest, reusable))
+    return plan
+
+
+def generate_sections(user_data, job_description, client, previous=None, cache=None,
+                      make_key=None, budget=0, score_entries=None, on_response=None, reuse=True):
+    """Write the letter, regenerating only sections whose inputs changed
+
+    Returns (SectionedLetter, names of the sections sent to the model). Sections
+    found in cache (keyed with make_key(prompt, model_name)) are not sent either.
+    With reuse=False every section is written again (results are still cached).
+    """
+    if not reuse:
+        previous = None
+    letter = SectionedLetter()
+    pending = []
+    for section, prompt, digest, reusable in plan_sections(
+            user_data, job_description, previous, budget, score_entries):
+        if reusable:
+            letter.sections[section.name] = previous.sections[section.name]
+            continue
+        cache_key = make_key(prompt, client.model_name) if cache is not None else None
+        cached = cache.get(cache_key) if cache is not None and reuse else None
+        if cached is not None:
+            letter.sections[section.name] = {'text': cached, 'fingerprint': digest}
+            continue
+        pending.append((section, prompt, digest, cache_key))
+
+    responses = client.generate_many([prompt for _, prompt, _, _ in pending]) if pending else []
+    for (section, _, digest, cache_key), response in zip(pending, responses):
+        letter.sections[section.name] = {'text': response.text.strip(), 'fingerprint': digest}
+        if cache is not None:
+            cache.set(cache_key, response.text.strip())
+        if on_response is not None:
+            on_response(response)
+    return letter, [section.name for section, _, _, _ in pending]
@@ -0,0 +1,358 @@
+"""
+Async LLM client shared by the app and the batch CLI
+
+One AsyncLLMClient wraps one backend (and so one reused model client). It caps
+in-flight requests with a semaphore, spaces them with a token-bucket rate
+limiter, applies a per-request timeout and retries transient failures with
+jittered exponential backoff. All requests run on a single background event
+loop, so the limits hold across Streamlit sessions and worker threads.
+"""
+
+import asyncio
+import functools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# HTTP-style status codes worth retrying (google.api_core exceptions expose .code)
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_transient(exc):
+    """Return True for failures that are likely to succeed on retry"""
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, 'code', None)
+    if callable(code):
+        # grpc errors expose code() rather than an attribute
+        return False
+    return code in TRANSIENT_STATUS_CODES
+
+
+def candidate_texts(response):
+    """Text of every candidate in a response (response.text only works for one candidate)
+
+    Candidates that were blocked or filtered have no parts; they are left out
+    rather than returned as empty drafts.
+    """
+    candidates = getattr(response, 'candidates', None)
+    if not candidates:
+        texts = [response.text]
+    else:
+        texts = [
+            ''.join(part.text for part in getattr(candidate.content, 'parts', None) or [])
+            for candidate in candidates
+        ]
+    return [text for text in texts if text.strip()]
+
+
+class ModelBackend:
+    """Adapts a GenerativeModel-like object to the async backend interface
+
+    A backend needs a model_name attribute and an async generate(prompt) method
+    returning a response with .text (and optionally .usage_metadata), and an
+    async generator stream(prompt) yielding such responses as chunks. Backends
+    with supports_candidates also accept candidate_count, returning several
+    alternative responses to one prompt in a single request. Backends that may
+    make several model calls per request at once (e.g. a hedging router) set
+    parallel_calls to that number.
+    """
+
+    supports_candidates = True
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = model.model_name
+
+    async def generate(self, prompt, candidate_count=1):
+        kwargs = {}
+        if candidate_count > 1:
+            kwargs['generation_config'] = {'candidate_count': candidate_count}
+        if hasattr(self.model, 'generate_content_async'):
+            return await self.model.generate_content_async(prompt, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.model.generate_content, prompt, **kwargs))
+
+    async def stream(self, prompt):
+        # The SDKs' stream iterators block, so each chunk is read in the loop's executor
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(None, lambda: iter(self.model.generate_content(prompt, stream=True)))
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter (rate tokens per second, up to capacity)"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncLLMClient:
+    """Concurrency-limited, rate-limited, retrying client around one backend"""
+
+    def __init__(self, backend, max_concurrency=4, rate_limit=None, burst=None,
+                 max_retries=3, base_delay=0.5, max_delay=8.0, timeout=60.0):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.max_concurrency = max_concurrency
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.retries = 0
+        self._semaphore = None
+        self._bucket = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """The background event loop all requests run on, started on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                # Blocking models run in the loop's executor: give every request slot a thread
+                loop.set_default_executor(ThreadPoolExecutor(
+                    max_workers=self.max_concurrency * getattr(self.backend, 'parallel_calls', 1),
+                    thread_name_prefix='llm-call'
+                ))
+                thread = threading.Thread(target=loop.run_forever, name='llm-client-loop', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _limits(self):
+        # Created lazily so they bind to the client's own loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            if self.rate_limit:
+                self._bucket = TokenBucket(self.rate_limit, self.burst)
+        return self._semaphore, self._bucket
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform between 0 and the capped exponential delay
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def generate(self, prompt, candidate_count=1):
+        """Return the backend response for prompt; must run on self.loop"""
+        semaphore, bucket = self._limits()
+        attempt = 0
+        while True:
+            if bucket is not None:
+                await bucket.acquire()
+            try:
+                async with semaphore:
+                    if candidate_count > 1:
+                        request = self.backend.generate(prompt, candidate_count=candidate_count)
+                    else:
+                        request = self.backend.generate(prompt)
+                    return await asyncio.wait_for(request, self.timeout)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+
+    async def stream(self, prompt):
+        """Async generator of response chunks for prompt; must run on self.loop
+
+        The stream holds a request slot until it ends. The timeout applies to
+        the first chunk and to each gap between chunks. Transient failures are
+        retried only before the first chunk: text already shown cannot be
+        taken back.
+        """
+        semaphore, bucket = self._limits()
+        attempt = 0
+        while True:
+            if bucket is not None:
+                await bucket.acquire()
+            started = False
+            try:
+                async with semaphore:
+                    chunks = self.backend.stream(prompt)
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                            except StopAsyncIteration:
+                                return
+                            started = True
+                            yield chunk
+                    finally:
+                        await chunks.aclose()
+            except Exception as e:
+                if started or attempt >= self.max_retries or not is_transient(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                attempt += 1
+
+    def stream_sync(self, prompt):
+        """Blocking iterator over stream(prompt) for synchronous callers such as the Streamlit script thread"""
+        chunks = self.stream(prompt)
+
+        async def next_chunk():
+            return await chunks.__anext__()
+
+        async def close():
+            await chunks.aclose()
+
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(next_chunk(), self.loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Also runs when the caller stops reading early, releasing the request slot
+            asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+
+    def submit(self, prompt, candidate_count=1):
+        """Schedule a request from any thread and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(self.generate(prompt, candidate_count), self.loop)
+
+    def generate_sync(self, prompt):
+        """Blocking helper for synchronous callers such as the Streamlit script thread"""
+        return self.submit(prompt).result()
+
+    def generate_many(self, prompts):
+        """Run several prompts concurrently (within the limits) and return responses in order"""
+        futures = [self.submit(prompt) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def generate_variants(self, prompt, count):
+        """Return (texts, responses) for up to count alternative answers to one prompt
+
+        Backends that support candidate_count answer in a single request; others
+        get count concurrent requests for the same prompt. Blocked or empty
+        answers are left out; RuntimeError is raised if none is left.
+        """
+        if count > 1 and getattr(self.backend, 'supports_candidates', False):
+            response = self.submit(prompt, candidate_count=count).result()
+            texts = candidate_texts(response)
+            responses = [response]
+            if len(texts) < count:
+                # Fewer candidates than asked for (e.g. some were filtered): top up concurrently
+                extra = self.generate_many([prompt] * (count - len(texts)))
+                texts += [text for r in extra for text in candidate_texts(r)]
+                responses += extra
+        else:
+            responses = self.generate_many([prompt] * count)
+            texts = [text for r in responses for text in candidate_texts(r)]
+        if not texts:
+            raise RuntimeError("The model returned no usable drafts (every answer was blocked or empty)")
+        return texts[:count], responses
+
+
+def create_model(model_name):
+    """Create the model selected by LLM_BACKEND
+
+    'gemini' (the default), 'openai' for an OpenAI-compatible endpoint such as a
+    local model server (LLM_BASE_URL, LLM_MODEL, LLM_API_KEY) or 'fake' for
+    offline runs.
+    """
+    backend = os.getenv('LLM_BACKEND', 'gemini')
+    if backend == 'openai':
+        from openai_llm import OpenAICompatibleModel
+        return OpenAICompatibleModel(
+            os.getenv('LLM_MODEL', model_name),
+            base_url=os.getenv('LLM_BASE_URL', 'http://localhost:11434/v1'),
+            api_key=os.getenv('LLM_API_KEY'),
+            timeout=float(os.getenv('LLM_TIMEOUT', '60')),
+        )
+    if backend == 'fake':
+        from fake_llm import FakeModel
+        return FakeModel(
+            latency=float(os.getenv('FAKE_LLM_LATENCY', '0')),
+            jitter=float(os.getenv('FAKE_LLM_JITTER', '0')),
+            error_rate=float(os.getenv('FAKE_LLM_ERROR_RATE', '0')),
+        )
+
+    return gemini_model(model_name)
+
+
+_gemini_configured = False
+_gemini_lock = threading.Lock()
+
+
+def gemini_model(model_name):
+    """Create a Gemini model, importing and configuring the SDK on first use
+
+    google.generativeai takes about a second to import, so it is loaded when a
+    model is first needed rather than when the app starts.
+    """
+    global _gemini_configured
+    import google.generativeai as genai
+    with _gemini_lock:
+        if not _gemini_configured:
+            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+            _gemini_configured = True
+    return genai.GenerativeModel(model_name)
+
+
+def backend_from_env(model_name):
+    """The router described by the LLM_ROUTES file if set, else the single LLM_BACKEND model"""
+    routes_path = os.getenv('LLM_ROUTES')
+    if routes_path:
+        from llm_router import load_routes, router_from_config
+        return router_from_config(load_routes(routes_path))
+    return ModelBackend(create_model(model_name))
+
+
+def uses_gemini():
+    """Whether the configured backends include Gemini (and so need GEMINI_API_KEY)"""
+    routes_path = os.getenv('LLM_ROUTES')
+    if routes_path:
+        from llm_router import load_routes
+        return any(route.get('backend', 'gemini') == 'gemini' for route in load_routes(routes_path)['routes'])
+    return os.getenv('LLM_BACKEND', 'gemini') == 'gemini'
+
+
+def client_from_env(backend):
+    """Build a client for backend using the LLM_* environment settings"""
+    rate_limit = float(os.getenv('LLM_RATE_LIMIT', '0'))
+    return AsyncLLMClient(
+        backend,
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '4')),
+        rate_limit=rate_limit if rate_limit > 0 else None,
+        max_retries=int(os.getenv('LLM_MAX_RETRIES', '3')),
+        timeout=float(os.getenv('LLM_TIMEOUT', '60')),
+    )
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(model_name):
+    """Return the process-wide client for model_name, creating its model (or router) once"""
+    with _clients_lock:
+        client = _clients.get(model_name)
+        if client is None:
+            client = _clients[model_name] = client_from_env(backend_from_env(model_name))
+        return client
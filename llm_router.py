@@ -0,0 +1,301 @@
+"""
+Routing across several LLM backends with hedging and per-backend health
+
+A RouterBackend holds an ordered list of routes (preferred first, e.g. a local
+model before a hosted one) and is itself a backend, so AsyncLLMClient applies
+its limits and retries on top. For each request it:
+
+- skips routes whose max_prompt_tokens is below the prompt's estimated size
+- moves routes that miss the latency SLO (recent p95) or fail too often to
+  the back, so traffic shifts away from a slow backend until it recovers
+- sends the request to the first route and, if no answer arrives within the
+  hedge deadline, races the next route as well; the first success wins and
+  the other request is cancelled. A failure fails over to the next route at
+  once. Streams fail over the same way until their first chunk, but are
+  not hedged.
+
+Latency and errors are kept per route over a sliding window (stats()).
+Routes are configured in a JSON file named by LLM_ROUTES, see
+llm_routes.example.json.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from prompt_budget import estimate_tokens
+
+# Fewer recent samples than this and a route's p95 is not trusted yet
+MIN_SAMPLES = 10
+
+
+class BackendStats:
+    """Sliding-window latency and error rate of one route"""
+
+    def __init__(self, window=300.0):
+        self.window = window
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.cancelled = 0
+        self._samples = deque()  # (finished_at, seconds, ok)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+            self._samples.append((time.monotonic(), seconds, ok))
+
+    def _recent(self):
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return list(self._samples)
+
+    def latency_percentile(self, pct):
+        latencies = sorted(seconds for _, seconds, ok in self._recent() if ok)
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+    def error_rate(self):
+        recent = self._recent()
+        if len(recent) < MIN_SAMPLES:
+            return 0.0
+        return sum(not ok for _, _, ok in recent) / len(recent)
+
+    def snapshot(self):
+        p50, p95 = self.latency_percentile(50), self.latency_percentile(95)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'recent_error_rate': round(self.error_rate(), 3),
+            'p50_ms': round(p50 * 1000) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000) if p95 is not None else None,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'cancelled': self.cancelled,
+        }
+
+
+class Route:
+    """One backend the router may use, with its limits"""
+
+    def __init__(self, name, backend, max_prompt_tokens=None, max_concurrency=None, window=300.0):
+        self.name = name
+        self.backend = backend
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_concurrency = max_concurrency
+        self.stats = BackendStats(window)
+        self._semaphore = None
+
+    @property
+    def model_name(self):
+        return self.backend.model_name
+
+    def _limit(self):
+        if self.max_concurrency and self._semaphore is None:
+            # Created on first use so it binds to the client's loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate(self, prompt, candidate_count=1):
+        semaphore = self._limit()
+        start = time.perf_counter()
+        try:
+            if semaphore is not None:
+                async with semaphore:
+                    response = await self._request(prompt, candidate_count)
+            else:
+                response = await self._request(prompt, candidate_count)
+        except asyncio.CancelledError:
+            # Lost a hedge race: says nothing about the backend's latency
+            self.stats.cancelled += 1
+            raise
+        except Exception:
+            self.stats.record(time.perf_counter() - start, ok=False)
+            raise
+        self.stats.record(time.perf_counter() - start, ok=True)
+        return response
+
+    async def stream(self, prompt):
+        semaphore = self._limit()
+        start = time.perf_counter()
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                async for chunk in self.backend.stream(prompt):
+                    yield chunk
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        except Exception:
+            self.stats.record(time.perf_counter() - start, ok=False)
+            raise
+        self.stats.record(time.perf_counter() - start, ok=True)
+
+    def _request(self, prompt, candidate_count):
+        if candidate_count > 1:
+            return self.backend.generate(prompt, candidate_count=candidate_count)
+        return self.backend.generate(prompt)
+
+
+class RouterBackend:
+    """Backend that routes each request by prompt size and route health, hedging slow ones
+
+    slo is the latency target in seconds: routes whose recent p95 is above it
+    are tried after the others. hedge_after is the fixed hedge deadline in
+    seconds; when None, a route's own recent p95 (capped at the SLO) is used,
+    or the SLO until enough samples exist. 0 disables hedging.
+    """
+
+    supports_candidates = True
+
+    def __init__(self, routes, slo=30.0, hedge_after=None, max_error_rate=0.5):
+        if not routes:
+            raise ValueError("A router needs at least one route")
+        self.routes = routes
+        self.slo = slo
+        self.hedge_after = hedge_after
+        self.max_error_rate = max_error_rate
+        self.model_name = 'router:' + ','.join(f"{route.name}={route.model_name}" for route in routes)
+        # A request may end up running on every route at once
+        self.parallel_calls = len(routes)
+
+    def healthy(self, route):
+        p95 = route.stats.latency_percentile(95)
+        return (p95 is None or p95 <= self.slo) and route.stats.error_rate() <= self.max_error_rate
+
+    def select(self, prompt):
+        """Routes to try for prompt, best first"""
+        tokens = estimate_tokens(prompt)
+        fitting = [route for route in self.routes
+                   if route.max_prompt_tokens is None or tokens <= route.max_prompt_tokens]
+        if not fitting:
+            # Nothing is configured for prompts this long: let the largest context try
+            fitting = [max(self.routes, key=lambda route: route.max_prompt_tokens)]
+        healthy = [route for route in fitting if self.healthy(route)]
+        return healthy + [route for route in fitting if route not in healthy]
+
+    def hedge_deadline(self, route):
+        if self.hedge_after is not None:
+            return self.hedge_after or None
+        p95 = route.stats.latency_percentile(95)
+        return min(p95, self.slo) if p95 is not None else self.slo
+
+    async def generate(self, prompt, candidate_count=1):
+        candidates = self.select(prompt)
+        running = {}  # task -> route
+        hedged = set()
+        error = None
+        try:
+            while candidates or running:
+                if not running:
+                    route = candidates.pop(0)
+                    running[asyncio.ensure_future(route.generate(prompt, candidate_count))] = route
+                deadline = self.hedge_deadline(next(iter(running.values()))) if candidates else None
+                done, _ = await asyncio.wait(running, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Too slow: race the next route against the ones still running
+                    route = candidates.pop(0)
+                    route.stats.hedges += 1
+                    task = asyncio.ensure_future(route.generate(prompt, candidate_count))
+                    running[task] = route
+                    hedged.add(task)
+                    continue
+                for task in done:
+                    route = running.pop(task)
+                    if task.exception() is None:
+                        if task in hedged:
+                            route.stats.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in running:
+                task.cancel()
+        raise error
+
+    async def stream(self, prompt):
+        """Stream from the best route for prompt, failing over until the first chunk arrives
+
+        Streams are not hedged: once text is on screen it cannot be swapped for
+        another backend's answer.
+        """
+        routes = self.select(prompt)
+        for index, route in enumerate(routes):
+            started = False
+            try:
+                async for chunk in route.stream(prompt):
+                    started = True
+                    yield chunk
+                return
+            except Exception:
+                if started or index == len(routes) - 1:
+                    raise
+
+    def stats(self):
+        return {route.name: dict(route.stats.snapshot(), model=route.model_name, healthy=self.healthy(route))
+                for route in self.routes}
+
+
+def create_route_model(config):
+    """Model for one route entry of the routes file"""
+    kind = config.get('backend', 'gemini')
+    if kind == 'gemini':
+        from llm_client import gemini_model
+        return gemini_model(config['model'])
+    if kind == 'openai':
+        from openai_llm import OpenAICompatibleModel
+        return OpenAICompatibleModel(
+            config['model'],
+            base_url=config.get('base_url', 'http://localhost:11434/v1'),
+            api_key=os.getenv(config['api_key_env']) if config.get('api_key_env') else None,
+            timeout=config.get('timeout', 60.0),
+            temperature=config.get('temperature'),
+            max_tokens=config.get('max_tokens'),
+        )
+    if kind == 'fake':
+        from fake_llm import FakeModel
+        return FakeModel(
+            model_name=config.get('model', 'fake-model'),
+            latency=config.get('latency', 0.0),
+            jitter=config.get('jitter', 0.0),
+            error_rate=config.get('error_rate', 0.0),
+            tail_rate=config.get('tail_rate', 0.0),
+            tail_latency=config.get('tail_latency', 0.0),
+            seed=config.get('seed', 0),
+        )
+    raise ValueError(f"Unknown LLM backend {kind!r} (expected gemini, openai or fake)")
+
+
+def load_routes(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def router_from_config(config):
+    """Build a RouterBackend from a parsed routes file"""
+    from llm_client import ModelBackend
+    routes = [
+        Route(
+            entry.get('name', entry.get('model', entry.get('backend'))),
+            ModelBackend(create_route_model(entry)),
+            max_prompt_tokens=entry.get('max_prompt_tokens'),
+            max_concurrency=entry.get('max_concurrency'),
+            window=config.get('window', 300.0),
+        )
+        for entry in config['routes']
+    ]
+    return RouterBackend(
+        routes,
+        slo=config.get('slo', 30.0),
+        hedge_after=config.get('hedge_after'),
+        max_error_rate=config.get('max_error_rate', 0.5),
+    )
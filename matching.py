@@ -0,0 +1,215 @@
+"""
+Offline job description ↔ profile matching with hashed n-gram TF-IDF vectors
+
+Texts are tokenized with the prompt_budget keyword rules, expanded to word
+unigrams and bigrams and hashed into a fixed number of features, so no
+vocabulary has to be built or stored. Profile entries (experience, projects,
+education, certifications and each skill) become rows of a dense matrix
+restricted to the features the profile actually uses; a batch of job
+descriptions is projected onto those features and scored with one matrix
+product, which keeps scoring one profile against thousands of jobs cheap.
+
+    matcher = ProfileMatcher(user_data)
+    report = matcher.report(job_description)     # ranked entries, skills, gaps
+    scores = matcher.score_many(job_descriptions)  # (jobs, entries + 1) array
+"""
+
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from prompt_budget import keywords
+
+# Number of hashed features; collisions are rare at this size for job-posting vocabularies
+N_FEATURES = 2 ** 18
+
+MATCHED_SECTIONS = ('experience', 'projects', 'education', 'certifications', 'skills')
+
+# Job-posting boilerplate that should not be reported as a missing keyword
+POSTING_WORDS = frozenset("""
+hiring join joining growing looking seeking ideal candidate candidates position opportunity
+responsibilities requirements qualifications preferred required benefits apply about
+""".split())
+
+
+def terms(text):
+    """Unigram and bigram terms of a text"""
+    words = keywords(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashingVectorizer:
+    """Maps texts to sparse rows of hashed term counts"""
+
+    def __init__(self, n_features=N_FEATURES):
+        self.n_features = n_features
+        self._indices = {}
+
+    def _index(self, term):
+        # crc32 is stable across processes, unlike hash(); memoized because job postings repeat terms
+        index = self._indices.get(term)
+        if index is None:
+            if len(self._indices) > 500000:
+                self._indices.clear()
+            index = self._indices[term] = zlib.crc32(term.encode('utf-8')) % self.n_features
+        return index
+
+    def transform(self, texts):
+        """Return (indptr, indices, counts) CSR arrays, one row per text"""
+        indptr = [0]
+        indices = []
+        counts = []
+        for text in texts:
+            row = Counter(self._index(term) for term in terms(text))
+            indices.extend(row.keys())
+            counts.extend(row.values())
+            indptr.append(len(indices))
+        return (
+            np.asarray(indptr, dtype=np.int64),
+            np.asarray(indices, dtype=np.int64),
+            np.asarray(counts, dtype=np.float32),
+        )
+
+
+def idf_weights(indices, indptr, n_features):
+    """Smoothed inverse document frequency per feature for a CSR corpus"""
+    n_docs = len(indptr) - 1
+    df = np.bincount(indices, minlength=n_features).astype(np.float32)
+    return np.log((1 + n_docs) / (1 + df)).astype(np.float32) + 1
+
+
+def entry_label(section, entry):
+    if section == 'skills':
+        return entry
+    if section == 'education':
+        return f"{entry.get('degree', '')}, {entry.get('institution', '')}".strip(', ')
+    title = entry.get('title', '')
+    company = entry.get('company')
+    return f"{title} at {company}" if company else title
+
+
+def entry_text(section, entry):
+    if section == 'skills':
+        return entry
+    if section == 'education':
+        return f"{entry.get('degree', '')} {entry.get('institution', '')}"
+    return ' '.join(str(entry.get(field, '')) for field in ('title', 'company', 'tech', 'description'))
+
+
+def profile_items(user_data):
+    """[(section, index, label, text)] for every entry and skill in a profile"""
+    items = []
+    for section in MATCHED_SECTIONS:
+        for index, entry in enumerate(user_data.get(section) or []):
+            items.append((section, index, entry_label(section, entry), entry_text(section, entry)))
+    return items
+
+
+class MatchReport:
+    """How well one profile fits one job description"""
+
+    def __init__(self, overall, ranked, matched_skills, missing_keywords):
+        self.overall = overall
+        self.ranked = ranked
+        self.matched_skills = matched_skills
+        self.missing_keywords = missing_keywords
+
+    @property
+    def scores(self):
+        """{(section, index): score} for every profile entry, e.g. to rank prompt content"""
+        return {(item['section'], item['index']): item['score'] for item in self.ranked}
+
+    def top(self, section, limit=5):
+        return [item for item in self.ranked if item['section'] == section][:limit]
+
+    def as_dict(self):
+        return {
+            'overall': self.overall,
+            'ranked': self.ranked,
+            'matched_skills': self.matched_skills,
+            'missing_keywords': self.missing_keywords,
+        }
+
+
+class ProfileMatcher:
+    """Scores one profile's entries against any number of job descriptions"""
+
+    def __init__(self, user_data, vectorizer=None, idf=None):
+        self.vectorizer = vectorizer or HashingVectorizer()
+        self.items = profile_items(user_data)
+        texts = [text for _, _, _, text in self.items]
+        # The last row is the whole profile, used for the overall score
+        indptr, indices, counts = self.vectorizer.transform(texts + [' '.join(texts)])
+        n_features = self.vectorizer.n_features
+        if idf is None:
+            idf = idf_weights(indices[:indptr[-2]], indptr[:-1], n_features)
+        self.idf = idf
+        self.profile_terms = {term for text in texts for term in keywords(text)}
+
+        # Only features present in the profile can contribute to a dot product
+        self.features = np.unique(indices)
+        self._column = np.full(n_features, -1, dtype=np.int64)
+        self._column[self.features] = np.arange(len(self.features))
+
+        matrix = np.zeros((len(indptr) - 1, len(self.features)), dtype=np.float32)
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        matrix[rows, self._column[indices]] = (1 + np.log(counts)) * idf[indices]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix_t = np.ascontiguousarray((matrix / np.where(norms == 0, 1, norms)).T)
+
+    def score_many(self, job_descriptions, batch_size=1024):
+        """Cosine similarity of every job against every entry; the last column is the whole profile"""
+        results = []
+        for start in range(0, len(job_descriptions), batch_size):
+            batch = job_descriptions[start:start + batch_size]
+            indptr, indices, counts = self.vectorizer.transform(batch)
+            rows = np.repeat(np.arange(len(batch)), np.diff(indptr))
+            weights = (1 + np.log(counts)) * self.idf[indices]
+            # Norms use every term of the job, the product only the terms shared with the profile
+            norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=len(batch)))
+            columns = self._column[indices]
+            shared = columns >= 0
+            dense = np.zeros((len(batch), len(self.features)), dtype=np.float32)
+            dense[rows[shared], columns[shared]] = weights[shared]
+            scores = dense @ self.matrix_t
+            results.append(scores / np.where(norms == 0, 1, norms)[:, None])
+        if not results:
+            return np.zeros((0, len(self.items) + 1), dtype=np.float32)
+        return np.vstack(results)
+
+    def report(self, job_description, missing_limit=10):
+        scores = self.score_many([job_description])[0]
+        ranked = sorted(
+            (
+                {'section': section, 'index': index, 'label': label, 'score': round(float(score), 4)}
+                for (section, index, label, _), score in zip(self.items, scores)
+            ),
+            key=lambda item: -item['score']
+        )
+        job_lower = job_description.lower()
+        matched_skills = [
+            item['label'] for item in ranked
+            if item['section'] == 'skills' and (item['score'] > 0 or item['label'].lower() in job_lower)
+        ]
+        job_terms = Counter(keywords(job_description))
+        missing = [
+            term for term, _ in job_terms.most_common()
+            if term not in self.profile_terms and term not in POSTING_WORDS
+            and not term.isdigit() and len(term) > 2
+        ][:missing_limit]
+        return MatchReport(round(float(scores[-1]), 4), ranked, matched_skills, missing)
+
+
+def match_profile(user_data, job_description):
+    """Match report for one profile and one job description"""
+    return ProfileMatcher(user_data).report(job_description)
+
+
+def resume_scores(user_data):
+    """Relevance of each profile entry to user_data's own job description, or None without one"""
+    job_description = user_data.get('job_description')
+    if not job_description:
+        return None
+    from job_ingest import ingest_job_description
+    return match_profile(user_data, ingest_job_description(job_description).text).scores
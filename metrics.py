@@ -0,0 +1,261 @@
+"""
+Lightweight timing spans and counters for the hot paths
+
+Instrumented code calls metrics.span(name, **labels) and metrics.inc(name, ...).
+When metrics are disabled both return immediately (span hands back a shared
+no-op context manager), so the overhead is one attribute check per call.
+
+Enable with METRICS_ENABLED=1. Exporters are chosen with METRICS_EXPORTERS, a
+comma-separated list of:
+    prometheus  text exposition format served on METRICS_PORT (default 9464)
+    jsonlog     one JSON line per span/counter event, to METRICS_LOG or stderr
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = 'resume_generator_'
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NullSpan:
+    """Shared no-op span used when metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = self.labels
+        if exc_type is not None:
+            labels = dict(labels, error=exc_type.__name__)
+        self.registry.observe(self.name, time.perf_counter() - self.start, **labels)
+        return False
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Metrics:
+    """Registry of counters and duration histograms, fanned out to exporters"""
+
+    def __init__(self, enabled=False, exporters=()):
+        self.enabled = enabled
+        self.exporters = list(exporters)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, **labels):
+        """Time a block: with metrics.span('llm_call'): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        self._emit({'type': 'counter', 'name': name, 'value': value, 'labels': labels})
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.add(seconds)
+        self._emit({'type': 'span', 'name': name, 'seconds': round(seconds, 6), 'labels': labels})
+
+    def _emit(self, event):
+        for exporter in self.exporters:
+            exporter.on_event(event)
+
+    def snapshot(self):
+        """Return counters and span summaries as plain dicts (for the diagnostics panel)"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            spans = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': h.count,
+                    'mean_ms': h.total / h.count * 1000 if h.count else 0.0,
+                    'max_ms': h.max * 1000,
+                }
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return {'counters': counters, 'spans': spans}
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self._counters})
+            for name in counter_names:
+                metric = f"{PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, labels), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+            histogram_names = sorted({name for name, _ in self._histograms})
+            for name in histogram_names:
+                metric = f"{PREFIX}{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, labels), h in sorted(self._histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, h.buckets):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {h.count}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {h.total}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+
+class JsonLogExporter:
+    """Writes every span and counter event as a JSON line"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stream = open(path, 'a', encoding='utf-8') if path else sys.stderr
+
+    def on_event(self, event):
+        line = json.dumps(dict(event, ts=time.time()), default=str)
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+
+class PrometheusExporter:
+    """Serves /metrics over HTTP from a daemon thread"""
+
+    def __init__(self, registry, port=9464, host='127.0.0.1'):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self._server = None
+
+    def on_event(self, event):
+        # Pull-based: the registry is rendered on each scrape
+        pass
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        return self
+
+
+def metrics_from_env():
+    """Build a registry (and start its exporters) from METRICS_* settings"""
+    enabled = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    registry = Metrics(enabled=enabled)
+    if not enabled:
+        return registry
+
+    names = [name.strip() for name in os.getenv('METRICS_EXPORTERS', 'prometheus').split(',') if name.strip()]
+    for name in names:
+        if name == 'prometheus':
+            port = int(os.getenv('METRICS_PORT', '9464'))
+            try:
+                registry.exporters.append(PrometheusExporter(registry, port=port).start())
+            except OSError as e:
+                # Another server process already owns the port
+                print(f"Metrics endpoint not started on port {port}: {e}", file=sys.stderr)
+        elif name == 'jsonlog':
+            registry.exporters.append(JsonLogExporter(os.getenv('METRICS_LOG') or None))
+        else:
+            raise ValueError(f"Unknown metrics exporter: {name!r}")
+    return registry
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide registry"""
+    global _default_metrics
+    if _default_metrics is None:
+        with _default_metrics_lock:
+            if _default_metrics is None:
+                _default_metrics = metrics_from_env()
+    return _default_metrics
@@ -0,0 +1,97 @@
+"""
+Model for OpenAI-compatible chat completion endpoints, e.g. a local model server
+
+Ollama, vLLM, llama.cpp's server, LM Studio and hosted OpenAI-compatible APIs
+all serve POST {base_url}/chat/completions. OpenAICompatibleModel mirrors the
+parts of genai.GenerativeModel the app uses, like FakeModel does:
+generate_content(prompt) returns an object with .text, .candidates and
+.usage_metadata, generate_content(prompt, stream=True) yields such chunks,
+and generation_config={'candidate_count': n} asks for n choices.
+"""
+
+import json
+from types import SimpleNamespace
+
+import requests
+
+
+class OpenAIError(Exception):
+    """Error response from the endpoint; .code is the HTTP status for retry decisions"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def _response(texts, usage=None):
+    usage = usage or {}
+    return SimpleNamespace(
+        text=texts[0] if texts else '',
+        candidates=[SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=t)])) for t in texts],
+        usage_metadata=SimpleNamespace(
+            prompt_token_count=usage.get('prompt_tokens', 0),
+            candidates_token_count=usage.get('completion_tokens', 0),
+            total_token_count=usage.get('total_tokens', 0),
+        ) if usage else None,
+    )
+
+
+class OpenAICompatibleModel:
+    """Chat completions client; one requests.Session is reused for all calls"""
+
+    def __init__(self, model_name, base_url='http://localhost:11434/v1', api_key=None, timeout=60.0,
+                 temperature=None, max_tokens=None):
+        self.model_name = model_name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers['Authorization'] = f"Bearer {api_key}"
+
+    def _body(self, prompt, stream, count):
+        body = {'model': self.model_name, 'messages': [{'role': 'user', 'content': prompt}], 'stream': stream}
+        if count > 1:
+            body['n'] = count
+        if self.temperature is not None:
+            body['temperature'] = self.temperature
+        if self.max_tokens is not None:
+            body['max_tokens'] = self.max_tokens
+        return body
+
+    def _post(self, body):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions", json=body, timeout=self.timeout, stream=body['stream']
+            )
+        except requests.Timeout as e:
+            raise TimeoutError(str(e)) from e
+        except requests.ConnectionError as e:
+            raise ConnectionError(str(e)) from e
+        if response.status_code >= 400:
+            raise OpenAIError(f"{response.status_code} from {self.base_url}: {response.text[:200]}",
+                              code=response.status_code)
+        return response
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        count = (generation_config or {}).get('candidate_count', 1)
+        response = self._post(self._body(prompt, stream, count))
+        if stream:
+            return self._stream(response)
+        data = response.json()
+        choices = sorted(data.get('choices', []), key=lambda choice: choice.get('index', 0))
+        return _response([choice['message'].get('content') or '' for choice in choices], data.get('usage'))
+
+    def _stream(self, response):
+        # Server-sent events: "data: {chunk}" lines, ending with "data: [DONE]"
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    return
+                data = json.loads(payload)
+                pieces = [(choice.get('delta') or {}).get('content') or '' for choice in data.get('choices', [])]
+                yield _response(pieces[:1] or [''], data.get('usage'))
@@ -0,0 +1,359 @@
+"""
+Fit a resume to a number of pages without building the PDF for every attempt
+
+Laying out a document means wrapping every paragraph (line breaking with
+font metrics) and flowing the results down the page. Wrapping is the
+expensive part, and its result depends only on the text, the font settings
+and the frame width, so MeasureCache keeps each paragraph's height and line
+count under that key. paginate() then repeats what ReportLab's frame does
+(space before/after, splitting paragraphs between lines, orphan control) on
+the cached numbers, which takes microseconds per block.
+
+fit_document() searches for the mildest settings that fit max_pages, in this
+order:
+
+1. less space between blocks (SPACING_STEPS)
+2. smaller type (FONT_STEPS, with the smallest spacing)
+3. leaving out the least relevant entries (projects and certifications
+   before experience; at least one experience entry is kept)
+
+Each search is a binary search over its steps, so a fit takes a handful of
+layout passes. Only the chosen settings are built into a PDF, and that build
+checks the real page count; if it is longer, render_fitted_pdf() keeps
+tightening (the next step, then one more left-out entry) until it fits.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from documents import Document, pdf_flowables
+from pdf_templates import DEFAULT_RESUME_LAYOUT, get_template
+
+# (font scale, spacing scale) pairs tried from the mildest to the most aggressive
+SPACING_STEPS = (1.0, 0.8, 0.6, 0.4)
+FONT_STEPS = (0.95, 0.9, 0.85, 0.8)
+LADDER = tuple((1.0, spacing) for spacing in SPACING_STEPS) + tuple((font, SPACING_STEPS[-1]) for font in FONT_STEPS)
+
+# Sections whose entries may be left out, least important first, and how many entries must stay
+TRIMMABLE_SECTIONS = ('certifications', 'projects', 'experience')
+MIN_ENTRIES = {'experience': 1}
+
+# Style attributes that change how a paragraph wraps (not the space around it)
+MEASURE_ATTRIBUTES = (
+    'fontName', 'fontSize', 'leading', 'leftIndent', 'rightIndent', 'firstLineIndent', 'alignment',
+    'wordWrap', 'splitLongWords', 'bulletFontName', 'bulletFontSize', 'bulletIndent', 'autoLeading',
+)
+
+# ReportLab's SimpleDocTemplate frame padding and layout tolerance
+FRAME_PADDING = 6
+_FUZZ = 1e-6
+
+
+def style_key(style):
+    return tuple(getattr(style, name, None) for name in MEASURE_ATTRIBUTES)
+
+
+class MeasureCache:
+    """LRU cache of paragraph (height, line count) by text, wrapping style and width"""
+
+    def __init__(self, max_entries=20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def measure(self, text, style, width):
+        key = (text, style_key(style), width)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        from reportlab.platypus import Paragraph
+        paragraph = Paragraph(text, style)
+        _, height = paragraph.wrap(width, 1e9)
+        lines = len(paragraph.blPara.lines) if paragraph.frags else 0
+        measured = (height, lines)
+
+        with self._lock:
+            self._entries[key] = measured
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return measured
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+_measure_cache = None
+_measure_cache_lock = threading.Lock()
+
+
+def get_measure_cache():
+    """Process-wide measurement cache, sized by PDF_MEASURE_CACHE_SIZE"""
+    global _measure_cache
+    with _measure_cache_lock:
+        if _measure_cache is None:
+            _measure_cache = MeasureCache(int(os.getenv('PDF_MEASURE_CACHE_SIZE', '20000')))
+        return _measure_cache
+
+
+class FrameGeometry:
+    """Usable area of the single frame SimpleDocTemplate puts on each page"""
+
+    def __init__(self, page_settings):
+        page_width, page_height = page_settings['pagesize']
+        self.width = page_width - page_settings['leftMargin'] - page_settings['rightMargin'] - 2 * FRAME_PADDING
+        self.top = page_height - page_settings['topMargin'] - FRAME_PADDING
+        self.bottom = page_settings['bottomMargin'] + FRAME_PADDING
+
+
+def scaled_styles(styles, font_scale=1.0, spacing_scale=1.0):
+    """Copies of a template's styles with type and spacing scaled"""
+    if font_scale == 1.0 and spacing_scale == 1.0:
+        return styles
+    from reportlab.lib.styles import ParagraphStyle
+    return {
+        name: ParagraphStyle(
+            f"{style.name}@{font_scale}x{spacing_scale}",
+            parent=style,
+            fontSize=style.fontSize * font_scale,
+            leading=style.leading * font_scale,
+            spaceBefore=style.spaceBefore * spacing_scale,
+            spaceAfter=style.spaceAfter * spacing_scale,
+        )
+        for name, style in styles.items()
+    }
+
+
+def layout_items(document, styles, width, spacing=1.0, cache=None):
+    """(height, lines, leading, space_before, space_after) per block, as pdf_flowables would lay them out"""
+    cache = cache or get_measure_cache()
+    style_for = {'title': styles['title'], 'heading': styles['heading'], 'text': styles['normal'],
+                 'bullet': styles['normal']}
+    for block in document.blocks:
+        if block.kind == 'space':
+            yield block.size * spacing, 0, 0, 0, 0
+            continue
+        style = style_for[block.kind]
+        text = f"• {block.text}" if block.kind == 'bullet' else block.text
+        height, lines = cache.measure(text, style, width)
+        yield height, lines, style.leading, style.spaceBefore, style.spaceAfter
+
+
+def paginate(items, frame):
+    """Number of pages ReportLab's frame flow needs for the layout items"""
+    pages = 1
+    y = frame.top
+    at_top = True
+    previous_after = 0
+    pending = list(items)
+    pending.reverse()
+    while pending:
+        height, lines, leading, space_before, space_after = pending.pop()
+        # Space before collapses into the previous block's space after, and is dropped at the top of a page
+        space = 0 if at_top else max(space_before - previous_after, 0)
+        available = y - frame.bottom - space
+        if available > 0 and y - space - height >= frame.bottom - _FUZZ:
+            y -= space + height + space_after
+            previous_after = space_after
+            if space + height + space_after:
+                at_top = False
+            continue
+
+        # Split a paragraph between lines; a single line (an orphan) is not left behind
+        fit = int(available / leading) if lines and available > 0 else 0
+        if fit > 1 and fit < lines:
+            y -= space + fit * leading + space_after
+            previous_after = space_after
+            at_top = False
+            pending.append(((lines - fit) * leading, lines - fit, leading, space_before, space_after))
+            continue
+        if at_top:
+            # Too tall even for an empty page; ReportLab would stop with a LayoutError
+            y -= height
+            at_top = False
+            continue
+        pending.append((height, lines, leading, space_before, space_after))
+        pages += 1
+        y = frame.top
+        at_top = True
+        previous_after = 0
+    return pages
+
+
+def without_entries(document, dropped):
+    """Copy of document without the blocks of the dropped entries (and headings left with none)"""
+    dropped = set(dropped)
+    kept_sections = {block.entry[0] for block in document.blocks
+                     if block.entry is not None and block.entry[1] is not None and block.entry not in dropped}
+    blocks = [
+        block for block in document.blocks
+        if block.entry is None or (block.entry[1] is None and block.entry[0] in kept_sections)
+        or (block.entry[1] is not None and block.entry not in dropped)
+    ]
+    return Document(document.kind, blocks, title=document.title)
+
+
+def trim_order(document, scores=None):
+    """Entries in the order they are left out: least relevant first
+
+    scores is {(section, index): relevance}, e.g. MatchReport.scores. Without
+    it, later entries in less important sections go first.
+    """
+    entries = []
+    for block in document.blocks:
+        entry = block.entry
+        if entry is not None and entry[1] is not None and entry[0] in TRIMMABLE_SECTIONS and entry not in entries:
+            entries.append(entry)
+    counts = {section: sum(entry[0] == section for entry in entries) for section in TRIMMABLE_SECTIONS}
+    ordered = sorted(
+        entries,
+        key=lambda entry: ((scores or {}).get(entry, 0.0), TRIMMABLE_SECTIONS.index(entry[0]), -entry[1])
+    )
+    removable = []
+    for entry in ordered:
+        section = entry[0]
+        if counts[section] > MIN_ENTRIES.get(section, 0):
+            counts[section] -= 1
+            removable.append(entry)
+    return removable
+
+
+class Fit:
+    """Settings that make a document fit, and what they cost"""
+
+    def __init__(self, document, layout, max_pages, font_scale, spacing_scale, dropped, pages, passes):
+        self.document = document
+        self.layout = layout
+        self.max_pages = max_pages
+        self.font_scale = font_scale
+        self.spacing_scale = spacing_scale
+        self.dropped = dropped
+        self.pages = pages
+        self.passes = passes
+
+    @property
+    def fits(self):
+        return self.pages <= self.max_pages
+
+    @property
+    def styles(self):
+        return scaled_styles(get_template(self.layout).styles, self.font_scale, self.spacing_scale)
+
+    def flowables(self):
+        return pdf_flowables(self.document, self.styles, spacing=self.spacing_scale)
+
+    def summary(self):
+        changes = []
+        if self.spacing_scale != 1.0:
+            changes.append(f"spacing {self.spacing_scale:.0%}")
+        if self.font_scale != 1.0:
+            changes.append(f"type size {self.font_scale:.0%}")
+        if self.dropped:
+            changes.append(f"left out {len(self.dropped)} least relevant entr{'y' if len(self.dropped) == 1 else 'ies'}")
+        pages = f"{self.pages} page{'s' if self.pages != 1 else ''}"
+        if not self.fits:
+            return f"Could not fit the resume on {self.max_pages} page(s); it has {pages}."
+        if not changes:
+            return f"The resume fits on {pages} as it is."
+        return f"Fitted to {pages}: " + ', '.join(changes) + '.'
+
+    def as_dict(self):
+        """JSON-serialisable outcome: pages, the settings used and the left-out entries"""
+        return {
+            'max_pages': self.max_pages,
+            'pages': self.pages,
+            'fits': self.fits,
+            'font_scale': self.font_scale,
+            'spacing_scale': self.spacing_scale,
+            'dropped': [list(entry) for entry in self.dropped],
+            'summary': self.summary(),
+        }
+
+
+def fit_document(document, layout=DEFAULT_RESUME_LAYOUT, max_pages=1, scores=None, cache=None):
+    """Find the mildest spacing, type size and trimming that lay document out on max_pages"""
+    template = get_template(layout)
+    frame = FrameGeometry(template.page_settings)
+    removable = trim_order(document, scores)
+    counted = {}
+
+    def pages(step, dropped_count):
+        if (step, dropped_count) not in counted:
+            font_scale, spacing_scale = LADDER[step]
+            trimmed = without_entries(document, removable[:dropped_count]) if dropped_count else document
+            styles = scaled_styles(template.styles, font_scale, spacing_scale)
+            counted[step, dropped_count] = paginate(
+                layout_items(trimmed, styles, frame.width, spacing_scale, cache), frame
+            )
+        return counted[step, dropped_count]
+
+    def first(low, high, fits):
+        """Smallest value in [low, high] for which fits() holds (fits is monotonic), or None"""
+        found = None
+        while low <= high:
+            middle = (low + high) // 2
+            if fits(middle):
+                found, high = middle, middle - 1
+            else:
+                low = middle + 1
+        return found
+
+    last = len(LADDER) - 1
+    dropped_count = 0
+    # Most resumes already fit: check the unchanged layout before searching
+    step = 0 if pages(0, 0) <= max_pages else first(1, last, lambda step: pages(step, 0) <= max_pages)
+    if step is None:
+        dropped_count = first(1, len(removable), lambda count: pages(last, count) <= max_pages)
+        if dropped_count is None:
+            # Even the shortest version is too long: use it anyway
+            dropped_count, step = len(removable), last
+        else:
+            # Fewer entries may leave room to relax the type and spacing again
+            step = first(0, last, lambda step: pages(step, dropped_count) <= max_pages)
+
+    dropped = removable[:dropped_count]
+    font_scale, spacing_scale = LADDER[step]
+    final = without_entries(document, dropped) if dropped else document
+    return Fit(final, layout, max_pages, font_scale, spacing_scale, dropped, pages(step, dropped_count), len(counted))
+
+
+def write_fitted_pdf(fit, target):
+    """Build a fitted document into target and return the number of pages it actually has"""
+    doc = get_template(fit.layout).new_doc(target)
+    doc.build(list(fit.flowables()))
+    return doc.page
+
+
+def render_fitted_pdf(document, layout=DEFAULT_RESUME_LAYOUT, max_pages=1, scores=None):
+    """Return (PDF bytes, Fit) for document fitted to max_pages
+
+    The build checks the simulated page count. If the real PDF is longer, the
+    next more aggressive setting is built: the next type and spacing step,
+    then, once the ladder runs out, one more left-out entry at a time. When
+    nothing is left to try the last build is returned with fit.fits False.
+    """
+    fit = fit_document(document, layout, max_pages, scores)
+    removable = trim_order(document, scores)
+    last = len(LADDER) - 1
+    while True:
+        buffer = io.BytesIO()
+        fit.pages = write_fitted_pdf(fit, buffer)
+        step = LADDER.index((fit.font_scale, fit.spacing_scale))
+        dropped_count = len(fit.dropped)
+        if fit.fits or (step == last and dropped_count == len(removable)):
+            return buffer.getvalue(), fit
+        if step < last:
+            fit.font_scale, fit.spacing_scale = LADDER[step + 1]
+        else:
+            fit.dropped = removable[:dropped_count + 1]
+            fit.document = without_entries(document, fit.dropped)
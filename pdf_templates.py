@@ -0,0 +1,227 @@
+"""
+Shared ReportLab styles and page templates
+
+Building a stylesheet and the custom ParagraphStyles costs more than laying out
+a short resume, so each named layout is built and validated once per process
+and then reused by every render.
+
+ReportLab itself is only imported when the first template is built, so the
+app can start and serve steps 1-4 without loading it.
+"""
+
+import threading
+
+DEFAULT_RESUME_LAYOUT = 'classic'
+COVER_LETTER_LAYOUT = 'cover_letter'
+
+# Styles every layout must provide
+REQUIRED_STYLES = ('title', 'heading', 'normal')
+
+
+class PDFTemplate:
+    """A named, prebuilt set of paragraph styles plus page settings"""
+
+    def __init__(self, name, styles, page_settings, description=''):
+        self.name = name
+        self.styles = styles
+        self.page_settings = page_settings
+        self.description = description
+
+    def new_doc(self, target):
+        """Create a document writing to a file path or file-like object
+
+        Documents are built in invariant mode (fixed creation date and file ID),
+        so the same content always renders to the same bytes and can be deduplicated.
+        """
+        from reportlab.platypus import SimpleDocTemplate
+        return SimpleDocTemplate(target, invariant=1, **self.page_settings)
+
+    def validate(self):
+        from reportlab.pdfbase import pdfmetrics
+        missing = [name for name in REQUIRED_STYLES if name not in self.styles]
+        if missing:
+            raise ValueError(f"Layout {self.name!r} is missing styles: {', '.join(missing)}")
+        for style in self.styles.values():
+            # Raises KeyError for fonts ReportLab does not know about
+            pdfmetrics.getFont(style.fontName)
+        margins = ('leftMargin', 'rightMargin', 'topMargin', 'bottomMargin')
+        width, height = self.page_settings['pagesize']
+        settings = self.page_settings
+        if any(settings[m] < 0 for m in margins) or \
+                settings['leftMargin'] + settings['rightMargin'] >= width or \
+                settings['topMargin'] + settings['bottomMargin'] >= height:
+            raise ValueError(f"Layout {self.name!r} has invalid page margins")
+
+
+def _classic(base):
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    styles = {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=base['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_LEFT
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=base['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            spaceBefore=20,
+            alignment=TA_LEFT
+        ),
+        'normal': base['Normal'],
+    }
+    page = dict(pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
+    return styles, page, "Original layout with generous spacing"
+
+
+def _compact(base):
+    from reportlab.lib.enums import TA_LEFT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    styles = {
+        'title': ParagraphStyle(
+            'CompactTitle',
+            parent=base['Heading1'],
+            fontSize=18,
+            spaceAfter=12,
+            alignment=TA_LEFT
+        ),
+        'heading': ParagraphStyle(
+            'CompactHeading',
+            parent=base['Heading2'],
+            fontSize=12,
+            spaceAfter=6,
+            spaceBefore=10,
+            alignment=TA_LEFT
+        ),
+        'normal': ParagraphStyle(
+            'CompactNormal',
+            parent=base['Normal'],
+            fontSize=9,
+            leading=11
+        ),
+    }
+    page = dict(pagesize=A4, rightMargin=24, leftMargin=24, topMargin=24, bottomMargin=18)
+    return styles, page, "Smaller type and tighter spacing to fit more on a page"
+
+
+def _cover_letter(base):
+    styles, page, _ = _classic(base)
+    # The cover letter uses the section heading style for the candidate name
+    styles['title'] = styles['heading']
+    return styles, page, "Cover letter layout"
+
+
+_builders = {
+    'classic': _classic,
+    'compact': _compact,
+    COVER_LETTER_LAYOUT: _cover_letter,
+}
+_templates = {}
+_base_styles = None
+_lock = threading.Lock()
+
+
+def register_layout(name, builder):
+    """Register a layout builder: builder(base_stylesheet) -> (styles, page_settings, description)"""
+    with _lock:
+        _builders[name] = builder
+        _templates.pop(name, None)
+
+
+def resume_layouts():
+    """Names of the layouts available for resumes"""
+    return [name for name in _builders if name != COVER_LETTER_LAYOUT]
+
+
+def get_template(name=DEFAULT_RESUME_LAYOUT):
+    """Return the prebuilt template for a layout, building and validating it on first use"""
+    global _base_styles
+    template = _templates.get(name)
+    if template is not None:
+        return template
+    with _lock:
+        if name not in _templates:
+            if name not in _builders:
+                raise KeyError(f"Unknown PDF layout: {name!r}")
+            if _base_styles is None:
+                from reportlab.lib.styles import getSampleStyleSheet
+                _base_styles = getSampleStyleSheet()
+            styles, page_settings, description = _builders[name](_base_styles)
+            template = PDFTemplate(name, styles, page_settings, description)
+            template.validate()
+            _templates[name] = template
+        return _templates[name]
+
+
+def warm_up():
+    """Import ReportLab's layout engine and build every registered template"""
+    import reportlab.platypus  # noqa: F401
+    for name in list(_builders):
+        get_template(name)
+
+
+class LazyStory:
+    """List-like story that pulls flowables from an iterator as doc.build needs them
+
+    doc.build only looks at the front of the story (indexing, slicing, deleting
+    and re-inserting split parts), so a small buffer is enough and each
+    flowable can be garbage collected once it has been drawn. The flowables
+    and their order are unchanged, so the PDF is the same as from a list.
+    """
+
+    def __init__(self, flowables):
+        self._iterator = iter(flowables)
+        self._buffer = []
+        self._exhausted = False
+        self.pulled = 0
+
+    def _fill(self, count):
+        while len(self._buffer) < count and not self._exhausted:
+            try:
+                self._buffer.append(next(self._iterator))
+                self.pulled += 1
+            except StopIteration:
+                self._exhausted = True
+
+    def _lookahead(self):
+        # keepWithNext groups are collected by scanning up to len(story), so buffer a whole group
+        self._fill(max(1, len(self._buffer)))
+        while not self._exhausted and self._buffer and self._buffer[-1].getKeepWithNext():
+            self._fill(len(self._buffer) + 1)
+
+    def __len__(self):
+        self._lookahead()
+        return len(self._buffer)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else float('inf'))
+        else:
+            self._fill(index + 1)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._fill(index.stop or 0)
+        else:
+            self._fill(index + 1)
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(index.stop if index.stop is not None else float('inf'))
+        else:
+            self._fill(index + 1)
+        del self._buffer[index]
+
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
@@ -0,0 +1,310 @@
+"""
+SQLite-backed store for candidate profiles and generated documents
+
+Profiles are stored field by field (list entries get one row each, e.g.
+"experience.3"), so saving after a wizard step only writes the fields that
+changed. Every save that changes something bumps the profile version and is
+recorded in a history table, so earlier versions can be loaded again.
+
+Profiles are keyed by email, but an email is not proof of anything: the
+first save of a profile issues a random access key, only its hash is stored,
+and every later load, save or document call must present the key.
+
+The database runs in WAL mode with a busy timeout and writes in IMMEDIATE
+transactions, so several Streamlit server processes can share one file.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+LIST_FIELDS = ('skills', 'experience', 'projects', 'education', 'certifications')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    token_hash TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_profiles_email ON profiles (email);
+
+CREATE TABLE IF NOT EXISTS profile_fields (
+    profile_id INTEGER NOT NULL REFERENCES profiles (id),
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    value_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (profile_id, field)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS profile_history (
+    profile_id INTEGER NOT NULL REFERENCES profiles (id),
+    version INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (profile_id, field, version)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    profile_id INTEGER NOT NULL REFERENCES profiles (id),
+    profile_version INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    content BLOB NOT NULL,
+    metadata TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_profile ON documents (profile_id, kind, created_at);
+"""
+
+
+class ProfileAccessError(PermissionError):
+    """The access key is missing or does not match the saved profile"""
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def flatten_profile(user_data):
+    """Map a user_data dict to {field key: JSON value}, one key per list entry"""
+    fields = {}
+    for name, value in user_data.items():
+        if name in LIST_FIELDS and isinstance(value, list):
+            fields[f"{name}.count"] = json.dumps(len(value))
+            for index, entry in enumerate(value):
+                fields[f"{name}.{index}"] = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+        else:
+            fields[name] = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return fields
+
+
+def unflatten_profile(fields):
+    """Inverse of flatten_profile"""
+    user_data = {}
+    lists = {}
+    for key, raw in fields.items():
+        name, _, suffix = key.partition('.')
+        if name in LIST_FIELDS and suffix:
+            if suffix != 'count':
+                lists.setdefault(name, {})[int(suffix)] = json.loads(raw)
+        else:
+            user_data[key] = json.loads(raw)
+    for name in LIST_FIELDS:
+        count_key = f"{name}.count"
+        if count_key in fields:
+            entries = lists.get(name, {})
+            user_data[name] = [entries[i] for i in range(json.loads(fields[count_key])) if i in entries]
+    return user_data
+
+
+def _hash(value):
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _token_hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class ProfileStore:
+    """Versioned profile and document repository on a local SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        columns = [column[1] for column in conn.execute("PRAGMA table_info(profiles)")]
+        if 'token_hash' not in columns:
+            # Profiles saved before access keys have none and cannot be opened
+            conn.execute("ALTER TABLE profiles ADD COLUMN token_hash TEXT")
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections are not shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _profile_row(self, conn, email, token):
+        """(id, version) of the profile for email, None when unknown; raises if token does not open it"""
+        row = conn.execute(
+            "SELECT id, version, token_hash FROM profiles WHERE email = ?", (normalize_email(email),)
+        ).fetchone()
+        if row is None:
+            return None
+        if not token or row[2] is None or not hmac.compare_digest(row[2], _token_hash(token)):
+            raise ProfileAccessError("The access key does not match the saved profile for this email")
+        return row[:2]
+
+    def load(self, email, token):
+        """Return (user_data, version) for an email, or (None, 0) when unknown"""
+        conn = self._connect()
+        row = self._profile_row(conn, email, token)
+        if row is None:
+            return None, 0
+        fields = dict(conn.execute(
+            "SELECT field, value FROM profile_fields WHERE profile_id = ?", (row[0],)
+        ))
+        return unflatten_profile(fields), row[1]
+
+    def load_version(self, email, version, token):
+        """Rebuild the profile as it was at a given version"""
+        conn = self._connect()
+        row = self._profile_row(conn, email, token)
+        if row is None:
+            return None
+        fields = {}
+        for field, value in conn.execute(
+            "SELECT field, value FROM profile_history h WHERE profile_id = ? AND version = ("
+            "SELECT MAX(version) FROM profile_history WHERE profile_id = h.profile_id "
+            "AND field = h.field AND version <= ?)",
+            (row[0], version)
+        ):
+            if value is not None:
+                fields[field] = value
+        return unflatten_profile(fields)
+
+    def history(self, email, token):
+        """List (version, updated_at, changed fields) from newest to oldest"""
+        conn = self._connect()
+        row = self._profile_row(conn, email, token)
+        if row is None:
+            return []
+        versions = {}
+        for version, updated_at, field in conn.execute(
+            "SELECT version, updated_at, field FROM profile_history WHERE profile_id = ? ORDER BY version DESC",
+            (row[0],)
+        ):
+            versions.setdefault(version, (updated_at, []))[1].append(field)
+        return [(version, updated_at, fields) for version, (updated_at, fields) in versions.items()]
+
+    def save(self, user_data, token=None):
+        """Write only the fields that changed; return (profile version, access key)
+
+        A new profile is created with a fresh access key, which is returned and
+        must be passed to every later call for this email. Saving over an
+        existing profile without its key raises ProfileAccessError.
+        """
+        email = normalize_email(user_data.get('email'))
+        if not email:
+            raise ValueError("A profile needs an email address to be saved")
+
+        fields = flatten_profile(user_data)
+        hashes = {field: _hash(value) for field, value in fields.items()}
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._profile_row(conn, email, token)
+            if row is None:
+                token = secrets.token_urlsafe(16)
+                profile_id = conn.execute(
+                    "INSERT INTO profiles (email, token_hash, version, created_at, updated_at) VALUES (?, ?, 0, ?, ?)",
+                    (email, _token_hash(token), now, now)
+                ).lastrowid
+                version = 0
+            else:
+                profile_id, version = row
+
+            stored = dict(conn.execute(
+                "SELECT field, value_hash FROM profile_fields WHERE profile_id = ?", (profile_id,)
+            ))
+            changed = [field for field, digest in hashes.items() if stored.get(field) != digest]
+            removed = [field for field in stored if field not in fields]
+            if not changed and not removed:
+                conn.execute("COMMIT")
+                return version, token
+
+            version += 1
+            conn.executemany(
+                "INSERT OR REPLACE INTO profile_fields (profile_id, field, value, value_hash, version) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(profile_id, field, fields[field], hashes[field], version) for field in changed]
+            )
+            conn.executemany(
+                "DELETE FROM profile_fields WHERE profile_id = ? AND field = ?",
+                [(profile_id, field) for field in removed]
+            )
+            conn.executemany(
+                "INSERT INTO profile_history (profile_id, version, field, value, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(profile_id, version, field, fields[field], now) for field in changed]
+                + [(profile_id, version, field, None, now) for field in removed]
+            )
+            conn.execute(
+                "UPDATE profiles SET version = ?, updated_at = ? WHERE id = ?", (version, now, profile_id)
+            )
+            conn.execute("COMMIT")
+            return version, token
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def save_document(self, email, token, kind, content, metadata=None):
+        """Store a generated document against the profile's current version"""
+        conn = self._connect()
+        row = self._profile_row(conn, email, token)
+        if row is None:
+            raise KeyError(f"No saved profile for {email!r}")
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return conn.execute(
+            "INSERT INTO documents (profile_id, profile_version, kind, content, metadata, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (row[0], row[1], kind, content, json.dumps(metadata or {}), time.time())
+        ).lastrowid
+
+    def documents(self, email, token, kind=None, limit=20):
+        """Newest documents for a profile as dicts (content as bytes)"""
+        conn = self._connect()
+        row = self._profile_row(conn, email, token)
+        if row is None:
+            return []
+        query = "SELECT id, profile_version, kind, content, metadata, created_at FROM documents WHERE profile_id = ?"
+        params = [row[0]]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                'id': doc_id,
+                'profile_version': profile_version,
+                'kind': doc_kind,
+                'content': content,
+                'metadata': json.loads(metadata or '{}'),
+                'created_at': created_at,
+            }
+            for doc_id, profile_version, doc_kind, content, metadata, created_at in conn.execute(query, params)
+        ]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """Return the process-wide store at PROFILE_DB, or None when saving profiles is not enabled"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            path = os.getenv('PROFILE_DB', '')
+            if not path:
+                return None
+            _default_store = ProfileStore(path)
+        return _default_store
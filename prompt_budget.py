@@ -0,0 +1,237 @@
+"""
+Token-budgeted prompt compaction
+
+Large profiles and long pasted job descriptions inflate input tokens, latency
+and cost. compact_prompt ranks experience, project and education entries (and
+skills) by keyword overlap with the job description and keeps the most relevant
+ones that fit a token budget, reporting everything it dropped or shortened.
+"""
+
+import copy
+import math
+import re
+from collections import Counter
+
+# Rough size of a token for English text; close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Share of the budget the job description may use before it is truncated
+JOB_DESCRIPTION_SHARE = 0.4
+
+# Entry descriptions longer than this are shortened before whole entries are dropped
+MAX_DESCRIPTION_CHARS = 600
+
+RANKED_SECTIONS = ('experience', 'projects', 'education')
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#./-]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our the their this to we will with you your
+who what when where which while can able must should would across within into over per plus etc using use
+experience years year work working team teams role job company strong good great new including
+""".split())
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def keywords(text):
+    """Lower-cased content words, keeping tech tokens like c++, node.js and ci/cd intact"""
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def entry_text(section, entry):
+    if section == 'education':
+        return f"{entry.get('degree', '')} {entry.get('institution', '')}"
+    return ' '.join(str(entry.get(field, '')) for field in ('title', 'company', 'tech', 'description'))
+
+
+def relevance(text, job_terms):
+    """Share of the entry's keywords that appear in the job description, weighted by frequency there"""
+    words = keywords(text)
+    if not words or not job_terms:
+        return 0.0
+    hits = sum(math.log1p(job_terms[word]) for word in words if word in job_terms)
+    return hits / math.sqrt(len(words))
+
+
+def mentions(text, term):
+    """Whether term occurs in text as a whole word or phrase ("go" is not found in "google")"""
+    return re.search(r'(?<![a-z0-9])' + re.escape(term) + r'(?![a-z0-9])', text) is not None
+
+
+def shorten(text, max_chars):
+    """Cut text at a word boundary and mark the cut"""
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(' ', 1)[0].rstrip(' ,;.') + '…'
+
+
+class PromptReport:
+    """What compact_prompt kept, shortened and dropped"""
+
+    def __init__(self, budget, original_tokens):
+        self.budget = budget
+        self.original_tokens = original_tokens
+        self.final_tokens = original_tokens
+        self.dropped = []
+        self.shortened = []
+        self.job_description_chars_removed = 0
+
+    @property
+    def compacted(self):
+        return bool(self.dropped or self.shortened or self.job_description_chars_removed)
+
+    def as_dict(self):
+        return {
+            'budget': self.budget,
+            'original_tokens': self.original_tokens,
+            'final_tokens': self.final_tokens,
+            'dropped': self.dropped,
+            'shortened': self.shortened,
+            'job_description_chars_removed': self.job_description_chars_removed,
+        }
+
+    def summary(self):
+        if not self.compacted:
+            return f"Prompt uses ~{self.final_tokens} tokens (budget {self.budget})."
+        parts = [f"Prompt compacted from ~{self.original_tokens} to ~{self.final_tokens} tokens (budget {self.budget})"]
+        if self.dropped:
+            parts.append(f"dropped {len(self.dropped)} low-relevance item(s)")
+        if self.shortened:
+            parts.append(f"shortened {len(self.shortened)} description(s)")
+        if self.job_description_chars_removed:
+            parts.append(f"trimmed {self.job_description_chars_removed} characters of the job description")
+        return ', '.join(parts) + '.'
+
+
+def compact_prompt(user_data, job_description, build_prompt, budget, count_tokens=estimate_tokens,
+                   score_entries=None):
+    """Return (prompt, PromptReport) with the prompt fitted to roughly budget tokens
+
+    build_prompt(user_data, job_description) renders the prompt; it is called on
+    trimmed copies of the inputs, so user_data itself is never modified.
+    score_entries(user_data, job_description), if given, returns
+    {(section, index): relevance} and replaces the keyword-overlap ranking; it
+    is only called when the prompt is over budget.
+    """
+    prompt = build_prompt(user_data, job_description)
+    report = PromptReport(budget, count_tokens(prompt))
+    if not budget or report.original_tokens <= budget:
+        return prompt, report
+
+    data = copy.deepcopy(user_data)
+    job_terms = Counter(keywords(job_description))
+
+    # Long job descriptions are trimmed to their share of the budget (whitespace first)
+    job_description = re.sub(r'[ \t]+', ' ', re.sub(r'\n\s*\n+', '\n\n', job_description)).strip()
+    max_job_chars = int(budget * JOB_DESCRIPTION_SHARE * CHARS_PER_TOKEN)
+    if len(job_description) > max_job_chars:
+        report.job_description_chars_removed = len(job_description) - max_job_chars
+        job_description = shorten(job_description, max_job_chars)
+
+    # Very long descriptions are shortened before anything is dropped
+    for section in ('experience', 'projects'):
+        for entry in data.get(section) or []:
+            description = entry.get('description', '')
+            if len(description) > MAX_DESCRIPTION_CHARS:
+                entry['description'] = shorten(description, MAX_DESCRIPTION_CHARS)
+                report.shortened.append({'section': section, 'title': entry.get('title', '')})
+
+    # Skills matching the job go first; the rest keep their order
+    skills = data.get('skills') or []
+    job_text = job_description.lower()
+    data['skills'] = sorted(skills, key=lambda skill: not mentions(job_text, skill.lower()))
+
+    # Rank every entry, then add them back from most to least relevant while they fit
+    scores = score_entries(user_data, job_description) if score_entries is not None else None
+    ranked = []
+    for section in RANKED_SECTIONS:
+        for index, entry in enumerate(data.get(section) or []):
+            if scores is not None:
+                score = scores.get((section, index), 0.0)
+            else:
+                score = relevance(entry_text(section, entry), job_terms)
+            ranked.append((score, section, index, entry))
+    ranked.sort(key=lambda item: (-item[0], RANKED_SECTIONS.index(item[1]), item[2]))
+
+    # Each entry's cost is measured once, alone in its section, and a running
+    # total is kept, so the prompt is built once per entry rather than once per
+    # entry for every entry added
+    empty = dict(data, **{section: [] for section in RANKED_SECTIONS})
+    base = count_tokens(build_prompt(empty, job_description))
+    costs = {}
+    for _, section, index, entry in ranked:
+        costs[section, index] = count_tokens(build_prompt(dict(empty, **{section: [entry]}), job_description)) - base
+    # A section heading is only paid for once: the overlap of two entries measured alone and together
+    headings = {}
+    for section in RANKED_SECTIONS:
+        entries = data.get(section) or []
+        headings[section] = 0
+        if len(entries) >= 2:
+            both = count_tokens(build_prompt(dict(empty, **{section: entries[:2]}), job_description)) - base
+            headings[section] = max(0, costs[section, 0] + costs[section, 1] - both)
+
+    kept = set()
+    tokens = base
+    sections_used = set()
+    for score, section, index, entry in ranked:
+        cost = costs[section, index] - (headings[section] if section in sections_used else 0)
+        if tokens + cost <= budget:
+            kept.add((section, index))
+            sections_used.add(section)
+            tokens += cost
+
+    def trial_data(skills):
+        return dict(data, skills=skills, **{
+            section: [entry for index, entry in enumerate(data.get(section) or []) if (section, index) in kept]
+            for section in RANKED_SECTIONS
+        })
+
+    # The running total is an estimate (token counts round per build): check the real prompt,
+    # dropping the least relevant kept entries while it is over budget ...
+    trial = trial_data(data['skills'])
+    tokens = count_tokens(build_prompt(trial, job_description))
+    for _, section, index, _ in reversed(ranked):
+        if tokens <= budget:
+            break
+        if (section, index) in kept:
+            kept.remove((section, index))
+            trial = trial_data(data['skills'])
+            tokens = count_tokens(build_prompt(trial, job_description))
+    # ... or adding left-out entries back while the real slack covers their cost
+    for _, section, index, _ in ranked:
+        if (section, index) in kept or costs[section, index] - headings[section] > budget - tokens:
+            continue
+        kept.add((section, index))
+        candidate = trial_data(data['skills'])
+        candidate_tokens = count_tokens(build_prompt(candidate, job_description))
+        if candidate_tokens <= budget:
+            trial, tokens = candidate, candidate_tokens
+        else:
+            kept.remove((section, index))
+
+    for score, section, index, entry in ranked:
+        if (section, index) not in kept:
+            report.dropped.append({
+                'section': section,
+                'title': entry.get('title') or entry.get('degree', ''),
+                'relevance': round(score, 3),
+            })
+
+    # Finally drop the least relevant skills if still over budget, keeping as many as fit
+    if tokens > budget and trial['skills']:
+        low, high = 0, len(trial['skills']) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if count_tokens(build_prompt(trial_data(trial['skills'][:middle]), job_description)) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        for skill in reversed(trial['skills'][low:]):
+            report.dropped.append({'section': 'skills', 'title': skill, 'relevance': 0.0})
+        trial = trial_data(trial['skills'][:low])
+
+    prompt = build_prompt(trial, job_description)
+    report.final_tokens = count_tokens(prompt)
+    return prompt, report
@@ -0,0 +1,148 @@
+"""
+Background PDF rendering for step 5
+
+The resume PDF does not depend on the LLM, so a render run starts building it
+as soon as generation begins and the cover letter PDF is queued the moment its
+text is ready. Both builds run on a thread or process pool so ReportLab's
+doc.build work stays off the Streamlit script thread.
+"""
+
+import copy
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from documents import cover_letter_document, render_pdf, resume_document
+from metrics import get_metrics
+from pdf_layout import render_fitted_pdf
+
+# Pool tasks use the rendering modules directly, so process workers never import the Streamlit script
+
+
+def _timed_resume(user_data, layout, fit_pages=None):
+    start = time.perf_counter()
+    document = resume_document(user_data)
+    fit = None
+    if fit_pages:
+        from matching import resume_scores
+        with get_metrics().span('pdf_fit', document='resume'):
+            data, fit = render_fitted_pdf(document, layout, fit_pages, resume_scores(user_data))
+        fit = fit.as_dict()
+    else:
+        with get_metrics().span('pdf_build', document='resume'):
+            data = render_pdf(document, layout)
+    return data, time.perf_counter() - start, fit
+
+
+def _timed_cover_letter(cover_letter_text, user_data):
+    start = time.perf_counter()
+    with get_metrics().span('pdf_build', document='cover_letter'):
+        data = render_pdf(cover_letter_document(cover_letter_text, user_data))
+    return data, time.perf_counter() - start, None
+
+
+class RenderResult:
+    """PDF buffers, per-stage timings in seconds and per-stage errors of one run
+
+    resume_fit is Fit.as_dict() of a resume fitted to a page count, else None.
+    """
+
+    def __init__(self):
+        self.resume_pdf = None
+        self.cover_letter_pdf = None
+        self.resume_fit = None
+        self.timings = {}
+        self.errors = {}
+
+
+class RenderRun:
+    """One step 5 generation: resume rendering starts immediately"""
+
+    def __init__(self, executor, user_data, layout, resume_future=None, fit_pages=None):
+        self._executor = executor
+        self._started = time.perf_counter()
+        # Snapshot so later edits in the session cannot change what is rendered
+        self.user_data = copy.deepcopy(user_data)
+        self.layout = layout
+        self.fit_pages = fit_pages
+        # A resume rendered ahead of time (see render_resume) for the same details and layout
+        self._resume_future = resume_future or executor.submit(_timed_resume, self.user_data, layout, fit_pages)
+        self._cover_letter_future = None
+
+    def render_cover_letter(self, cover_letter_text):
+        """Queue the cover letter PDF once the generated text is available"""
+        self._generated = time.perf_counter()
+        self._cover_letter_future = self._executor.submit(_timed_cover_letter, cover_letter_text, self.user_data)
+
+    def cancel(self):
+        """Drop the run (e.g. when generation failed); running builds finish in the background"""
+        self._resume_future.cancel()
+        if self._cover_letter_future is not None:
+            self._cover_letter_future.cancel()
+
+    def result(self, timeout=None):
+        """Wait for both PDFs and return a RenderResult"""
+        result = RenderResult()
+        if self._cover_letter_future is not None:
+            result.timings['generate'] = self._generated - self._started
+
+        stages = [('resume_pdf', self._resume_future), ('cover_letter_pdf', self._cover_letter_future)]
+        for stage, future in stages:
+            if future is None:
+                continue
+            try:
+                data, seconds, fit = future.result(timeout=timeout)
+                setattr(result, stage, io.BytesIO(data))
+                result.timings[stage] = seconds
+                if fit is not None:
+                    result.resume_fit = fit
+            except Exception as e:
+                result.errors[stage] = e
+
+        result.timings['total'] = time.perf_counter() - self._started
+        return result
+
+
+class RenderPipeline:
+    """Owns the pool that render runs are scheduled on"""
+
+    def __init__(self, executor='thread', max_workers=2):
+        self.kind = executor
+        if executor == 'process':
+            # spawn avoids forking a multi-threaded Streamlit server
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        elif executor == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-render')
+        else:
+            raise ValueError(f"Unknown render executor: {executor!r} (expected 'thread' or 'process')")
+
+    def start(self, user_data, layout='classic', resume_future=None, fit_pages=None):
+        return RenderRun(self._executor, user_data, layout, resume_future=resume_future, fit_pages=fit_pages)
+
+    def render_resume(self, user_data, layout='classic', fit_pages=None):
+        """Render a resume on the pool ahead of a run; the future can be passed to start()"""
+        return self._executor.submit(_timed_resume, copy.deepcopy(user_data), layout, fit_pages)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_pipeline = None
+_default_pipeline_lock = threading.Lock()
+
+
+def get_render_pipeline():
+    """Return the process-wide pipeline configured by RENDER_EXECUTOR and RENDER_WORKERS"""
+    global _default_pipeline
+    with _default_pipeline_lock:
+        if _default_pipeline is None:
+            _default_pipeline = RenderPipeline(
+                executor=os.getenv('RENDER_EXECUTOR', 'thread'),
+                max_workers=int(os.getenv('RENDER_WORKERS', '2')),
+            )
+        return _default_pipeline
@@ -0,0 +1,194 @@
+"""
+Response cache for generated cover letters
+
+Entries are keyed on a stable hash of the normalized prompt and the model name,
+so identical requests are answered without calling the LLM again. The cache has
+an in-memory LRU tier and an optional SQLite tier that survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt):
+    """Collapse indentation and whitespace noise so equivalent prompts hash the same"""
+    lines = [_WHITESPACE.sub(' ', line).strip() for line in prompt.strip().splitlines()]
+    return '\n'.join(line for line in lines if line)
+
+
+def make_cache_key(prompt, model_name):
+    """Return a content-addressed key for a prompt sent to a given model"""
+    payload = json.dumps([model_name, normalize_prompt(prompt)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries=128, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, stored_at=None):
+        with self._lock:
+            self._entries[key] = (value, stored_at if stored_at is not None else time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk cache tier backed by a single SQLite table"""
+
+    def __init__(self, path, max_entries=1000, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    def _connect(self):
+        # One connection per thread, reused for every call; `with conn:` only commits
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return (value, created_at) or None"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return row
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            # Evict the least recently used rows beyond the size cap
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            if self.ttl is not None:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """Two-tier cache (memory, then optional SQLite) with hit/miss counters"""
+
+    def __init__(self, max_entries=128, ttl=None, db_path=None, db_max_entries=1000):
+        self.memory = MemoryCache(max_entries=max_entries, ttl=ttl)
+        self.disk = SQLiteCache(db_path, max_entries=db_max_entries, ttl=ttl) if db_path else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None:
+                # Promote to the memory tier, keeping the original age for TTL
+                value = row[0]
+                self.memory.set(key, value, stored_at=row[1])
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_entries': len(self.memory),
+            'disk_entries': len(self.disk) if self.disk is not None else 0,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide cache, configured from environment variables"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            ttl = float(os.getenv('RESPONSE_CACHE_TTL', '86400'))
+            _default_cache = ResponseCache(
+                max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', '128')),
+                ttl=ttl if ttl > 0 else None,
+                db_path=os.getenv('RESPONSE_CACHE_DB') or None,
+                db_max_entries=int(os.getenv('RESPONSE_CACHE_DB_SIZE', '1000')),
+            )
+        return _default_cache
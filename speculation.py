@@ -0,0 +1,150 @@
+"""
+Speculative work started before the user asks for it
+
+When the user leaves step 4 the profile and job description are usually
+final, so the cover letter and resume can be produced while they look at
+step 5. A Speculator keeps at most one speculation per slot (e.g. 'resume',
+'cover_letter'), keyed by a hash of the inputs it was started from:
+
+- schedule() starts work after a debounce delay. Scheduling again with other
+  inputs before the delay is up replaces the pending work, so quick
+  successive edits cost one call; scheduling with the same inputs reuses it.
+- take() hands over the result's future when the inputs still match and
+  discards the speculation when they do not.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+def input_key(*parts):
+    """Stable hash of JSON-serializable inputs"""
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class Speculation:
+    def __init__(self, key):
+        self.key = key
+        self.future = Future()
+        self.timer = None
+        self.inner = None
+
+    @property
+    def started(self):
+        return self.inner is not None
+
+    def cancel(self):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.future.cancel()
+        if self.inner is not None:
+            # Work already running finishes in the background; its result is dropped
+            self.inner.cancel()
+
+
+def _chain(source, target):
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class Speculator:
+    """Debounced, input-keyed background work for one session"""
+
+    def __init__(self, delay=2.0):
+        self.delay = delay
+        self._slots = {}
+        self._lock = threading.Lock()
+        self.stats = {'started': 0, 'reused': 0, 'superseded': 0, 'hits': 0, 'stale': 0}
+
+    def schedule(self, slot, key, start, delay=None):
+        """Call start() for slot after delay seconds unless it is already scheduled for key
+
+        start is a zero-argument callable that submits the work and returns its
+        Future, e.g. lambda: get_speculation_executor().submit(fn, *args).
+        """
+        delay = self.delay if delay is None else delay
+        with self._lock:
+            current = self._slots.get(slot)
+            if current is not None and current.key == key and not self._failed(current):
+                self.stats['reused'] += 1
+                if delay == 0 and not current.started:
+                    current.timer.cancel()
+                    self._start(current, start)
+                return current.future
+            if current is not None:
+                current.cancel()
+                self.stats['superseded'] += 1
+
+            speculation = self._slots[slot] = Speculation(key)
+            if delay > 0:
+                speculation.timer = threading.Timer(delay, self._fire, (speculation, start))
+                speculation.timer.daemon = True
+                speculation.timer.start()
+            else:
+                self._start(speculation, start)
+            return speculation.future
+
+    @staticmethod
+    def _failed(speculation):
+        future = speculation.future
+        return future.cancelled() or (future.done() and future.exception() is not None)
+
+    def _fire(self, speculation, start):
+        with self._lock:
+            # Superseded or taken speculations were cancelled and are no longer in a slot
+            if any(current is speculation for current in self._slots.values()) and not speculation.started:
+                self._start(speculation, start)
+
+    def _start(self, speculation, start):
+        if not speculation.future.set_running_or_notify_cancel():
+            return
+        speculation.inner = start()
+        speculation.inner.add_done_callback(lambda inner: _chain(inner, speculation.future))
+        self.stats['started'] += 1
+
+    def take(self, slot, key):
+        """Return the slot's future if it was started for key; discard it otherwise"""
+        with self._lock:
+            current = self._slots.pop(slot, None)
+            if current is None:
+                return None
+            if current.key != key or self._failed(current):
+                current.cancel()
+                self.stats['stale'] += 1
+                return None
+            if not current.started:
+                # Still in its debounce delay: the caller is about to do the work itself
+                current.cancel()
+                return None
+            self.stats['hits'] += 1
+            return current.future
+
+    def discard(self, slot=None):
+        with self._lock:
+            for name in [slot] if slot else list(self._slots):
+                current = self._slots.pop(name, None)
+                if current is not None:
+                    current.cancel()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_speculation_executor():
+    """Process-wide pool for speculative LLM calls, sized by SPECULATION_WORKERS"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('SPECULATION_WORKERS', '2')), thread_name_prefix='speculation'
+            )
+        return _executor
@@ -0,0 +1,53 @@
+"""
+Background pre-warming of the modules the app defers at startup
+
+app.py does not import the Gemini SDK, ReportLab or NumPy (for matching) at
+module load, so a new server process renders step 1 without paying for them.
+After the first page has been rendered, prewarm() loads them on a daemon
+thread so they are usually ready by the time the user reaches step 5. Each
+task runs once per process however many sessions call prewarm().
+
+Set STARTUP_PREWARM=0 to skip it and load everything on first use instead.
+"""
+
+import os
+import threading
+import time
+
+# Task name -> seconds it took, or the exception it raised
+results = {}
+
+_started = set()
+_lock = threading.Lock()
+
+
+def prewarm_enabled():
+    return os.getenv('STARTUP_PREWARM', '1') == '1'
+
+
+def _run(tasks):
+    for name, task in tasks:
+        start = time.perf_counter()
+        try:
+            task()
+        except Exception as e:  # first use will retry and report the error properly
+            results[name] = e
+        else:
+            results[name] = time.perf_counter() - start
+
+
+def prewarm(*tasks):
+    """Run (name, callable) tasks on a daemon thread, each at most once per process
+
+    Returns the thread, or None when there was nothing new to run.
+    """
+    if not prewarm_enabled():
+        return None
+    with _lock:
+        pending = [(name, task) for name, task in tasks if name not in _started]
+        _started.update(name for name, _ in pending)
+    if not pending:
+        return None
+    thread = threading.Thread(target=_run, args=(pending,), name='prewarm', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,22 @@
+import os
+import time
+
+from artifact_store import TMP_GRACE_SECONDS, ArtifactStore
+
+
+def test_eviction_leaves_other_writers_temporary_files_alone(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=10, evict_interval=0)
+    os.makedirs(tmp_path / 'ab')
+    in_progress = tmp_path / 'ab' / 'writing.tmp'
+    in_progress.write_bytes(b'x' * 100)
+    abandoned = tmp_path / 'ab' / 'crashed.tmp'
+    abandoned.write_bytes(b'x')
+    old = time.time() - TMP_GRACE_SECONDS - 1
+    os.utime(abandoned, (old, old))
+
+    first = store.put(b'first artifact')
+    second = store.put(b'second artifact')
+    assert in_progress.exists() and not abandoned.exists()
+    # Over max_bytes: the least recently used artifact goes, the one just stored stays
+    assert not store.exists(first)
+    assert store.read_bytes(second) == b'second artifact'
@@ -0,0 +1,21 @@
+from job_ingest import ingest_job_description
+
+POSTING = """Security Engineer at Initech
+
+- Must pass a background check and hold a clearance
+- Write our privacy policy and data retention guidelines
+- Apply statistical methods to alert triage
+
+Employment is contingent upon successful completion of a background check.
+Read our Applicant Privacy Notice here.
+Apply now
+We are an equal opportunity employer.
+"""
+
+
+def test_only_whole_line_legal_boilerplate_is_dropped():
+    text = ingest_job_description(POSTING).text
+    for requirement in ("Must pass a background check", "Write our privacy policy", "Apply statistical methods"):
+        assert requirement in text
+    for boilerplate in ("Employment is contingent", "Privacy Notice", "Apply now", "equal opportunity"):
+        assert boilerplate not in text
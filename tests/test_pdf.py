@@ -0,0 +1,25 @@
+import io
+
+import pytest
+
+from benchmarks.synthetic import make_profile
+from documents import pdf_flowables, resume_document
+from pdf_templates import LazyStory, get_template, resume_layouts
+
+
+def build(layout, story):
+    # Templates build in invariant mode (invariant=1), so equal content gives equal bytes
+    buffer = io.BytesIO()
+    get_template(layout).new_doc(buffer).build(story)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('layout', resume_layouts())
+@pytest.mark.parametrize('size', ['small', 'typical', 'huge'])
+def test_lazy_story_builds_the_same_pdf_as_a_list(layout, size):
+    document = resume_document(make_profile(size))
+    styles = get_template(layout).styles
+    story = LazyStory(pdf_flowables(document, styles))
+
+    assert build(layout, story) == build(layout, list(pdf_flowables(document, styles)))
+    assert story.pulled == len(list(pdf_flowables(document, styles)))
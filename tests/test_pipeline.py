@@ -0,0 +1,277 @@
+"""
+Behaviour checks for the generation pipeline, run offline against the fake model
+
+    python -m pytest tests
+"""
+
+import io
+import json
+import os
+import time
+
+import pytest
+
+import batch
+import job_queue
+import pdf_layout
+from benchmarks.synthetic import make_job_description, make_profile
+from documents import resume_document
+from fake_llm import FakeLLMError, FakeModel
+from llm_client import AsyncLLMClient, ModelBackend, is_transient
+from matching import ProfileMatcher, match_profile
+from prompt_budget import compact_prompt, estimate_tokens
+from response_cache import MemoryCache, ResponseCache, make_cache_key
+
+
+def stub_client(**model_options):
+    return AsyncLLMClient(ModelBackend(FakeModel(**model_options)), max_concurrency=2, base_delay=0.0)
+
+
+def long_profile(seed=0, repeat=3):
+    user_data = make_profile('typical', seed=seed)
+    for key in ('experience', 'projects'):
+        user_data[key] = user_data[key] * repeat
+    return user_data
+
+
+# Fake model and client
+
+def test_fake_model_answers_the_same_prompt_the_same_way():
+    model = FakeModel()
+    first = model.generate_content("Write a letter for Ann")
+    assert first.text == model.generate_content("Write a letter for Ann").text
+    assert first.text.startswith("Dear Hiring Manager")
+    assert first.usage_metadata.total_token_count > 0
+
+    variants = model.generate_content("Write a letter for Ann", generation_config={'candidate_count': 3})
+    texts = [''.join(part.text for part in c.content.parts) for c in variants.candidates]
+    assert len(set(texts)) == 3
+
+
+def test_client_retries_fake_failures_then_gives_up():
+    client = stub_client(error_rate=1.0)
+    client.max_retries = 2
+    with pytest.raises(FakeLLMError) as raised:
+        client.generate_sync("prompt")
+    assert is_transient(raised.value)
+    assert client.backend.model.calls == 3
+    assert client.retries == 2
+
+
+class BlockingModel(FakeModel):
+    """Fake model whose first blocked candidates come back without parts, like filtered Gemini answers"""
+
+    def __init__(self, blocked, **options):
+        super().__init__(**options)
+        self.blocked = blocked
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        response = super().generate_content(prompt, stream, generation_config, **kwargs)
+        for candidate in response.candidates[:self.blocked]:
+            candidate.content.parts = []
+        self.blocked -= min(self.blocked, len(response.candidates))
+        return response
+
+
+def test_drafts_leave_out_blocked_candidates():
+    client = AsyncLLMClient(ModelBackend(BlockingModel(blocked=1)))
+    texts, responses = client.generate_variants("Write a letter for Ann", 3)
+    assert len(texts) == 3 and all(text.strip() for text in texts)
+    # The blocked candidate was replaced by one more request
+    assert len(responses) == 2
+
+    client = AsyncLLMClient(ModelBackend(BlockingModel(blocked=10)))
+    with pytest.raises(RuntimeError, match="no usable drafts"):
+        client.generate_variants("Write a letter for Ann", 3)
+
+
+def test_streamed_letter_matches_the_blocking_one():
+    client = stub_client()
+    streamed = ''.join(chunk.text for chunk in client.stream_sync("Write a letter for Ann"))
+    assert streamed == client.generate_sync("Write a letter for Ann").text
+
+
+# Batch CLI through the stub backend
+
+def test_batch_writes_documents_and_skips_finished_items_on_rerun(tmp_path):
+    candidates = [('ann', make_profile('small', seed=1)), ('bob', make_profile('small', seed=2))]
+    jobs = [('job_1', make_job_description(1)), ('job_2', make_job_description(2))]
+    client = stub_client()
+
+    summary = batch.run_batch(candidates, jobs, str(tmp_path), client, workers=2, log=lambda message: None)
+    assert (summary['succeeded'], summary['failed'], summary['skipped']) == (4, 0, 0)
+    with open(tmp_path / batch.MANIFEST_FILE, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert {entry['item_id'] for entry in entries} == {'ann/job_1', 'ann/job_2', 'bob/job_1', 'bob/job_2'}
+    for entry in entries:
+        assert 0.0 <= entry['match_score'] <= 1.0
+        for path in entry['files'].values():
+            assert os.path.getsize(tmp_path / path) > 0
+    letter = (tmp_path / 'ann' / 'job_1' / 'cover_letter.txt').read_text(encoding='utf-8')
+    assert letter.startswith("Dear Hiring Manager")
+
+    calls = client.backend.model.calls
+    summary = batch.run_batch(candidates, jobs, str(tmp_path), client, workers=2, log=lambda message: None)
+    assert (summary['succeeded'], summary['skipped']) == (0, 4)
+    assert client.backend.model.calls == calls
+
+
+# Response cache
+
+def test_memory_cache_evicts_least_recently_used_and_expires():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    assert cache.get('a') == 'A'
+    cache.set('c', 'C')
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == ('A', None, 'C')
+
+    cache.set('old', 'stale', stored_at=time.time() - 61)
+    assert cache.get('old') is None
+
+
+def test_response_cache_promotes_disk_hits_and_ignores_whitespace(tmp_path):
+    db_path = str(tmp_path / 'responses.db')
+    key = make_cache_key("Write a letter\n   for Ann  ", 'fake-model')
+    assert key == make_cache_key("Write a letter\nfor Ann", 'fake-model')
+    assert key != make_cache_key("Write a letter\nfor Ann", 'other-model')
+
+    ResponseCache(db_path=db_path).set(key, 'letter')
+    cache = ResponseCache(db_path=db_path)
+    assert cache.get(key) == 'letter'
+    assert cache.get('missing') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'memory_entries': 1, 'disk_entries': 1}
+    assert ResponseCache(db_path=db_path, ttl=-1).get(key) is None
+
+
+# Prompt budget
+
+def build_prompt(user_data, job_description):
+    lines = [f"Job: {job_description}", f"Skills: {', '.join(user_data['skills'])}"]
+    for section in ('experience', 'projects'):
+        for entry in user_data.get(section) or []:
+            lines.append(f"{entry['title']}: {entry['description']}")
+    return '\n'.join(lines)
+
+
+def test_compact_prompt_keeps_short_prompts_as_they_are():
+    user_data = make_profile('small')
+    prompt, report = compact_prompt(user_data, "Python developer", build_prompt, budget=4000)
+    assert prompt == build_prompt(user_data, "Python developer")
+    assert not report.compacted
+
+
+def test_compact_prompt_drops_the_least_relevant_entries_to_fit():
+    user_data = make_profile('typical')
+    user_data['experience'] = [
+        {'title': 'Kafka Engineer', 'description': 'Built Kafka streaming pipelines in Go. ' * 5},
+        {'title': 'Chef', 'description': 'Cooked pasta and baked bread for the restaurant. ' * 5},
+    ]
+    user_data['projects'] = []
+    full = build_prompt(user_data, "Go and Kafka streaming engineer")
+    budget = estimate_tokens(full) - 20
+
+    prompt, report = compact_prompt(user_data, "Go and Kafka streaming engineer", build_prompt, budget)
+    assert estimate_tokens(prompt) <= budget
+    assert 'Kafka Engineer' in prompt and 'Chef' not in prompt
+    assert [item['title'] for item in report.dropped] == ['Chef']
+    assert len(user_data['experience']) == 2
+
+
+# Matching
+
+def test_profile_matcher_ranks_the_entry_that_matches_the_job_first():
+    user_data = make_profile('small')
+    user_data['experience'] = [
+        {'title': 'Chef', 'company': 'Bistro', 'description': 'Cooked pasta and baked bread.'},
+        {'title': 'Data Engineer', 'company': 'Acme', 'description': 'Built Kafka and Spark pipelines.'},
+    ]
+    report = match_profile(user_data, "Data engineer for Kafka and Spark pipelines")
+    experience = report.top('experience')
+    assert experience[0]['index'] == 1 and experience[0]['score'] > experience[1]['score']
+    assert 0.0 < report.overall <= 1.0
+
+    scores = ProfileMatcher(user_data).score_many(["Kafka pipelines", "Baking bread", ""])
+    assert scores.shape == (3, len(ProfileMatcher(user_data).items) + 1)
+    assert not scores[2].any()
+
+
+# Fitting resumes to pages
+
+def test_fit_document_leaves_short_resumes_alone():
+    fit = pdf_layout.fit_document(resume_document(make_profile('small')), max_pages=1)
+    assert fit.fits and not fit.dropped
+    assert (fit.font_scale, fit.spacing_scale) == pdf_layout.LADDER[0]
+
+
+def test_fit_document_fits_long_resumes_on_one_real_page():
+    user_data = long_profile()
+    scores = match_profile(user_data, make_job_description(0)).scores
+    fit = pdf_layout.fit_document(resume_document(user_data), max_pages=1, scores=scores)
+    assert fit.fits and fit.dropped
+    assert pdf_layout.write_fitted_pdf(fit, io.BytesIO()) == 1
+    # The least relevant entries go first
+    kept = set(scores) - set(fit.dropped)
+    assert max(scores[entry] for entry in fit.dropped) <= max(scores[entry] for entry in kept)
+
+
+def test_render_fitted_pdf_keeps_trimming_when_the_real_build_overflows(monkeypatch):
+    document = resume_document(long_profile())
+    # A layout model that always underestimates: every attempt looks like one page
+    monkeypatch.setattr(pdf_layout, 'paginate', lambda items, frame: 1)
+    data, fit = pdf_layout.render_fitted_pdf(document, max_pages=1)
+    assert fit.fits and fit.pages == 1 and fit.dropped
+    assert (fit.font_scale, fit.spacing_scale) == pdf_layout.LADDER[-1]
+    assert data.startswith(b'%PDF')
+
+
+# Job queue
+
+def echo(payload, job):
+    return payload
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setitem(job_queue.HANDLERS, 'echo', f'{__name__}:echo')
+    return job_queue.JobQueue(str(tmp_path / 'jobs.db'), lease_seconds=0.3, retry_delay=0.0)
+
+
+def test_job_queue_renews_the_lease_of_a_running_job(queue, monkeypatch):
+    def slow_handler(payload, job):
+        for _ in range(6):
+            time.sleep(0.1)
+            job.check_cancelled()
+            # The lease is renewed as the handler runs, so no one else can claim the job
+            assert queue.claim('other') is None
+        return {'echo': payload['text']}
+
+    monkeypatch.setattr(job_queue, 'load_handler', lambda kind: slow_handler)
+    job_id = queue.submit('echo', {'text': 'hi'})
+    assert job_queue.run_job(queue, queue.claim('worker-1')) == job_queue.DONE
+    assert queue.get(job_id).result == {'echo': 'hi'}
+
+
+def test_job_queue_ignores_outcomes_from_a_worker_that_lost_its_lease(queue):
+    job_id = queue.submit('echo', {})
+    assert queue.claim('worker-1').id == job_id
+    time.sleep(0.35)
+    # The lease ran out: another worker takes the job over
+    assert queue.claim('worker-2').id == job_id
+    assert not queue.renew(job_id, 'worker-1')
+    assert queue.fail(job_id, 'worker-1', 'late failure') is None
+    assert not queue.complete(job_id, 'worker-1', {'from': 'worker-1'})
+    assert queue.complete(job_id, 'worker-2', {'from': 'worker-2'})
+    assert queue.get(job_id).result == {'from': 'worker-2'}
+
+
+def test_job_queue_retries_failures_then_dead_letters(queue):
+    job_id = queue.submit('echo', {}, max_attempts=2)
+    assert queue.fail(job_id, 'w', 'boom') is None
+    queue.claim('w')
+    assert queue.fail(job_id, 'w', 'boom') == job_queue.QUEUED
+    queue.claim('w')
+    assert queue.fail(job_id, 'w', 'boom again') == job_queue.DEAD
+    job = queue.get(job_id)
+    assert (job.status, job.attempts, job.error) == (job_queue.DEAD, 2, 'boom again')
+    assert [dead.id for dead in queue.dead_letters()] == [job_id]